@@ -3,10 +3,12 @@ from flask_cors import CORS
 from flask_limiter.errors import RateLimitExceeded
 from flask_jwt_extended.exceptions import RevokedTokenError
 from flask_migrate import Migrate
+import click
 from dotenv import load_dotenv
 from extensions import bcrypt, jwt, db, limiter, jwt_required, get_jwt_identity, create_access_token
-from utils import check_if_token_revoked, create_default_plans
-from routes import user_api, admin_api, auth_api, email_api, profile_api, project_api, generated_content_api, notification_api, plan_api, ai_generation_api, ai_generation_video_api, chat_api
+from utils import check_if_token_revoked, create_default_plans, backfill_message_seq, backfill_chat_summaries
+from utils.search import rebuild_search_index
+from routes import user_api, admin_api, auth_api, email_api, profile_api, project_api, generated_content_api, notification_api, plan_api, ai_generation_api, ai_generation_video_api, chat_api, search_api
 from models import User, Plan
 import os, uuid
 
@@ -20,7 +22,8 @@ CORS(
         "https://artificiall.ai",
         "https://api.artificiall.ai"
         ],  # frontend real
-    allow_headers=["Content-Type", "X-CSRF-Token", "Authorization"],
+    allow_headers=["Content-Type", "X-CSRF-Token", "Authorization", "Idempotency-Key"],
+    expose_headers=["Idempotent-Replayed"],
     methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
 )
 
@@ -30,7 +33,7 @@ def handle_options_request():
         response = make_response()
         response.headers["Access-Control-Allow-Origin"] = "https://artificiall.ai"
         response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, X-CSRF-Token, Authorization"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, X-CSRF-Token, Authorization, Idempotency-Key"
         response.headers["Access-Control-Allow-Credentials"] = "true"
         response.status_code = 200
         return response
@@ -105,6 +108,25 @@ with app.app_context():
     create_default_plans()
     create_default_admin()
 
+# Backfills pontuais (o `flask db upgrade` já faz isso ao criar as colunas)
+@app.cli.command("backfill-message-seq")
+def backfill_message_seq_command():
+    """Numera mensagens sem seq e acerta Chat.last_seq."""
+    backfill_message_seq()
+
+@app.cli.command("backfill-chat-summaries")
+def backfill_chat_summaries_command():
+    """Preenche message_count/last_message_at/last_snippet de chats antigos."""
+    backfill_chat_summaries()
+
+@app.cli.command("rebuild-search-index")
+@click.option("--force", is_flag=True, help="Reconstrói mesmo que o índice já tenha documentos.")
+def rebuild_search_index_command(force):
+    """Popula search_documents a partir de chats, mensagens, conteúdos e projetos."""
+    total = rebuild_search_index(only_if_empty=not force)
+    if not total and not force:
+        print("[INFO] Índice de busca já populado; use --force para reconstruir")
+
 # Configura blacklist com JWTManager
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked_callback(jwt_header, jwt_payload):
@@ -139,6 +161,7 @@ app.register_blueprint(notification_api, url_prefix="/api/notifications")
 app.register_blueprint(ai_generation_api, url_prefix="/api/ai")
 app.register_blueprint(ai_generation_video_api, url_prefix="/api/ai")
 app.register_blueprint(chat_api, url_prefix="/api/chats")
+app.register_blueprint(search_api, url_prefix="/api/search")
 
 print("🚀 CORS configurado para:", app.config.get("CORS_ALLOW_HEADERS"))
 
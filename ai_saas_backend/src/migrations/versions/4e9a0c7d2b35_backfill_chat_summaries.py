@@ -0,0 +1,42 @@
+"""preenche o resumo da listagem (message_count, last_message_at, last_snippet)
+
+Chats anteriores a essas colunas ficam com valores vazios; um UPDATE só,
+aqui na migração, em vez de a cada boot.
+
+Revision ID: 4e9a0c7d2b35
+Revises: b7d41e2a9c01
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9a0c7d2b35'
+down_revision = 'b7d41e2a9c01'
+branch_labels = None
+depends_on = None
+
+SNIPPET_LENGTH = 160
+
+
+def upgrade():
+    op.execute(sa.text(f"""
+        UPDATE chats SET
+            message_count = (SELECT COUNT(*) FROM chat_messages m WHERE m.chat_id = chats.id),
+            last_message_at = (SELECT MAX(m.created_at) FROM chat_messages m WHERE m.chat_id = chats.id),
+            last_snippet = (
+                SELECT substr(m.content, 1, {SNIPPET_LENGTH}) FROM chat_messages m
+                WHERE m.chat_id = chats.id
+                ORDER BY m.seq DESC
+                LIMIT 1
+            )
+        WHERE last_message_at IS NULL
+          AND EXISTS (SELECT 1 FROM chat_messages m WHERE m.chat_id = chats.id)
+    """))
+
+
+def downgrade():
+    # Só dados; as colunas saem no downgrade de b7d41e2a9c01
+    pass
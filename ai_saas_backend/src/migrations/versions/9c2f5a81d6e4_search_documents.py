@@ -0,0 +1,94 @@
+"""search_documents e índice full-text (tsvector/GIN no Postgres, FTS5 no SQLite)
+
+O DDL do índice full-text vive num listener after_create em models/search.py,
+que só roda quando a tabela nasce pelo db.create_all(). Aqui ele é aplicado
+explicitamente, conferindo o que já existe. O índice começa vazio: popular
+com `flask rebuild-search-index` depois do upgrade.
+
+Revision ID: 9c2f5a81d6e4
+Revises: 4e9a0c7d2b35
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c2f5a81d6e4'
+down_revision = '4e9a0c7d2b35'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "portuguese")
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, body, content='search_documents', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+
+
+def _upgrade_postgres(inspector):
+    if "tsv" not in {c["name"] for c in inspector.get_columns("search_documents")}:
+        op.execute(
+            "ALTER TABLE search_documents ADD COLUMN tsv tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(body, '')), 'B')) STORED"
+        )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)")
+
+
+def _upgrade_sqlite(bind):
+    has_fts = bind.execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'"
+    )).first()
+    if has_fts:
+        return
+    for statement in ["DROP TRIGGER IF EXISTS search_documents_ai",
+                      "DROP TRIGGER IF EXISTS search_documents_ad",
+                      "DROP TRIGGER IF EXISTS search_documents_au"] + SQLITE_FTS:
+        op.execute(statement)
+    # Documentos que já existiam entram no FTS
+    op.execute("INSERT INTO search_fts(search_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("search_documents"):
+        op.create_table(
+            "search_documents",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("kind", sa.String(length=20), nullable=False),
+            sa.Column("ref_id", sa.String(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("chat_id", sa.String(), nullable=True),
+            sa.Column("title", sa.Text(), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("kind", "ref_id", name="uq_search_documents_kind_ref"),
+        )
+        inspector = sa.inspect(bind)
+    if "ix_search_documents_user_id" not in {i["name"] for i in inspector.get_indexes("search_documents")}:
+        op.create_index("ix_search_documents_user_id", "search_documents", ["user_id"])
+
+    if bind.dialect.name == "postgresql":
+        _upgrade_postgres(inspector)
+    elif bind.dialect.name == "sqlite":
+        _upgrade_sqlite(bind)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_fts")
+    op.drop_table("search_documents")
@@ -0,0 +1,181 @@
+"""colunas e tabelas de chat, anexos, jobs de vídeo e uso; seq das mensagens
+
+Bancos criados antes destas colunas não as recebem do db.create_all() (que
+só cria tabelas ausentes). Esta revisão acrescenta o que falta e numera as
+mensagens existentes (seq) antes de criar o índice único (chat_id, seq).
+Cada passo confere o schema antes, porque o create_all do boot já pode ter
+criado as tabelas novas.
+
+Revision ID: b7d41e2a9c01
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41e2a9c01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+NEW_COLUMNS = {
+    "chats": [
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("summary_message_id", sa.String(), nullable=True),
+        sa.Column("summary_updated_at", sa.DateTime(), nullable=True),
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_message_at", sa.DateTime(), nullable=True),
+        sa.Column("last_snippet", sa.String(length=160), nullable=True),
+        sa.Column("last_seq", sa.Integer(), nullable=False, server_default="0"),
+    ],
+    "chat_messages": [
+        sa.Column("seq", sa.Integer(), nullable=True),
+        sa.Column("token_count", sa.Integer(), nullable=True),
+    ],
+    "chat_attachments": [
+        sa.Column("extracted_text", sa.Text(), nullable=True),
+    ],
+}
+
+# (nome, tabela, colunas, unique)
+NEW_INDEXES = [
+    ("ix_chats_user_updated_id", "chats", ["user_id", "updated_at", "id"], False),
+    ("ix_generated_contents_user_created", "generated_contents", ["user_id", "created_at", "id"], False),
+]
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_table(table):
+    return _inspector().has_table(table)
+
+
+def _columns(table):
+    return {c["name"] for c in _inspector().get_columns(table)}
+
+
+def _indexes(table):
+    return {i["name"] for i in _inspector().get_indexes(table)}
+
+
+def _create_index(name, table, columns, unique=False):
+    if name not in _indexes(table):
+        op.create_index(name, table, columns, unique=unique)
+
+
+def _create_tables():
+    if not _has_table("provider_files"):
+        op.create_table(
+            "provider_files",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("attachment_id", sa.String(), nullable=False),
+            sa.Column("provider", sa.String(length=50), nullable=False),
+            sa.Column("remote_id", sa.String(length=255), nullable=False),
+            sa.Column("remote_uri", sa.String(length=600), nullable=True),
+            sa.Column("mimetype", sa.String(length=120), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["attachment_id"], ["chat_attachments.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("attachment_id", "provider", name="uq_provider_files_attachment_provider"),
+        )
+    _create_index("ix_provider_files_attachment_id", "provider_files", ["attachment_id"])
+
+    if not _has_table("video_jobs"):
+        op.create_table(
+            "video_jobs",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("prompt", sa.Text(), nullable=False),
+            sa.Column("model_used", sa.String(length=100), nullable=False),
+            sa.Column("ratio", sa.String(length=20), nullable=True),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("operation_name", sa.String(length=255), nullable=True),
+            sa.Column("progress", sa.Integer(), nullable=False),
+            sa.Column("poll_attempts", sa.Integer(), nullable=False),
+            sa.Column("next_poll_at", sa.DateTime(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("content_id", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["content_id"], ["generated_contents.id"], ondelete="SET NULL"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    _create_index("ix_video_jobs_user_id", "video_jobs", ["user_id"])
+    _create_index("ix_video_jobs_status", "video_jobs", ["status"])
+    _create_index("ix_video_jobs_next_poll_at", "video_jobs", ["next_poll_at"])
+
+    if not _has_table("usage_rollups"):
+        op.create_table(
+            "usage_rollups",
+            sa.Column("id", sa.String(), nullable=False),
+            sa.Column("user_id", sa.String(), nullable=False),
+            sa.Column("model", sa.String(length=120), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("requests", sa.Integer(), nullable=False),
+            sa.Column("prompt_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("completion_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("total_tokens", sa.BigInteger(), nullable=False),
+            sa.Column("cost_microusd", sa.BigInteger(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("user_id", "model", "day", name="uq_usage_rollup_user_model_day"),
+        )
+    _create_index("ix_usage_rollups_user_id", "usage_rollups", ["user_id"])
+    _create_index("ix_usage_rollups_day", "usage_rollups", ["day"])
+
+
+def _backfill_message_seq():
+    """Numera por chat, na ordem de created_at, só os chats com mensagens sem seq."""
+    op.execute(sa.text("""
+        UPDATE chat_messages SET seq = numbered.n
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY chat_id ORDER BY created_at, id) AS n
+            FROM chat_messages
+            WHERE chat_id IN (SELECT chat_id FROM chat_messages WHERE seq IS NULL)
+        ) AS numbered
+        WHERE chat_messages.id = numbered.id
+    """))
+    op.execute(sa.text("""
+        UPDATE chats SET last_seq = COALESCE(
+            (SELECT MAX(m.seq) FROM chat_messages m WHERE m.chat_id = chats.id), 0)
+    """))
+
+
+def upgrade():
+    for table, columns in NEW_COLUMNS.items():
+        existing = _columns(table)
+        for column in columns:
+            if column.name not in existing:
+                op.add_column(table, column)
+
+    _create_tables()
+    for name, table, columns, unique in NEW_INDEXES:
+        _create_index(name, table, columns, unique)
+
+    _backfill_message_seq()
+    # Só depois da numeração: mensagens antigas tinham seq NULL
+    _create_index("ix_chat_messages_chat_seq", "chat_messages", ["chat_id", "seq"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_chat_messages_chat_seq", table_name="chat_messages")
+    for name, table, _, _ in NEW_INDEXES:
+        op.drop_index(name, table_name=table)
+    op.drop_table("usage_rollups")
+    op.drop_table("video_jobs")
+    op.drop_table("provider_files")
+    for table, columns in NEW_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.drop_column(column.name)
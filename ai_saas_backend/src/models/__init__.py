@@ -13,7 +13,10 @@ from .plan import (
     Feature,
     PlanFeature,
 ) 
-from .chat import Chat, ChatMessage, ChatAttachment
+from .chat import Chat, ChatMessage, ChatAttachment, ProviderFile
+from .video_job import VideoJob, VideoJobStatus
+from .usage import UsageRollup
+from .search import SearchDocument
 
 __all__ = [
     "User",
@@ -27,7 +30,12 @@ __all__ = [
     "GeneratedVideoContent",
     "project_content_association",
     "Notification",
-    "Chat"
+    "Chat",
     "ChatMessage",
     "ChatAttachment",
+    "ProviderFile",
+    "VideoJob",
+    "VideoJobStatus",
+    "UsageRollup",
+    "SearchDocument",
 ]
\ No newline at end of file
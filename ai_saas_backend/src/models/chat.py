@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime
 from enum import Enum
+from sqlalchemy import inspect, update, func
+from sqlalchemy.orm.attributes import set_committed_value
 from extensions import db
 
 def generate_uuid():
@@ -12,8 +14,18 @@ class SenderType(str, Enum):
     SYSTEM = "system"
     TOOL = "tool"
 
+SNIPPET_LENGTH = 160
+
+def make_snippet(content, length=SNIPPET_LENGTH):
+    text = " ".join((content or "").split())
+    return text if len(text) <= length else text[:length - 3].rstrip() + "..."
+
 class Chat(db.Model):
     __tablename__ = "chats"
+    __table_args__ = (
+        # Listagem da sidebar: keyset em (updated_at, id) por usuário
+        db.Index("ix_chats_user_updated_id", "user_id", "updated_at", "id"),
+    )
 
     id = db.Column(db.String, primary_key=True, default=generate_uuid)
     user_id = db.Column(db.String, db.ForeignKey("users.id"), nullable=False, index=True)
@@ -23,6 +35,16 @@ class Chat(db.Model):
     provider = db.Column(db.String(50), nullable=True)
     archived = db.Column(db.Boolean, default=False)
     supports_vision = db.Column(db.Boolean, default=False)
+    # Resumo incremental da conversa até summary_message_id (inclusive)
+    summary = db.Column(db.Text, nullable=True)
+    summary_message_id = db.Column(db.String, nullable=True)
+    summary_updated_at = db.Column(db.DateTime, nullable=True)
+    # Resumo para a listagem, mantido na escrita de cada mensagem (record_message)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    last_snippet = db.Column(db.String(SNIPPET_LENGTH), nullable=True)
+    # Último ChatMessage.seq usado neste chat
+    last_seq = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -30,7 +52,7 @@ class Chat(db.Model):
         "ChatMessage",
         back_populates="chat",
         cascade="all, delete-orphan",
-        order_by="ChatMessage.created_at.asc()",
+        order_by="ChatMessage.seq.asc()",
         lazy=True,
     )
     user = db.relationship("User", backref=db.backref("chats", lazy=True))
@@ -38,6 +60,56 @@ class Chat(db.Model):
     def __repr__(self):
         return f"<Chat {self.id} title={self.title!r}>"
 
+    def record_message(self, message):
+        """
+        Dá à mensagem o próximo seq do chat e atualiza os campos de resumo.
+        Chamar ao criar a mensagem, antes do commit.
+        """
+        created_at = message.created_at or datetime.utcnow()
+        values = {"last_message_at": created_at, "updated_at": created_at}
+        if message.content:
+            values["last_snippet"] = make_snippet(message.content)
+
+        if not inspect(self).persistent:
+            self.last_seq = (self.last_seq or 0) + 1
+            self.message_count = (self.message_count or 0) + 1
+            for key, value in values.items():
+                setattr(self, key, value)
+            message.seq = self.last_seq
+            return message.seq
+
+        # Chat já gravado: incremento no próprio UPDATE, que trava a linha até o
+        # commit; dois turnos simultâneos nunca recebem o mesmo seq
+        with db.session.no_autoflush:
+            last_seq, message_count = db.session.execute(
+                update(Chat)
+                .where(Chat.id == self.id)
+                .values(
+                    last_seq=func.coalesce(Chat.last_seq, 0) + 1,
+                    message_count=func.coalesce(Chat.message_count, 0) + 1,
+                    **values,
+                )
+                .returning(Chat.last_seq, Chat.message_count)
+                .execution_options(synchronize_session=False)
+            ).one()
+        for key, value in {**values, "last_seq": last_seq, "message_count": message_count}.items():
+            set_committed_value(self, key, value)
+        message.seq = last_seq
+        return message.seq
+
+    def to_summary_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "archived": self.archived,
+            "message_count": self.message_count or 0,
+            "last_seq": self.last_seq or 0,
+            "last_message_at": self.last_message_at.isoformat() if self.last_message_at else None,
+            "snippet": self.last_snippet,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
     def to_dict(self, with_messages: bool = False, msg_limit: int | None = None):
         data = {
             "id": self.id,
@@ -51,17 +123,33 @@ class Chat(db.Model):
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
         if with_messages:
-            msgs = self.messages
             if msg_limit is not None:
-                msgs = msgs[-msg_limit:]
+                # Só as últimas msg_limit, limitadas no SQL; has_more/next_before como em /messages
+                rows = (
+                    ChatMessage.query.filter_by(chat_id=self.id)
+                    .order_by(ChatMessage.seq.desc())
+                    .limit(msg_limit + 1)
+                    .all()
+                )
+                msgs = list(reversed(rows[:msg_limit]))
+                data["has_more"] = len(rows) > msg_limit
+                data["next_before"] = msgs[0].seq if data["has_more"] else None
+            else:
+                msgs = self.messages
             data["messages"] = [m.to_dict() for m in msgs]
         return data
 
 class ChatMessage(db.Model):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Ordem do chat e paginação por ?before=<seq>
+        db.Index("ix_chat_messages_chat_seq", "chat_id", "seq", unique=True),
+    )
 
     id = db.Column(db.String, primary_key=True, default=generate_uuid)
     chat_id = db.Column(db.String, db.ForeignKey("chats.id"), nullable=False, index=True)
+    # Posição da mensagem no chat (1, 2, 3...), atribuída por Chat.record_message
+    seq = db.Column(db.Integer, nullable=True)
     user_id = db.Column(db.String, db.ForeignKey("users.id"), nullable=True, index=True)
     role = db.Column(db.String(20), nullable=False)
     content = db.Column(db.Text, nullable=False, default="")
@@ -72,6 +160,7 @@ class ChatMessage(db.Model):
     prompt_tokens = db.Column(db.Integer, nullable=True)
     completion_tokens = db.Column(db.Integer, nullable=True)
     total_tokens = db.Column(db.Integer, nullable=True)
+    token_count = db.Column(db.Integer, nullable=True)  # custo estimado da mensagem na janela de contexto
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     chat = db.relationship("Chat", back_populates="messages")
@@ -91,6 +180,7 @@ class ChatMessage(db.Model):
             "id": self.id,
             "chat_id": self.chat_id,
             "user_id": self.user_id,
+            "seq": self.seq,
             "role": self.role,
             "content": self.content,
             "model_used": self.model_used,
@@ -115,9 +205,16 @@ class ChatAttachment(db.Model):
     path = db.Column(db.String(600), nullable=False)
     mimetype = db.Column(db.String(120), nullable=False, default="application/octet-stream")
     size_bytes = db.Column(db.Integer, nullable=True)
+    extracted_text = db.Column(db.Text, nullable=True)  # texto do PDF, extraído no upload
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     message = db.relationship("ChatMessage", back_populates="attachments")
+    provider_files = db.relationship(
+        "ProviderFile",
+        back_populates="attachment",
+        cascade="all, delete-orphan",
+        lazy=True,
+    )
 
     def __repr__(self):
         return f"<ChatAttachment {self.id} name={self.name!r}>"
@@ -132,3 +229,28 @@ class ChatAttachment(db.Model):
             "url": f"/api/chats/attachments/{self.id}",
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+class ProviderFile(db.Model):
+    """Handle de um anexo já enviado à Files API de um provedor (Gemini, OpenAI, Anthropic)."""
+    __tablename__ = "provider_files"
+    __table_args__ = (
+        db.UniqueConstraint("attachment_id", "provider", name="uq_provider_files_attachment_provider"),
+    )
+
+    id = db.Column(db.String, primary_key=True, default=generate_uuid)
+    attachment_id = db.Column(db.String, db.ForeignKey("chat_attachments.id"), nullable=False, index=True)
+    provider = db.Column(db.String(50), nullable=False)
+    remote_id = db.Column(db.String(255), nullable=False)
+    remote_uri = db.Column(db.String(600), nullable=True)
+    mimetype = db.Column(db.String(120), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)  # None = não expira
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    attachment = db.relationship("ChatAttachment", back_populates="provider_files")
+
+    def is_valid(self, now=None):
+        return self.expires_at is None or self.expires_at > (now or datetime.utcnow())
+
+    def __repr__(self):
+        return f"<ProviderFile {self.provider}:{self.remote_id}>"
@@ -8,6 +8,10 @@ def generate_uuid():
 
 class GeneratedContent(db.Model):
     __tablename__ = "generated_contents"
+    __table_args__ = (
+        # Galeria: conteúdos do usuário do mais recente para o mais antigo (keyset)
+        db.Index("ix_generated_contents_user_created", "user_id", "created_at", "id"),
+    )
 
     id = db.Column(db.String, primary_key=True, default=generate_uuid)
     user_id = db.Column(db.String, db.ForeignKey("users.id"), nullable=False)
@@ -30,13 +34,15 @@ class GeneratedContent(db.Model):
     __mapper_args__ = {
         "polymorphic_on": content_type,
         "polymorphic_identity": "base",
-        "with_polymorphic": "*"
     }
 
     def __repr__(self):
         return f"<GeneratedContent {self.content_type}>"
 
-    def base_dict(self):
+    def base_dict(self, project_ids=None):
+        """project_ids: ids já carregados em lote pela listagem; sem eles lê self.projects."""
+        if project_ids is None:
+            project_ids = [p.id for p in self.projects]
         return {
             "id": self.id,
             "user_id": self.user_id,
@@ -46,7 +52,7 @@ class GeneratedContent(db.Model):
             "content_data": self.content_data,
             "file_path": self.file_path,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "projects": [p.id for p in self.projects]
+            "projects": project_ids
         }
 
 class GeneratedTextContent(GeneratedContent):
@@ -57,10 +63,12 @@ class GeneratedTextContent(GeneratedContent):
 
     __mapper_args__ = {
         "polymorphic_identity": "text",
+        # Colunas da subclasse num SELECT ... IN por tipo presente no resultado
+        "polymorphic_load": "selectin",
     }
 
-    def to_dict(self):
-        data = self.base_dict()
+    def to_dict(self, project_ids=None):
+        data = self.base_dict(project_ids)
         data.update({"temperature": self.temperature})
         return data
 
@@ -73,10 +81,11 @@ class GeneratedImageContent(GeneratedContent):
 
     __mapper_args__ = {
         "polymorphic_identity": "image",
+        "polymorphic_load": "selectin",
     }
 
-    def to_dict(self):
-        data = self.base_dict()
+    def to_dict(self, project_ids=None):
+        data = self.base_dict(project_ids)
         data.update({
             "style": self.style,
             "ratio": self.ratio
@@ -93,10 +102,11 @@ class GeneratedVideoContent(GeneratedContent):
 
     __mapper_args__ = {
         "polymorphic_identity": "video",
+        "polymorphic_load": "selectin",
     }
 
-    def to_dict(self):
-        data = self.base_dict()
+    def to_dict(self, project_ids=None):
+        data = self.base_dict(project_ids)
         data.update({
             "style": self.style,
             "ratio": self.ratio,
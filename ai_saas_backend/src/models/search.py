@@ -0,0 +1,59 @@
+import os
+from datetime import datetime
+from sqlalchemy import event, DDL
+from extensions import db
+
+# Dicionário do Postgres usado para stemming e stopwords
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "portuguese")
+
+class SearchDocument(db.Model):
+    """
+    Um documento pesquisável por registro indexado (chat, mensagem, conteúdo
+    gerado ou projeto), mantido por utils.search. O índice full-text fica
+    fora do modelo: coluna tsvector + GIN no Postgres, tabela FTS5 no SQLite.
+    """
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "ref_id", name="uq_search_documents_kind_ref"),
+    )
+
+    # Inteiro para servir de rowid da tabela FTS5
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(20), nullable=False)  # chat, message, content, project
+    ref_id = db.Column(db.String, nullable=False)
+    user_id = db.Column(db.String, nullable=False, index=True)
+    chat_id = db.Column(db.String, nullable=True)
+    title = db.Column(db.Text, nullable=False, default="")
+    body = db.Column(db.Text, nullable=False, default="")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+_table = SearchDocument.__table__
+
+# Postgres: tsvector gerado (título com peso A, corpo com peso B) + índice GIN
+event.listen(_table, "after_create", DDL(
+    "ALTER TABLE search_documents ADD COLUMN tsv tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(body, '')), 'B')) STORED"
+).execute_if(dialect="postgresql"))
+event.listen(_table, "after_create", DDL(
+    "CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)"
+).execute_if(dialect="postgresql"))
+
+# SQLite: FTS5 com conteúdo externo, sincronizado por triggers
+_SQLITE_FTS = [
+    "DROP TABLE IF EXISTS search_fts",
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "title, body, content='search_documents', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+for statement in _SQLITE_FTS:
+    event.listen(_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(_table, "before_drop", DDL("DROP TABLE IF EXISTS search_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,36 @@
+import uuid
+from datetime import datetime
+from extensions import db
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+class UsageRollup(db.Model):
+    """Uso agregado por usuário, modelo e dia (copiado dos contadores do Redis)."""
+    __tablename__ = "usage_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "model", "day", name="uq_usage_rollup_user_model_day"),
+    )
+
+    id = db.Column(db.String, primary_key=True, default=generate_uuid)
+    user_id = db.Column(db.String, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    model = db.Column(db.String(120), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    completion_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    total_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    cost_microusd = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "model": self.model,
+            "day": self.day.isoformat(),
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": self.cost_microusd / 1_000_000,
+        }
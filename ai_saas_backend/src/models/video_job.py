@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime
+from enum import Enum
+from extensions import db
+
+def generate_uuid():
+    return str(uuid.uuid4())
+
+class VideoJobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DOWNLOADING = "downloading"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class VideoJob(db.Model):
+    __tablename__ = "video_jobs"
+
+    id = db.Column(db.String, primary_key=True, default=generate_uuid)
+    user_id = db.Column(db.String, db.ForeignKey("users.id"), nullable=False, index=True)
+    prompt = db.Column(db.Text, nullable=False)
+    model_used = db.Column(db.String(100), nullable=False)
+    ratio = db.Column(db.String(20), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=VideoJobStatus.PENDING.value, index=True)
+    operation_name = db.Column(db.String(255), nullable=True)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    poll_attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_poll_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    error = db.Column(db.Text, nullable=True)
+    content_id = db.Column(db.String, db.ForeignKey("generated_contents.id", ondelete="SET NULL"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship("User", backref=db.backref("video_jobs", lazy=True, cascade="all, delete-orphan"))
+
+    @property
+    def is_finished(self):
+        return self.status in (VideoJobStatus.COMPLETED.value, VideoJobStatus.FAILED.value)
+
+    def __repr__(self):
+        return f"<VideoJob {self.id} status={self.status}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "prompt": self.prompt,
+            "model_used": self.model_used,
+            "ratio": self.ratio,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "content_id": self.content_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+        }
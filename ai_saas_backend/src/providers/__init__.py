@@ -0,0 +1,42 @@
+from .base import (
+    ProviderAdapter,
+    ProviderBusyError,
+    GenerationRequest,
+    GenerationResult,
+)
+from .retry import CircuitOpenError, ProviderHTTPError, call_with_retry
+from .registry import (
+    ModelCapabilities,
+    MODEL_CAPABILITIES,
+    get_capabilities,
+    get_adapter,
+    register_adapter,
+    adapters,
+)
+from .openai_compat import OpenAIAdapter, PerplexityAdapter, OpenRouterAdapter
+from .gemini import GeminiAdapter
+from .claude import ClaudeAdapter
+
+for _adapter_cls in (OpenAIAdapter, PerplexityAdapter, OpenRouterAdapter, GeminiAdapter, ClaudeAdapter):
+    register_adapter(_adapter_cls())
+
+__all__ = [
+    "ProviderAdapter",
+    "ProviderBusyError",
+    "GenerationRequest",
+    "GenerationResult",
+    "CircuitOpenError",
+    "ProviderHTTPError",
+    "call_with_retry",
+    "ModelCapabilities",
+    "MODEL_CAPABILITIES",
+    "get_capabilities",
+    "get_adapter",
+    "register_adapter",
+    "adapters",
+    "OpenAIAdapter",
+    "PerplexityAdapter",
+    "OpenRouterAdapter",
+    "GeminiAdapter",
+    "ClaudeAdapter",
+]
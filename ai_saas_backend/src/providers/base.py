@@ -0,0 +1,146 @@
+"""
+Interface comum dos provedores de texto.
+
+Cada adapter sabe montar o payload do seu provedor (build_payload), enviá-lo
+(send), fazer streaming (stream) e normalizar o uso de tokens (parse_usage).
+O limite de chamadas simultâneas e o timeout são configurados por adapter:
+PROVIDER_<NOME>_MAX_CONCURRENCY e PROVIDER_<NOME>_TIMEOUT. Retry e circuit
+breaker ficam em providers.retry, por provedor:modelo.
+"""
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from providers.retry import call_with_retry, get_breaker, record_outcome
+
+load_dotenv()
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "16"))
+DEFAULT_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "120"))
+# Quanto uma requisição espera por uma vaga antes de desistir
+SLOT_WAIT_SECONDS = float(os.getenv("PROVIDER_SLOT_WAIT_SECONDS", "30"))
+
+class ProviderBusyError(Exception):
+    """Todas as vagas de concorrência do provedor estão ocupadas."""
+
+class GenerationRequest:
+    """Um turno pronto para envio: mensagens já recortadas pela janela de contexto."""
+    def __init__(self, model, session_messages, context, user_input, temperature):
+        self.model = model
+        self.session_messages = session_messages
+        self.context = context
+        self.user_input = user_input
+        self.temperature = temperature
+
+class GenerationResult:
+    def __init__(self, text="", images=None, usage=None, raw=None):
+        self.text = text
+        self.images = images or []  # bytes de cada imagem gerada
+        self.usage = usage
+        self.raw = raw
+
+def remove_think_blocks(text):
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
+
+def strip_think_blocks_stream(deltas):
+    """Versão incremental de remove_think_blocks: descarta <think>...</think> mesmo quebrado entre chunks."""
+    open_tag, close_tag = "<think>", "</think>"
+    buffer = ""
+    inside = False
+
+    for delta in deltas:
+        buffer += delta
+        while buffer:
+            if inside:
+                end = buffer.find(close_tag)
+                if end == -1:
+                    buffer = buffer[-(len(close_tag) - 1):]
+                    break
+                buffer = buffer[end + len(close_tag):]
+                inside = False
+            else:
+                start = buffer.find(open_tag)
+                if start == -1:
+                    # Segura o final caso seja o começo de uma tag
+                    keep = len(open_tag) - 1
+                    if len(buffer) > keep:
+                        yield buffer[:-keep]
+                        buffer = buffer[-keep:]
+                    break
+                if start:
+                    yield buffer[:start]
+                buffer = buffer[start + len(open_tag):]
+                inside = True
+
+    if buffer and not inside:
+        yield buffer
+
+class ProviderAdapter:
+    name = None
+
+    def __init__(self):
+        prefix = f"PROVIDER_{self.name.upper()}"
+        self.max_concurrency = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY)))
+        self.timeout = float(os.getenv(f"{prefix}_TIMEOUT", str(DEFAULT_TIMEOUT)))
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def build_payload(self, req):
+        raise NotImplementedError
+
+    def send(self, payload):
+        """Envia o payload e devolve um GenerationResult."""
+        raise NotImplementedError
+
+    def stream(self, payload, usage):
+        """
+        Envia o payload em modo streaming, devolvendo os trechos de texto.
+        O uso de tokens, quando o provedor informa, é gravado no dict `usage`.
+        """
+        raise NotImplementedError
+
+    def parse_usage(self, raw):
+        """Uso de tokens no formato {prompt_tokens, completion_tokens, total_tokens}, ou None."""
+        return None
+
+    def breaker_key(self, model):
+        return f"{self.name}:{model}"
+
+    def call(self, model, fn):
+        """Executa fn(timeout) com retry, prazo total e circuit breaker do modelo."""
+        return call_with_retry(fn, self.breaker_key(model), timeout=self.timeout)
+
+    @contextmanager
+    def slot(self):
+        if not self._slots.acquire(timeout=SLOT_WAIT_SECONDS):
+            raise ProviderBusyError(f"Provedor {self.name} sem vagas ({self.max_concurrency} chamadas em andamento)")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def generate(self, req):
+        payload = self.build_payload(req)
+        with self.slot():
+            return self.send(payload)
+
+    def open_stream(self, req, usage=None):
+        """
+        Monta o payload na thread da requisição e devolve um iterador que só
+        faz I/O de rede. A vaga de concorrência é ocupada durante o stream.
+        """
+        usage = {} if usage is None else usage
+        payload = self.build_payload(req)
+        breaker = get_breaker(self.breaker_key(req.model))
+
+        def deltas():
+            # Sem retry no meio do stream (o texto já foi enviado), mas as falhas contam no breaker
+            with self.slot():
+                breaker.before_call()
+                try:
+                    yield from self.stream(payload, usage)
+                except Exception as e:
+                    record_outcome(breaker, e)
+                    raise
+                record_outcome(breaker)
+
+        return deltas()
@@ -0,0 +1,53 @@
+"""
+Adapter da Anthropic (Claude). Com ANTHROPIC_FILES_API ativo, as chamadas
+passam pelo endpoint beta para aceitar imagens referenciadas por file_id.
+"""
+from utils.provider_clients import get_anthropic_client
+from utils.context_window import get_model_limits
+from utils.provider_files import ANTHROPIC_FILES_API, ANTHROPIC_FILES_BETA
+from providers.base import ProviderAdapter, GenerationResult
+from providers.messages import build_messages_for_claude
+
+def claude_messages_api():
+    """Com a Files API da Anthropic ativa, as chamadas passam pelo endpoint beta."""
+    # Retry fica com providers.retry, não com o SDK
+    client = get_anthropic_client().with_options(max_retries=0)
+    if ANTHROPIC_FILES_API:
+        return client.beta.messages, {"betas": [ANTHROPIC_FILES_BETA]}
+    return client.messages, {}
+
+def create_claude_message(payload, timeout=None):
+    """Uma tentativa; o retry fica com ClaudeAdapter.call."""
+    messages_api, extra = claude_messages_api()
+    return messages_api.create(**payload, timeout=timeout, **extra)
+
+class ClaudeAdapter(ProviderAdapter):
+    name = "anthropic"
+
+    def build_payload(self, req):
+        return {
+            "model": req.model,
+            "messages": build_messages_for_claude(req.session_messages),
+            "temperature": req.temperature,
+            "max_tokens": get_model_limits(req.model).max_output_tokens,
+        }
+
+    def parse_usage(self, raw):
+        usage = getattr(raw, "usage", None)
+        if usage is None:
+            return None
+        prompt = getattr(usage, "input_tokens", None)
+        completion = getattr(usage, "output_tokens", None)
+        total = prompt + completion if prompt is not None and completion is not None else None
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": total}
+
+    def send(self, payload):
+        response = self.call(payload["model"], lambda timeout: create_claude_message(payload, timeout))
+        text = "".join(block.text for block in response.content if block.type == "text")
+        return GenerationResult(text=text, usage=self.parse_usage(response), raw=response)
+
+    def stream(self, payload, usage):
+        messages_api, extra = claude_messages_api()
+        with messages_api.stream(**payload, timeout=self.timeout, **extra) as stream:
+            yield from stream.text_stream
+            usage.update(self.parse_usage(stream.get_final_message()) or {})
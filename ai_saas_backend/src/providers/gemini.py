@@ -0,0 +1,87 @@
+"""
+Adapter do Gemini. Imagens podem vir inline na resposta; se o usuário pediu
+imagem e nada veio, gera pelo Imagen.
+"""
+import base64
+from google.genai import types
+from utils.provider_clients import get_gemini_client
+from utils.image_intent import start_image_intent
+from providers.base import ProviderAdapter, GenerationResult
+from providers.messages import build_parts_for_gemini
+
+IMAGEN_FALLBACK_MODEL = "imagen-4.0-fast-generate-001"
+
+class GeminiAdapter(ProviderAdapter):
+    name = "gemini"
+
+    def request_config(self, timeout=None):
+        timeout = timeout or self.timeout
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
+    def build_payload(self, req):
+        return {
+            "model": req.model,
+            "parts": build_parts_for_gemini(req.context, req.user_input),
+            "user_input": req.user_input,
+        }
+
+    def parse_usage(self, raw):
+        usage = getattr(raw, "usage_metadata", None)
+        if usage is None:
+            return None
+        return {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None),
+            "total_tokens": getattr(usage, "total_token_count", None),
+        }
+
+    def send(self, payload):
+        client = get_gemini_client()
+        gemini_chat = client.chats.create(model=payload["model"])
+
+        # Classificador local; casos ambíguos vão ao LLM em paralelo com a chamada principal
+        image_intent = start_image_intent(payload["user_input"])
+        response = self.call(payload["model"], lambda timeout: gemini_chat.send_message(
+            payload["parts"], config=self.request_config(timeout)
+        ))
+
+        text = None
+        images = []
+        for cand in getattr(response, "candidates", None) or []:
+            for part in getattr(cand.content, "parts", None) or []:
+                if getattr(part, "text", None):
+                    text = part.text
+                elif getattr(part, "inline_data", None):
+                    data = part.inline_data.data
+                    try:
+                        images.append(base64.b64decode(data))
+                    except Exception:
+                        images.append(data)
+
+        # ---------- SE USUÁRIO PEDIU IMAGEM E NÃO VEIO INLINE ----------
+        if not images and image_intent.result():
+            try:
+                print("[INFO] Gerando imagem via API do Gemini...")
+                img_response = self.call(IMAGEN_FALLBACK_MODEL, lambda timeout: client.models.generate_images(
+                    model=IMAGEN_FALLBACK_MODEL,
+                    prompt=payload["user_input"],
+                    config=types.GenerateImagesConfig(
+                        number_of_images=1,
+                        aspect_ratio="1:1",
+                        http_options=types.HttpOptions(timeout=int(timeout * 1000))
+                    )
+                ))
+                if img_response.generated_images:
+                    images.append(img_response.generated_images[0].image.image_bytes)
+            except Exception as e:
+                print(f"[ERROR] Falha ao gerar imagem via API: {e}")
+
+        return GenerationResult(text=text or "[Sem retorno]", images=images, usage=self.parse_usage(response), raw=response)
+
+    def stream(self, payload, usage):
+        gemini_chat = get_gemini_client().chats.create(model=payload["model"])
+        for chunk in gemini_chat.send_message_stream(payload["parts"], config=self.request_config()):
+            usage.update(self.parse_usage(chunk) or {})
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
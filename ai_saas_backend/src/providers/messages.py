@@ -0,0 +1,261 @@
+"""
+Montagem das mensagens/partes no formato de cada provedor a partir das
+session_messages do turno ({"role", "content", "attachments"}).
+"""
+import os
+from dotenv import load_dotenv
+from google.genai import types
+from models.chat import ChatAttachment
+from utils.attachment_cache import attachment_cache
+from utils.pdf_text import extract_pdf_text
+from utils.provider_files import get_provider_file, ANTHROPIC_FILES_API
+from providers.registry import get_capabilities
+
+load_dotenv()
+# Modelos sem visão recebem só o nome dos anexos; com a flag, o texto dos PDFs
+# vai junto (mais tokens por turno, já que o histórico inteiro é reenviado)
+PDF_TEXT_FOR_TEXT_MODELS = os.getenv("PDF_TEXT_FOR_TEXT_MODELS", "false").lower() == "true"
+
+def to_data_url(path: str, mimetype: str) -> str:
+    return attachment_cache.get(path, mimetype, "data_url")
+
+def generate_system_message(model: str):
+    if get_capabilities(model).image_generation:
+        return {
+            "role": "system",
+            "content": (
+                "Você é uma IA de chat da plataforma Artificiall.\n"
+                "📌 Funções disponíveis:\n"
+                "- Geração de texto: todos os modelos.\n"
+                "- Geração de imagens: apenas modelos GPT.\n"
+                "⚠️ Importante:\n"
+                f"- O Modelo atual PERMITE GERAR: {model}\n"
+                "- Você pode gerar imagens quando o usuário pedir.\n"
+                "- Não gere imagens automaticamente se o usuário não pediu.\n"
+                "- Sempre use o modelo atual para decidir o que é possível."
+            )
+        }
+    else:
+        return {
+            "role": "system",
+            "content": (
+                "Você é uma IA de chat da plataforma Artificiall.\n"
+                "📌 Funções disponíveis:\n"
+                "- Geração de texto: todos os modelos.\n"
+                "- Geração de imagens: **não disponível** neste modelo.\n"
+                "- Se o usuário pedir para gerar imagens, responda educadamente que o modelo atual selecionado não suporta."
+            )
+        }
+
+def get_pdf_text(att):
+    """Texto salvo no anexo; anexos antigos (sem texto) são extraídos uma vez e gravados."""
+    pdf_text = getattr(att, "extracted_text", None)
+    if pdf_text is None:
+        pdf_text = extract_pdf_text(att.path)
+        if isinstance(att, ChatAttachment):
+            att.extracted_text = pdf_text  # persistido no próximo commit da sessão
+    return pdf_text
+
+def pdf_text_block(name, pdf_text):
+    if pdf_text.strip():
+        return f"[Conteúdo extraído do PDF '{name}']\n\n{pdf_text}"
+    return f"[PDF '{name}' não contém texto extraível]"
+
+def remote_file_for(att, provider):
+    """Handle do anexo na Files API do provedor; None se não for possível enviar."""
+    if not isinstance(att, ChatAttachment):
+        return None
+    try:
+        return get_provider_file(att, provider)
+    except Exception as e:
+        print(f"[WARN] Falha ao enviar {att.name} para a Files API ({provider}), usando conteúdo inline: {e}")
+        return None
+
+def build_messages_for_openai(session_messages, model: str, use_file_ids: bool = False):
+    """use_file_ids: referencia PDFs pelo file_id da Files API (só na API da OpenAI)."""
+    messages = []
+
+    caps = get_capabilities(model)
+    if caps.system_prompt:
+        system_msg = generate_system_message(model)
+        messages.append(system_msg)
+    else:
+        print(f"[DEBUG] Modelo {model} não aceita system message, pulando")
+    vision_ok = caps.vision
+
+    for m in session_messages:
+        role = m.get("role") if isinstance(m, dict) else getattr(m, "role", "user")
+        text = m.get("content") if isinstance(m, dict) else getattr(m, "content", "")
+        attachments = []
+
+        if hasattr(m, "attachments") and m.attachments is not None:
+            attachments = [a.to_dict() for a in m.attachments]
+        elif isinstance(m, dict):
+            attachments = m.get("attachments", [])
+
+        if not attachments:
+            msg = {"role": role, "content": text}
+            messages.append(msg)
+            continue
+
+        if vision_ok:
+            parts = [{"type": "text", "text": text}] if text.strip() else []
+            non_images = []
+
+            for att in attachments:
+                mimetype = att["mimetype"] if isinstance(att, dict) else att.mimetype
+                path = att["path"] if isinstance(att, dict) else att.path
+                name = att.get("name") if isinstance(att, dict) else att.name
+
+                if mimetype.startswith("image/") and os.path.exists(path):
+                    if role == "assistant":
+                        print(f"[DEBUG] Pulando carregamento de imagem do assistant: {name}")
+                    else:
+                        img_part = {"type": "image_url", "image_url": {"url": to_data_url(path, mimetype)}}
+                        parts.append(img_part)
+                elif mimetype == "application/pdf" and os.path.exists(path):
+                    handle = remote_file_for(att, "openai") if use_file_ids else None
+                    if handle is not None:
+                        pdf_part = {"type": "file", "file": {"file_id": handle.remote_id}}
+                    else:
+                        pdf_part = {
+                            "type": "file",
+                            "file": {"filename": name, "file_data": to_data_url(path, mimetype)}
+                        }
+                    parts.append(pdf_part)
+                else:
+                    non_images.append(name)
+
+            if non_images:
+                ni_part = {"type": "text", "text": f"Arquivos anexados (não-imagem): {', '.join(non_images)}"}
+                parts.append(ni_part)
+
+            msg = {"role": role, "content": parts}
+            messages.append(msg)
+
+        else:
+            names = ", ".join([a["name"] if isinstance(a, dict) else a.name for a in attachments])
+            merge_text = (text + "\n\n" if text else "") + (f"[Anexos]: {names}" if names else text)
+            if PDF_TEXT_FOR_TEXT_MODELS:
+                for att in attachments:
+                    if isinstance(att, ChatAttachment) and att.mimetype == "application/pdf" and os.path.exists(att.path):
+                        merge_text += "\n\n" + pdf_text_block(att.name, get_pdf_text(att))
+            msg = {"role": role, "content": merge_text}
+            messages.append(msg)
+
+    return messages
+
+def to_responses_input(messages):
+    """Converte mensagens no formato chat/completions para o `input` da Responses API."""
+    items = []
+    for msg in messages:
+        role, content = msg["role"], msg["content"]
+        if isinstance(content, str):
+            items.append({"role": role, "content": content})
+            continue
+
+        text_type = "output_text" if role == "assistant" else "input_text"
+        parts = []
+        for part in content:
+            if part["type"] == "text":
+                parts.append({"type": text_type, "text": part["text"]})
+            elif part["type"] == "image_url":
+                parts.append({"type": "input_image", "image_url": part["image_url"]["url"]})
+            elif part["type"] == "file":
+                parts.append({"type": "input_file", **part["file"]})
+        items.append({"role": role, "content": parts})
+    return items
+
+def build_messages_for_claude(session_messages):
+    messages = []
+
+    for m in session_messages:
+        role = m.get("role")
+        text = m.get("content", "")
+        attachments = m.get("attachments", [])
+
+        if role not in ("user", "assistant"):
+            role = "user"
+
+        content_blocks = []
+
+        if text:
+            content_blocks.append({
+                "type": "text",
+                "text": text
+            })
+
+        for att in attachments:
+            mimetype = getattr(att, "mimetype", None)
+            path = getattr(att, "path", None)
+            name = getattr(att, "name", "arquivo")
+
+            if not path or not os.path.exists(path):
+                continue
+
+            # 🖼️ IMAGEM
+            if mimetype and mimetype.startswith("image/"):
+                handle = remote_file_for(att, "anthropic") if ANTHROPIC_FILES_API else None
+                if handle is not None:
+                    content_blocks.append({
+                        "type": "image",
+                        "source": {"type": "file", "file_id": handle.remote_id}
+                    })
+                    continue
+
+                img_base64 = attachment_cache.get(path, mimetype, "base64")
+
+                content_blocks.append({
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": mimetype,
+                        "data": img_base64
+                    }
+                })
+
+            # 📄 PDF → TEXTO (extraído no upload)
+            elif mimetype == "application/pdf":
+                content_blocks.append({
+                    "type": "text",
+                    "text": pdf_text_block(name, get_pdf_text(att))
+                })
+
+        if not content_blocks:
+            continue
+
+        messages.append({
+            "role": role,
+            "content": content_blocks
+        })
+
+    return messages
+
+def build_parts_for_gemini(history, user_input):
+    parts = []
+
+    for m in history:
+        if m.content:
+            parts.append(m.content)
+
+        for att in getattr(m, "attachments", []):
+            path = getattr(att, "path", None)
+            mimetype = getattr(att, "mimetype", "")
+            name = getattr(att, "name", "arquivo")
+            if not path or not os.path.exists(path):
+                continue
+
+            if mimetype.startswith("image/") or mimetype == "application/pdf":
+                handle = remote_file_for(att, "gemini")
+                if handle is not None:
+                    parts.append(types.Part.from_uri(file_uri=handle.remote_uri, mime_type=mimetype))
+                else:
+                    with open(path, "rb") as f:
+                        parts.append(types.Part.from_bytes(data=f.read(), mime_type=mimetype))
+            else:
+                parts.append(f"[Anexo não suportado: {name}]")
+
+    if user_input:
+        parts.append(user_input)
+
+    return parts
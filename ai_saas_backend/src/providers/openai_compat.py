@@ -0,0 +1,199 @@
+"""
+Adapters dos provedores com API no formato chat/completions da OpenAI:
+OpenAI, Perplexity e OpenRouter. Nos modelos GPT que geram imagem, a OpenAI
+usa a Responses API com a ferramenta image_generation numa única chamada.
+"""
+import os
+import json
+import base64
+from dotenv import load_dotenv
+from utils.provider_clients import http_client_for, get_openai_client, OPENAI_API_KEY
+from providers.base import ProviderAdapter, GenerationResult, remove_think_blocks, strip_think_blocks_stream
+from providers.messages import build_messages_for_openai, to_responses_input
+from providers.registry import get_capabilities
+from providers.retry import ProviderHTTPError
+
+load_dotenv()
+PPLX_API_KEY = os.getenv("PPLX_API_KEY")
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+
+def post_chat_completions(url, headers, body, timeout=None):
+    """Uma tentativa; respostas de erro viram ProviderHTTPError para o retry classificar."""
+    response = http_client_for(url).post(url, headers=headers, json=body, timeout=timeout)
+    if response.status_code >= 400:
+        raise ProviderHTTPError(response)
+    return response
+
+def iter_openai_compatible_stream(endpoint, headers, body, timeout=None):
+    """Chama um endpoint /chat/completions com stream=True e devolve cada chunk JSON."""
+    with http_client_for(endpoint).stream("POST", endpoint, headers=headers, json={**body, "stream": True}, timeout=timeout) as r:
+        if r.status_code != 200:
+            r.read()
+            raise ProviderHTTPError(r)
+
+        for line in r.iter_lines():
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            yield json.loads(payload)
+
+def iter_chunk_text(chunks, citations=None, usage=None):
+    for chunk in chunks:
+        if citations is not None and chunk.get("citations"):
+            citations[:] = chunk["citations"]
+        if usage is not None and chunk.get("usage"):
+            usage.update(chunk["usage"])
+
+        for choice in chunk.get("choices", []):
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+def format_citations(citations):
+    if not citations:
+        return ""
+    return "\n\n🔗 Links\n" + "".join(f"{i}. {url}\n" for i, url in enumerate(citations, start=1))
+
+class ChatCompletionsAdapter(ProviderAdapter):
+    endpoint = None
+
+    def api_key(self):
+        raise NotImplementedError
+
+    def build_body(self, req):
+        return {
+            "model": req.model,
+            "messages": build_messages_for_openai(req.session_messages, req.model),
+            "temperature": req.temperature
+        }
+
+    def build_payload(self, req):
+        return {
+            "endpoint": self.endpoint,
+            "headers": {"Authorization": f"Bearer {self.api_key()}", "Content-Type": "application/json"},
+            "body": self.build_body(req),
+        }
+
+    def parse_usage(self, raw):
+        usage = (raw or {}).get("usage") or {}
+        if not usage:
+            return None
+        return {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+        }
+
+    def parse_text(self, data):
+        return data["choices"][0]["message"]["content"]
+
+    def send(self, payload):
+        response = self.call(payload["body"]["model"], lambda timeout: post_chat_completions(
+            payload["endpoint"], payload["headers"], payload["body"], timeout=timeout
+        ))
+        try:
+            data = response.json()
+        except Exception:
+            raise Exception(f"Resposta {self.name} não é JSON: {response.text[:1000]}")
+        return GenerationResult(text=self.parse_text(data), usage=self.parse_usage(data), raw=data)
+
+    def stream(self, payload, usage):
+        chunks = iter_openai_compatible_stream(payload["endpoint"], payload["headers"], payload["body"], timeout=self.timeout)
+        yield from iter_chunk_text(chunks, usage=usage)
+
+class PerplexityAdapter(ChatCompletionsAdapter):
+    name = "perplexity"
+    endpoint = "https://api.perplexity.ai/chat/completions"
+
+    def api_key(self):
+        return PPLX_API_KEY
+
+    def parse_text(self, data):
+        text = remove_think_blocks(data["choices"][0]["message"]["content"]).strip()
+        return text + format_citations(data.get("citations") or [])
+
+    def stream(self, payload, usage):
+        citations = []
+        chunks = iter_openai_compatible_stream(payload["endpoint"], payload["headers"], payload["body"], timeout=self.timeout)
+        yield from strip_think_blocks_stream(iter_chunk_text(chunks, citations, usage))
+        if citations:
+            yield format_citations(citations)
+
+class OpenRouterAdapter(ChatCompletionsAdapter):
+    name = "openrouter"
+    endpoint = "https://openrouter.ai/api/v1/chat/completions"
+
+    def api_key(self):
+        return OPENROUTER_API_KEY
+
+class OpenAIAdapter(ChatCompletionsAdapter):
+    name = "openai"
+    endpoint = "https://api.openai.com/v1/chat/completions"
+    image_tools = [{"type": "image_generation"}]
+
+    def api_key(self):
+        return OPENAI_API_KEY
+
+    def build_body(self, req):
+        body = {"model": req.model, "messages": build_messages_for_openai(req.session_messages, req.model, use_file_ids=True)}
+        if not get_capabilities(req.model).fixed_temperature:
+            body["temperature"] = req.temperature
+        return body
+
+    def build_payload(self, req):
+        payload = super().build_payload(req)
+        # Modelos que geram imagem: texto e imagem numa única chamada à Responses API
+        payload["responses"] = get_capabilities(req.model).image_generation
+        return payload
+
+    def stream(self, payload, usage):
+        # A OpenAI só manda o uso no último chunk se for pedido
+        body = {**payload["body"], "stream_options": {"include_usage": True}}
+        yield from super().stream({**payload, "body": body}, usage)
+
+    def send(self, payload):
+        if not payload["responses"]:
+            return super().send(payload)
+
+        try:
+            return self.send_responses(payload["body"], tools=self.image_tools)
+        except Exception as e:
+            if "moderation_blocked" not in str(e):
+                raise
+            print("[WARN] Geração de imagem bloqueada pelo sistema de moderação da OpenAI")
+            result = self.send_responses(payload["body"])
+            result.text += "\n⚠️ A imagem não pôde ser gerada porque os termos utilizados não passaram pelo sistema de segurança."
+            return result
+
+    def send_responses(self, body, tools=None):
+        request = {"model": body["model"], "input": to_responses_input(body["messages"])}
+        if tools:
+            request["tools"] = tools
+        if "temperature" in body:
+            request["temperature"] = body["temperature"]
+
+        # Retry fica com providers.retry, não com o SDK
+        client = get_openai_client().with_options(max_retries=0)
+        response = self.call(body["model"], lambda timeout: client.responses.create(**request, timeout=timeout))
+        images = [
+            base64.b64decode(o.result) for o in (getattr(response, "output", None) or [])
+            if getattr(o, "type", "") == "image_generation_call" and getattr(o, "result", None)
+        ]
+        return GenerationResult(
+            text=(response.output_text or "").strip(),
+            images=images,
+            usage=self.parse_responses_usage(response),
+            raw=response
+        )
+
+    def parse_responses_usage(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        return {
+            "prompt_tokens": getattr(usage, "input_tokens", None),
+            "completion_tokens": getattr(usage, "output_tokens", None),
+            "total_tokens": getattr(usage, "total_tokens", None),
+        }
@@ -0,0 +1,99 @@
+"""
+Registro modelo → adapter/capacidades.
+
+As capacidades de cada modelo ficam numa tabela única, só de leitura.
+Modelos fora da tabela são resolvidos pelas regras de prefixo antigas e
+memorizados num cache LRU próprio: o nome vem do cliente e não deve entrar
+em MODEL_CAPABILITIES.
+"""
+from functools import lru_cache
+
+OPENROUTER_PREFIXES = ("deepseek/", "google/", "tngtech/", "qwen/", "z-ai/")
+OPENROUTER_SUFFIX = ":free"
+# Limite de modelos desconhecidos memorizados (LRU)
+MAX_RESOLVED_MODELS = 1024
+
+class ModelCapabilities:
+    def __init__(self, provider, vision=False, image_generation=False, fixed_temperature=False, system_prompt=True, premium=False):
+        self.provider = provider
+        self.vision = vision
+        self.image_generation = image_generation
+        # Modelos de raciocínio (o*, gpt-5*) não aceitam temperature
+        self.fixed_temperature = fixed_temperature
+        self.system_prompt = system_prompt
+        # Modelos premium exigem a feature generate_text no plano
+        self.premium = premium
+
+    def to_dict(self):
+        return {
+            "provider": self.provider,
+            "vision": self.vision,
+            "image_generation": self.image_generation,
+            "fixed_temperature": self.fixed_temperature,
+            "system_prompt": self.system_prompt,
+            "premium": self.premium,
+        }
+
+def _openai(vision=False, image_generation=False, fixed_temperature=False, system_prompt=True, premium=True):
+    return ModelCapabilities("openai", vision, image_generation, fixed_temperature, system_prompt, premium)
+
+MODEL_CAPABILITIES = {
+    "gpt-3.5-turbo": _openai(premium=False),
+    "gpt-4o": _openai(vision=True, image_generation=True, premium=False),
+    "gpt-4o-mini": _openai(vision=True, image_generation=True),
+    "gpt-4.1": _openai(image_generation=True),
+    "gpt-4.1-mini": _openai(image_generation=True),
+    "gpt-5": _openai(vision=True, image_generation=True, fixed_temperature=True),
+    "gpt-5-mini": _openai(vision=True, image_generation=True, fixed_temperature=True),
+    "gpt-5-nano": _openai(vision=True, image_generation=True, fixed_temperature=True),
+    "gpt-5.1": _openai(vision=True, image_generation=True, fixed_temperature=True),
+    "gpt-5.2": _openai(vision=True, image_generation=True, fixed_temperature=True),
+    "o1": _openai(vision=True, fixed_temperature=True),
+    "o1-mini": _openai(vision=True, fixed_temperature=True, system_prompt=False),
+    "o3": _openai(vision=True, fixed_temperature=True),
+    "o3-mini": _openai(vision=True, fixed_temperature=True),
+    "o4-mini": _openai(vision=True, fixed_temperature=True),
+    "gemini-2.5-pro": ModelCapabilities("gemini", vision=True, premium=True),
+    "gemini-2.5-flash": ModelCapabilities("gemini", vision=True, premium=True),
+    "gemini-2.5-flash-lite": ModelCapabilities("gemini", vision=True),
+    "claude-haiku-4-5-20251001": ModelCapabilities("anthropic"),
+    "claude-sonnet-4-5-20250929": ModelCapabilities("anthropic", premium=True),
+    "claude-opus-4-5-20251101": ModelCapabilities("anthropic", premium=True),
+    "sonar": ModelCapabilities("perplexity"),
+    "sonar-pro": ModelCapabilities("perplexity", premium=True),
+    "sonar-reasoning": ModelCapabilities("perplexity"),
+    "sonar-reasoning-pro": ModelCapabilities("perplexity", premium=True),
+    "sonar-deep-research": ModelCapabilities("perplexity", premium=True),
+}
+
+_adapters = {}
+
+def is_openrouter_model(model: str) -> bool:
+    return bool(model) and ("/" in model or model.endswith(OPENROUTER_SUFFIX) or model.startswith(OPENROUTER_PREFIXES))
+
+@lru_cache(maxsize=MAX_RESOLVED_MODELS)
+def _resolve(model):
+    if is_openrouter_model(model):
+        return ModelCapabilities("openrouter", premium=not model.endswith(OPENROUTER_SUFFIX))
+    return _openai(
+        vision=model.startswith(("gpt-4o", "o", "gpt-5")),
+        image_generation=model.startswith(("gpt-4", "gpt-5")),
+        fixed_temperature=model.startswith(("o", "gpt-5")),
+        system_prompt=model != "o1-mini",
+    )
+
+def get_capabilities(model: str) -> ModelCapabilities:
+    caps = MODEL_CAPABILITIES.get(model)
+    if caps is None:
+        caps = _resolve(model or "")
+    return caps
+
+def register_adapter(adapter):
+    _adapters[adapter.name] = adapter
+    return adapter
+
+def get_adapter(model: str):
+    return _adapters[get_capabilities(model).provider]
+
+def adapters():
+    return dict(_adapters)
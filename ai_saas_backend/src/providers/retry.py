@@ -0,0 +1,237 @@
+"""
+Retry e circuit breaker compartilhados pelos adapters.
+
+Cada chamada a um provedor passa por call_with_retry: só erros transitórios
+(429, 5xx, 529, timeout e falha de conexão) são repetidos, com backoff
+exponencial com jitter, respeitando Retry-After e um prazo total. Erros do
+cliente (400, 401, 404...) sobem na hora.
+
+Falhas transitórias seguidas abrem o breaker de provedor:modelo; enquanto ele
+estiver aberto as chamadas falham imediatamente com CircuitOpenError, sem
+segurar a thread. Depois de BREAKER_RESET_SECONDS uma única chamada de teste
+é liberada (half-open) e decide se o breaker fecha ou volta a abrir.
+"""
+import os
+import time
+import threading
+from email.utils import parsedate_to_datetime
+import httpx
+from dotenv import load_dotenv
+from tenacity import (
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+load_dotenv()
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_DEADLINE_SECONDS = float(os.getenv("RETRY_DEADLINE_SECONDS", "90"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "20"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+RETRYABLE_GEMINI_STATUS = {"UNAVAILABLE", "RESOURCE_EXHAUSTED", "DEADLINE_EXCEEDED", "INTERNAL"}
+
+class ProviderHTTPError(Exception):
+    """Resposta HTTP de erro de um endpoint chamado diretamente (chat/completions)."""
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        super().__init__(f"HTTP {response.status_code}: {response.text[:500]}")
+
+class DeadlineExceeded(Exception):
+    """O prazo total de retry acabou antes de uma nova tentativa."""
+
+class CircuitOpenError(Exception):
+    """O provedor está fora do ar; a chamada nem foi feita."""
+    def __init__(self, key, retry_in):
+        self.key = key
+        self.retry_in = retry_in
+        super().__init__(f"Circuit breaker aberto para {key} (nova tentativa em {retry_in:.0f}s)")
+
+# ---------- CLASSIFICAÇÃO ----------
+def _status_of(exc):
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def is_retryable(exc):
+    if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+
+    # Erros de conexão/timeout dos SDKs da OpenAI e da Anthropic não têm status
+    if type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return True
+
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return getattr(exc, "status", None) in RETRYABLE_GEMINI_STATUS
+
+def retry_after_seconds(exc):
+    """Lê Retry-After (segundos ou data HTTP) / retry-after-ms da resposta do erro."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return max(float(ms) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except Exception:
+        return None
+
+# ---------- CIRCUIT BREAKER ----------
+class CircuitBreaker:
+    def __init__(self, key, failure_threshold=None, reset_seconds=None):
+        self.key = key
+        self.failure_threshold = failure_threshold or BREAKER_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds or BREAKER_RESET_SECONDS
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return
+            retry_in = max(self.reset_seconds - (time.monotonic() - self.opened_at), 0.0)
+            raise CircuitOpenError(self.key, retry_in)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"[WARN] Circuit breaker aberto para {self.key} após {self.failures} falhas")
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release_probe(self):
+        """A chamada de teste terminou com erro que não diz nada sobre o provedor."""
+        with self._lock:
+            self.probing = False
+
+    def to_dict(self):
+        return {"state": self.state, "failures": self.failures}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(key):
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker(key))
+    return breaker
+
+def breaker_stats():
+    return {key: b.to_dict() for key, b in list(_breakers.items())}
+
+def record_outcome(breaker, exc=None):
+    if exc is None:
+        breaker.record_success()
+    elif is_retryable(exc):
+        breaker.record_failure()
+    else:
+        breaker.release_probe()
+
+# ---------- RETRY ----------
+class _Wait:
+    """Backoff exponencial com jitter; Retry-After do provedor tem prioridade."""
+    def __init__(self, base, max_delay, remaining):
+        self.backoff = wait_random_exponential(multiplier=base, max=max_delay)
+        self.remaining = remaining
+
+    def __call__(self, retry_state):
+        exc = retry_state.outcome.exception()
+        hinted = retry_after_seconds(exc) if exc is not None else None
+        delay = hinted if hinted is not None else self.backoff(retry_state)
+        # Deixa pelo menos um segundo para a próxima tentativa
+        return max(min(delay, self.remaining() - 1), 0)
+
+def call_with_retry(fn, key, timeout=None, max_attempts=None, deadline=None,
+                    base_delay=None, max_delay=None):
+    """
+    Executa fn(timeout) com retry e circuit breaker. A primeira tentativa
+    sempre recebe o timeout inteiro; as seguintes ficam limitadas ao que
+    resta do prazo total. O prazo nunca é menor que um timeout mais um
+    backoff, para que um único timeout não consuma todo o orçamento.
+    """
+    max_delay = max_delay or RETRY_MAX_DELAY
+    deadline = max(deadline or RETRY_DEADLINE_SECONDS, (timeout or 0) + max_delay)
+    breaker = get_breaker(key)
+    started = time.monotonic()
+    attempts = [0]
+
+    def remaining():
+        return deadline - (time.monotonic() - started)
+
+    def attempt():
+        breaker.before_call()
+        attempts[0] += 1
+        if attempts[0] == 1 and timeout is not None:
+            attempt_timeout = timeout
+        else:
+            attempt_timeout = remaining() if timeout is None else min(timeout, remaining())
+        if attempt_timeout <= 0:
+            raise DeadlineExceeded(f"Prazo de {deadline:.0f}s esgotado para {key}")
+        try:
+            result = fn(attempt_timeout)
+        except Exception as e:
+            record_outcome(breaker, e)
+            raise
+        breaker.record_success()
+        return result
+
+    def before_sleep(retry_state):
+        exc = retry_state.outcome.exception()
+        sleep = retry_state.next_action.sleep
+        print(f"[WARN] {key}: tentativa {retry_state.attempt_number} falhou ({exc}); nova tentativa em {sleep:.1f}s")
+
+    def out_of_time(retry_state):
+        # Não dorme um Retry-After que estoura o prazo: desiste logo
+        exc = retry_state.outcome.exception()
+        hinted = retry_after_seconds(exc) if exc is not None else None
+        return remaining() <= 1 or (hinted is not None and hinted >= remaining())
+
+    retrying = Retrying(
+        retry=retry_if_exception(is_retryable),
+        stop=stop_after_attempt(max_attempts or RETRY_MAX_ATTEMPTS) | out_of_time,
+        wait=_Wait(base_delay or RETRY_BASE_DELAY, max_delay, remaining),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
+    return retrying(attempt)
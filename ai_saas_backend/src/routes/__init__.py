@@ -9,4 +9,5 @@ from .notification_api import notification_api
 from .plan_api import plan_api
 from .ai_generation_api import ai_generation_api
 from .ai_generation_video_api import ai_generation_video_api
-from .chat_api import chat_api
\ No newline at end of file
+from .chat_api import chat_api
+from .search_api import search_api
\ No newline at end of file
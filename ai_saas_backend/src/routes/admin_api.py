@@ -2,6 +2,11 @@ from flask import Blueprint, jsonify, request
 from extensions import db, bcrypt, jwt_required
 from utils import admin_required
 from models import User, Plan
+from utils.attachment_cache import attachment_cache
+from utils.image_intent import cache_stats as image_intent_cache_stats
+from providers.retry import breaker_stats
+from utils.response_cache import cache_stats as response_cache_stats
+from utils.entitlements import user_plan_changed
 import uuid, os, re
 
 admin_api = Blueprint("admin_api", __name__)
@@ -106,6 +111,7 @@ def update_user_plan(user_id):
 
     user.plan = plan
     db.session.commit()
+    user_plan_changed(user.id, plan.id)
     return jsonify({
         "message": "Plano atualizado com sucesso",
         "user": {
@@ -141,3 +147,14 @@ def update_user_status(user_id):
             "is_active": user.is_active
         }
     }), 200
+
+@admin_api.route("/cache-stats", methods=["GET"])
+@jwt_required()
+@admin_required
+def cache_stats():
+    return jsonify({
+        "attachment_payloads": attachment_cache.stats(),
+        "image_intent": image_intent_cache_stats(),
+        "provider_breakers": breaker_stats(),
+        "responses": response_cache_stats()
+    }), 200
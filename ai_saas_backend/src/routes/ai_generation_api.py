@@ -1,369 +1,295 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from extensions import jwt_required, db
 from models.chat import Chat, ChatMessage, ChatAttachment, SenderType
+from sqlalchemy.orm import selectinload, load_only
 from models.generated_content import GeneratedImageContent
 from models.user import User  # <--- corrigido, import do modelo User
 from flask_jwt_extended import get_jwt_identity
-import os, uuid, base64, requests, time, re, pdfplumber
+import os, uuid, base64, json, queue, threading
 from datetime import datetime
 from dotenv import load_dotenv
-from google import genai
 from google.genai import types
-from openai import OpenAI
-from anthropic import Anthropic
+from utils.provider_clients import http_client_for, get_openai_client, get_gemini_client
+from utils.pdf_text import extract_pdf_text
+from utils.context_window import fit_history_to_budget, estimate_tokens
+from utils.chat_summary import apply_chat_summary, schedule_summary_refresh
+from utils.chat_title import provisional_title, schedule_title_generation, wait_for_title, is_title_pending
+from utils import response_cache
+from utils.idempotency import idempotent, remember_stream_result
+from utils.quotas import quota_required, refund_request_quota
+from utils.usage import normalize_usage, record_usage, start_usage_flusher
+from providers import get_adapter, get_capabilities, GenerationRequest, GenerationResult
+from providers.messages import generate_system_message
 from io import BytesIO
 from PIL import Image
 
 load_dotenv()
-OPENAI_API_KEY = os.getenv("API_KEY")
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-PPLX_API_KEY = os.getenv("PPLX_API_KEY")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # pasta src
 UPLOAD_DIR = os.path.join(BASE_DIR, "..", "static", "uploads")
 UPLOAD_DIR = os.path.abspath(UPLOAD_DIR)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-client_gemini = genai.Client(api_key=GEMINI_API_KEY)
-client_claude = Anthropic(api_key=ANTHROPIC_API_KEY)
+client_gemini = get_gemini_client()
 ai_generation_api = Blueprint("ai_generation_api", __name__)
 
-GEMINI_MODELS = ("gemini-2.5-pro", "gemini-2.5-flash", "gemini-2.5-flash-lite")
-CLAUDE_MODELS = (
-    "claude-haiku-4-5-20251001",
-    "claude-sonnet-4-5-20250929",
-    "claude-opus-4-5-20251101"
+USER_MESSAGE_EMPTY_COLUMNS = (
+    "user_id", "model_used", "provider", "temperature", "max_tokens",
+    "prompt_tokens", "completion_tokens", "total_tokens",
 )
-OPENROUTER_PREFIXES = ("deepseek/", "google/", "tngtech/", "qwen/", "z-ai/")
-OPENROUTER_SUFFIX = ":free"
-PERPLEXITY_MODELS = ("sonar", "sonar-reasoning", "sonar-pro", "sonar-reasoning", "sonar-deep-research")
 
-def remove_think_blocks(text):
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
-
-def is_perplexity_model(model: str) -> bool:
-    return model in PERPLEXITY_MODELS
-
-def is_gemini_model(model: str) -> bool:
-    return model in GEMINI_MODELS
-
-def is_claude_model(model: str) -> bool:
-    return model in CLAUDE_MODELS
-
-def is_openrouter_model(model: str) -> bool:
-    return bool(model) and ("/" in model or model.endswith(OPENROUTER_SUFFIX) or model.startswith(OPENROUTER_PREFIXES))
-
-def uses_completion_tokens_for_openai(model: str) -> bool:
-    return model.startswith("o") or model.startswith("gpt-5")
-
-def supports_vision(model: str) -> bool:
-    res = model.startswith("gpt-4o") or model.startswith("o") or model.startswith("gpt-5") or is_gemini_model(model)
-    return res
-
-def supports_generate_image(model: str) -> bool:
-    res = model.startswith("gpt-4") or model.startswith("gpt-5")
-    return res
-
-def to_data_url(path: str, mimetype: str) -> str:
-    with open(path, "rb") as f:
-        return f"data:{mimetype};base64,{base64.b64encode(f.read()).decode('utf-8')}"
-    
-def generate_system_message(model: str):
-    if supports_generate_image(model):
-        return {
-            "role": "system",
-            "content": (
-                "Você é uma IA de chat da plataforma Artificiall.\n"
-                "📌 Funções disponíveis:\n"
-                "- Geração de texto: todos os modelos.\n"
-                "- Geração de imagens: apenas modelos GPT.\n"
-                "⚠️ Importante:\n"
-                f"- O Modelo atual PERMITE GERAR: {model}\n"
-                "- Você pode gerar imagens quando o usuário pedir.\n"
-                "- Não gere imagens automaticamente se o usuário não pediu.\n"
-                "- Sempre use o modelo atual para decidir o que é possível."
-            )
-        }
-    else:
-        return {
-            "role": "system",
-            "content": (
-                "Você é uma IA de chat da plataforma Artificiall.\n"
-                "📌 Funções disponíveis:\n"
-                "- Geração de texto: todos os modelos.\n"
-                "- Geração de imagens: **não disponível** neste modelo.\n"
-                "- Se o usuário pedir para gerar imagens, responda educadamente que o modelo atual selecionado não suporta."
-            )
-        }
-    
-def extract_text_from_pdf(pdf_path, max_pages=10):
-    text = []
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for i, page in enumerate(pdf.pages):
-            if i >= max_pages:
-                break
-
-            page_text = page.extract_text()
-            if page_text:
-                text.append(page_text)
-
-    return "\n\n".join(text)
-    
-def build_messages_for_perplexity(session_messages, model: str):
-    return build_messages_for_openai(session_messages, model)
-
-def build_messages_for_openai(session_messages, model: str):
-    messages = []
-
-    if model != "o1-mini":
-        system_msg = generate_system_message(model)
-        messages.append(system_msg)
-    else:
-        print("[DEBUG] Modelo o1-mini detectado, pulando system message")
-    vision_ok = supports_vision(model)
-
-    for m in session_messages:
-        role = m.get("role") if isinstance(m, dict) else getattr(m, "role", "user")
-        text = m.get("content") if isinstance(m, dict) else getattr(m, "content", "")
-        attachments = []
-
-        if hasattr(m, "attachments") and m.attachments is not None:
-            attachments = [a.to_dict() for a in m.attachments]
-        elif isinstance(m, dict):
-            attachments = m.get("attachments", [])
-
-        if not attachments:
-            msg = {"role": role, "content": text}
-            messages.append(msg)
-            continue
-
-        if vision_ok:
-            parts = [{"type": "text", "text": text}] if text.strip() else []
-            non_images = []
-
-            for att in attachments:
-                mimetype = att["mimetype"] if isinstance(att, dict) else att.mimetype
-                path = att["path"] if isinstance(att, dict) else att.path
-                name = att.get("name") if isinstance(att, dict) else att.name
-
-                if mimetype.startswith("image/") and os.path.exists(path):
-                    if role == "assistant":
-                        print(f"[DEBUG] Pulando carregamento de imagem do assistant: {name}")
-                    else:
-                        img_part = {"type": "image_url", "image_url": {"url": to_data_url(path, mimetype)}}
-                        parts.append(img_part)
-                elif mimetype == "application/pdf" and os.path.exists(path):
-                    with open(path, "rb") as f:
-                        file_b64 = base64.b64encode(f.read()).decode("utf-8")
-                    pdf_part = {
-                        "type": "file",
-                        "file": {"filename": name, "file_data": f"data:{mimetype};base64,{file_b64}"}
-                    }
-                    parts.append(pdf_part)
-                else:
-                    non_images.append(name)
-
-            if non_images:
-                ni_part = {"type": "text", "text": f"Arquivos anexados (não-imagem): {', '.join(non_images)}"}
-                parts.append(ni_part)
-
-            msg = {"role": role, "content": parts}
-            messages.append(msg)
-
-        else:
-            names = ", ".join([a["name"] if isinstance(a, dict) else a.name for a in attachments])
-            merge_text = (text + "\n\n" if text else "") + (f"[Anexos]: {names}" if names else text)
-            msg = {"role": role, "content": merge_text}
-            messages.append(msg)
-
-    return messages
-
-def build_messages_for_openrouter(session_messages, model: str):
-    return build_messages_for_openai(session_messages, model)
-
-def build_messages_for_claude(session_messages):
-    messages = []
-
-    for m in session_messages:
-        role = m.get("role")
-        text = m.get("content", "")
-        attachments = m.get("attachments", [])
-
-        if role not in ("user", "assistant"):
-            role = "user"
-
-        content_blocks = []
-
-        if text:
-            content_blocks.append({
-                "type": "text",
-                "text": text
-            })
+def load_turn_history(chat_id):
+    """
+    Histórico do chat carregado uma única vez por turno, com anexos e handles
+    dos provedores em lote (selectin), reaproveitado na montagem do payload.
+    Das mensagens só vêm as colunas que o recorte de contexto, o resumo e os
+    builders leem; anexos e handles vêm inteiros (o builder da OpenAI usa
+    ChatAttachment.to_dict() e o cache de handles precisa de todos os campos).
+    """
+    return (
+        ChatMessage.query
+        .options(
+            load_only(
+                ChatMessage.id, ChatMessage.chat_id, ChatMessage.seq, ChatMessage.role,
+                ChatMessage.content, ChatMessage.token_count,
+            ),
+            selectinload(ChatMessage.attachments).selectinload(ChatAttachment.provider_files),
+        )
+        .filter_by(chat_id=chat_id)
+        .order_by(ChatMessage.seq)
+        .all()
+    )
+
+def build_turn_context(history, model, chat=None):
+    """
+    Etapa comum a todos os provedores: troca os turnos já resumidos pelo
+    resumo do chat, recorta o restante ao orçamento de tokens do modelo e
+    devolve (contexto, session_messages).
+    """
+    system_tokens = estimate_tokens(generate_system_message(model)["content"])
+    context = fit_history_to_budget(apply_chat_summary(chat, history), model, system_tokens=system_tokens)
+    session_messages = [{"role": m.role, "content": m.content, "attachments": getattr(m, "attachments", [])} for m in context]
+    return context, session_messages
+
+# ---------- STREAMING (SSE) ----------
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_TITLE_WAIT_SECONDS = 5
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def open_text_stream(turn, usage):
+    """
+    Monta o payload do provedor ainda na thread da requisição e devolve um
+    iterador que só faz I/O de rede, emitindo o texto conforme chega.
+    No modo streaming não há geração de imagem.
+    """
+    return get_adapter(turn.model).open_stream(turn, usage)
+
+def iter_with_heartbeat(iterator, interval=STREAM_HEARTBEAT_SECONDS):
+    """
+    Consome o iterador numa thread separada e devolve None a cada `interval`
+    segundos sem dados, para o chamador emitir um keep-alive.
+    """
+    q = queue.Queue()
+    stop = threading.Event()
+
+    def pump():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                q.put(("data", item))
+        except Exception as e:
+            q.put(("error", e))
+        finally:
+            q.put(("done", None))
 
-        for att in attachments:
-            mimetype = getattr(att, "mimetype", None)
-            path = getattr(att, "path", None)
-            name = getattr(att, "name", "arquivo")
+    threading.Thread(target=pump, daemon=True).start()
 
-            if not path or not os.path.exists(path):
+    try:
+        while True:
+            try:
+                kind, item = q.get(timeout=interval)
+            except queue.Empty:
+                yield None
                 continue
 
-            # 🖼️ IMAGEM
-            if mimetype and mimetype.startswith("image/"):
-                with open(path, "rb") as f:
-                    img_base64 = base64.b64encode(f.read()).decode("utf-8")
-
-                content_blocks.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": mimetype,
-                        "data": img_base64
-                    }
-                })
-
-            # 📄 PDF → TEXTO
-            elif mimetype == "application/pdf":
-                pdf_text = extract_text_from_pdf(path)
-
-                if pdf_text.strip():
-                    content_blocks.append({
-                        "type": "text",
-                        "text": (
-                            f"[Conteúdo extraído do PDF '{name}']\n\n"
-                            f"{pdf_text}"
-                        )
-                    })
-                else:
-                    content_blocks.append({
-                        "type": "text",
-                        "text": f"[PDF '{name}' não contém texto extraível]"
-                    })
+            if kind == "done":
+                return
+            if kind == "error":
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def read_generation_request():
+    """
+    Lê input, modelo, temperatura, chat_id e arquivos enviados (multipart ou JSON).
+    Os arquivos já são salvos em UPLOAD_DIR.
+    """
+    files_to_save = []
+    ct = request.content_type or ""
+
+    if ct.startswith("multipart/form-data"):
+        user_input = request.form.get("input", "")
+        model = request.form.get("model", "gpt-4o")
+        try:
+            temperature = float(request.form.get("temperature", 0.7))
+        except Exception:
+            temperature = 0.7
+        chat_id = request.form.get("chat_id")
+        files = request.files.getlist("files") or []
 
-        if not content_blocks:
-            continue
+        for f in files:
+            try:
+                safe_name = f.filename or f"file_{uuid.uuid4().hex}"
+                final_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{safe_name}")
+                f.save(final_path)
+                file_size = os.path.getsize(final_path)
+                files_to_save.append({
+                    "name": safe_name,
+                    "path": final_path,
+                    "mimetype": f.mimetype or "application/octet-stream",
+                    "size_bytes": file_size
+                })
+            except Exception as fe:
+                print(f"[WARN] Falha ao salvar arquivo {f.filename}: {fe}")
 
-        messages.append({
-            "role": role,
-            "content": content_blocks
+    else:
+        data = request.get_json(silent=True) or {}
+        user_input = data.get("input", "")
+        model = data.get("model", "gpt-4o")
+        try:
+            temperature = float(data.get("temperature", 0.7))
+        except Exception:
+            temperature = 0.7
+        chat_id = data.get("chat_id")
+
+    return user_input, model, temperature, chat_id, files_to_save
+
+def wants_regenerate():
+    """`regenerate: true` no corpo (JSON ou multipart) ou Cache-Control: no-cache pulam o cache de respostas."""
+    if "no-cache" in request.headers.get("Cache-Control", ""):
+        return True
+    data = request.form if (request.content_type or "").startswith("multipart/form-data") else (request.get_json(silent=True) or {})
+    return str(data.get("regenerate", "")).lower() in ("1", "true", "yes")
+
+def generate_with_cache(turn, user_id, regenerate=False):
+    """
+    Gera a resposta do turno, reaproveitando do cache de respostas (do mesmo
+    usuário) quando o pedido é determinístico. Devolve (GenerationResult, cache_hit).
+    """
+    cache_key = None
+    if response_cache.text_cache_allowed(turn.temperature, get_capabilities(turn.model).fixed_temperature, regenerate):
+        cache_key = response_cache.text_cache_key(user_id, turn.model, turn.temperature, turn.session_messages)
+        cached = response_cache.get_cached(cache_key)
+        if cached is not None:
+            print(f"[INFO] Resposta reaproveitada do cache ({turn.model})")
+            images = [base64.b64decode(img) for img in cached.get("images", [])]
+            return GenerationResult(text=cached["text"], images=images), True
+
+    result = get_adapter(turn.model).generate(turn)
+    if cache_key:
+        response_cache.store_cached(cache_key, {
+            "text": result.text,
+            "images": [base64.b64encode(img).decode("ascii") for img in result.images],
         })
-
-    return messages
-
-def send_with_retry_claude(messages, model, temperature, max_tokens=2048, retries=3):
-    last_error = None
-
-    for attempt in range(retries):
+    return result, False
+
+def keep_turn_objects_loaded():
+    """
+    Só na sessão desta requisição: chat e mensagens do turno seguem
+    carregados depois de cada commit, sem novos SELECTs. A sessão é
+    descartada no fim da requisição; as demais rotas e workers continuam
+    com expire_on_commit padrão.
+    """
+    db.session().expire_on_commit = False
+
+def get_or_create_chat(user_id, chat_id, user_input, model):
+    """Devolve (chat, criado). Chats novos começam com título provisório; o definitivo vem em background."""
+    chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first() if chat_id else None
+    if chat is not None:
+        return chat, False
+
+    # Persistido junto com a mensagem do usuário, no commit de save_user_turn
+    chat = Chat(user_id=user_id, title=provisional_title(user_input), supports_vision=get_capabilities(model).vision)
+    db.session.add(chat)
+    return chat, True
+
+def save_user_turn(chat, user_input, files_to_save):
+    """Chat novo, mensagem do usuário e anexos gravados numa única transação."""
+    # Colunas de modelo/uso explícitas: o histórico é carregado com load_only,
+    # e a mensagem volta inteira na resposta sem recarregar coluna por coluna
+    user_msg = ChatMessage(
+        chat=chat,
+        role=SenderType.USER.value,
+        content=user_input,
+        **{column: None for column in USER_MESSAGE_EMPTY_COLUMNS},
+        created_at=datetime.utcnow()
+    )
+    chat.record_message(user_msg)
+    pending = [user_msg]
+
+    for f in files_to_save:
         try:
-            return client_claude.messages.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-        except Exception as e:
-            last_error = e
-            print(f"[WARN] Claude tentativa {attempt+1}/{retries} falhou: {e}")
-            time.sleep(2)
-
-    raise last_error
-
-def make_request_with_retry(url, headers, body, max_retries=5, backoff=3):
-    for attempt in range(max_retries):
-        response = requests.post(url, headers=headers, json=body, timeout=120)
-        if response.status_code == 429:
-            if attempt < max_retries - 1:
-                time.sleep(backoff * (attempt + 1))
-                continue
-        return response
-    return response
-
-def send_with_retry_gemini(chat, message, retries=5, delay=2):
-    for attempt in range(retries):
+            pending.append(ChatAttachment(
+                message=user_msg,
+                name=f["name"],
+                path=f["path"],
+                mimetype=f.get("mimetype", "application/octet-stream"),
+                size_bytes=f.get("size_bytes"),
+                extracted_text=extract_pdf_text(f["path"]) if f.get("mimetype") == "application/pdf" else None,
+                created_at=datetime.utcnow()
+            ))
+        except Exception as ae:
+            print(f"[WARN] Falha ao salvar attachment {f['name']}: {ae}")
+
+    db.session.add_all(pending)
+    db.session.commit()
+
+    uploaded_files = [{
+        "id": a.id,
+        "name": a.name,
+        "mimetype": a.mimetype,
+        "size_bytes": a.size_bytes,
+        "url": f"/api/chats/attachments/{a.id}"
+    } for a in pending[1:]]
+
+    return user_msg, uploaded_files
+
+def save_generated_images(images):
+    """Grava as imagens devolvidas pelo provedor em UPLOAD_DIR como PNG."""
+    uploaded_images = []
+    for idx, img_bytes in enumerate(images):
+        image_path = os.path.join(UPLOAD_DIR, f"ai_image_{uuid.uuid4().hex}.png")
         try:
-            return chat.send_message(message)
+            Image.open(BytesIO(img_bytes)).save(image_path, format="PNG")
         except Exception as e:
-            if "503" in str(e) or "UNAVAILABLE" in str(e):
-                print(f"Servidor Gemini ocupado, retry em {delay}s ({attempt+1}/{retries})")
-                time.sleep(delay)
-            elif "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                print(f"Quota Gemini excedida, retry em {delay}s ({attempt+1}/{retries})")
-                time.sleep(delay)
-            else:
-                raise
-    raise Exception("Falha após várias tentativas Gemini")
-
-def send_to_perplexity(messages, model, temperature):
-    url = "https://api.perplexity.ai/chat/completions"
-    
-    headers = {
-        "Authorization": f"Bearer {PPLX_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    body = {
-        "model": model,
-        "messages": messages,
-        "temperature": temperature
-    }
-
-    r = requests.post(url, headers=headers, json=body, timeout=120)
-
-    if r.status_code != 200:
-        print("[PPLX ERROR]", r.text)
-        return "[Erro ao gerar resposta com Perplexity]"
-
-    data = r.json()
-
-    return data["choices"][0]["message"]["content"]
+            print(f"[WARN] Imagem gerada inválida, ignorada: {e}")
+            continue
+        uploaded_images.append({
+            "name": f"ai_image_{idx}.png",
+            "path": image_path,
+            "url": f"/api/uploads/{os.path.basename(image_path)}"
+        })
+        print(f"[INFO] IA gerou imagem {uploaded_images[-1]['name']} salva em {image_path}")
+    return uploaded_images
 
 @ai_generation_api.route("/generate-text", methods=["POST"])
 @jwt_required()
+@idempotent
+@quota_required("text")
 def generate_text():
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        return generate_text_stream()
+
     try:
-        ct = request.content_type or ""
-        files_to_save = []
         uploaded_images = []
 
         print("\n=== NOVA REQUISIÇÃO ===")
-        
-        if ct.startswith("multipart/form-data"):
-            user_input = request.form.get("input", "")
-            model = request.form.get("model", "gpt-4o")
-            try:
-                temperature = float(request.form.get("temperature", 0.7))
-            except Exception:
-                temperature = 0.7
-            chat_id = request.form.get("chat_id")
-            files = request.files.getlist("files") or []
 
-            for f in files:
-                try:
-                    safe_name = f.filename or f"file_{uuid.uuid4().hex}"
-                    final_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{safe_name}")
-                    f.save(final_path)
-                    file_size = os.path.getsize(final_path)
-                    files_to_save.append({
-                        "name": safe_name,
-                        "path": final_path,
-                        "mimetype": f.mimetype or "application/octet-stream",
-                        "size_bytes": file_size
-                    })
-                except Exception as fe:
-                    print(f"[WARN] Falha ao salvar arquivo {f.filename}: {fe}")
-
-        else:
-            data = request.get_json(silent=True) or {}
-            user_input = data.get("input", "")
-            model = data.get("model", "gpt-4o")
-            try:
-                temperature = float(data.get("temperature", 0.7))
-            except Exception:
-                temperature = 0.7
-            chat_id = data.get("chat_id")
+        user_input, model, temperature, chat_id, files_to_save = read_generation_request()
 
         print(f"[INFO] Usuário: {get_jwt_identity()}, Chat ID: {chat_id}, Modelo: {model}, Input: {user_input[:50]}")
 
@@ -372,387 +298,37 @@ def generate_text():
             return jsonify({"error": "É necessário enviar uma mensagem ou anexos."}), 400
 
         user_id = get_jwt_identity()
+        keep_turn_objects_loaded()
 
         # 🔹 Buscar chat existente ou criar novo
-        chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first() if chat_id else None
-        if chat is None:
-            chat_title = "Novo Chat"
-            if user_input:
-                try:
-                    title_res = requests.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"},
-                        json={
-                            "model": "gpt-3.5-turbo",
-                            "messages": [{"role": "user", "content": f"Crie um título curto (menos de 5 palavras) sem aspas para: {user_input[:1000]}"}],
-                            "max_tokens": 12,
-                            "temperature": 0.5
-                        },
-                        timeout=10
-                    )
-                    if title_res.status_code == 200:
-                        chat_title = title_res.json().get("choices", [{}])[0].get("message", {}).get("content", "Novo Chat").strip() or "Novo Chat"
-                except Exception as e:
-                    print(f"[WARN] Falha ao gerar título do chat: {e}")
-                    chat_title = "Novo Chat"
-
-            chat = Chat(user_id=user_id, title=chat_title, supports_vision=supports_vision(model))
-            db.session.add(chat)
-            db.session.commit()
-
-        user_msg = ChatMessage(
-            chat_id=chat.id,
-            role=SenderType.USER.value,
-            content=user_input,
-            created_at=datetime.utcnow()
-        )
-        db.session.add(user_msg)
-        db.session.commit()
+        chat, chat_created = get_or_create_chat(user_id, chat_id, user_input, model)
+        user_msg, uploaded_files = save_user_turn(chat, user_input, files_to_save)
+        if chat_created:
+            schedule_title_generation(current_app._get_current_object(), chat.id, user_input, chat.title)
 
-        uploaded_files = []
-        for f in files_to_save:
-            try:
-                attachment_obj = ChatAttachment(
-                    message_id=user_msg.id,
-                    name=f["name"],
-                    path=f["path"],
-                    mimetype=f.get("mimetype", "application/octet-stream"),
-                    size_bytes=f.get("size_bytes"),
-                    created_at=datetime.utcnow()
-                )
-                db.session.add(attachment_obj)
-                db.session.commit()
-                uploaded_files.append({
-                    "id": attachment_obj.id,
-                    "name": attachment_obj.name,
-                    "mimetype": attachment_obj.mimetype,
-                    "size_bytes": attachment_obj.size_bytes,
-                    "url": f"/api/chats/attachments/{attachment_obj.id}"
-                })
-            except Exception as ae:
-                print(f"[WARN] Falha ao salvar attachment {f['name']}: {ae}")
-
-        history = ChatMessage.query.filter_by(chat_id=chat.id).order_by(ChatMessage.created_at).all()
-        session_messages = [{"role": m.role, "content": m.content, "attachments": getattr(m, "attachments", [])} for m in history]
+        history = load_turn_history(chat.id)
+        context, session_messages = build_turn_context(history, model, chat)
         print(f"[INFO] Iniciando envio para IA (modelo {model})")
 
-        generated_text = ""
+        turn = GenerationRequest(model, session_messages, context, user_input, temperature)
+        cache_hit = False
+        usage = None
         try:
-            if is_perplexity_model(model):
-                endpoint = "https://api.perplexity.ai/chat/completions"
-                headers = {
-                    "Authorization": f"Bearer {PPLX_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                body = {
-                    "model": model,
-                    "messages": build_messages_for_perplexity(session_messages, model),
-                    "temperature": temperature
-                }
-
-                try:
-                    response = make_request_with_retry(endpoint, headers, body, max_retries=5, backoff=3)
-
-                    data = response.json()
-                    generated_text = data["choices"][0]["message"]["content"]
-
-                    generated_text = remove_think_blocks(generated_text).strip()
-
-                    try:
-                        citations = data.get("citations", [])
-
-                        if citations:
-                            generated_text += "\n\n🔗 Links\n"
-                            for i, url in enumerate(citations, start=1):
-                                generated_text += f"{i}. {url}\n"
-                    except Exception as ce:
-                        print("[DEBUG ERROR] Não foi possível processar citations:", ce)
-
-                except Exception as oe:
-                    print(f"[ERROR] Falha na chamada Perplexity: {oe}")
-                    generated_text = "[Erro ao gerar resposta da IA]"
-            elif is_gemini_model(model):
-                gemini_chat = None
-                parts = []
-                uploaded_images = []
-
-                try:
-                    print(f"[INFO] Inicializando chat Gemini para chat_id {chat.id}")
-                    gemini_chat = client_gemini.chats.create(model=model)
-
-                    # ---------- HISTÓRICO ----------
-                    history = ChatMessage.query.filter_by(chat_id=chat.id).order_by(ChatMessage.created_at).all()
-
-                    for m in history:
-                        if m.content:
-                            parts.append(m.content)
-
-                        for att in getattr(m, "attachments", []):
-                            path = getattr(att, "path", None)
-                            mimetype = getattr(att, "mimetype", "")
-                            name = getattr(att, "name", "arquivo")
-                            if not path or not os.path.exists(path):
-                                continue
-
-                            if mimetype.startswith("image/"):
-                                uploaded_file = client_gemini.files.upload(file=path)
-                                parts.append(uploaded_file)
-                            elif mimetype == "application/pdf":
-                                with open(path, "rb") as f:
-                                    pdf_bytes = f.read()
-                                parts.append(types.Part.from_bytes(data=pdf_bytes, mime_type="application/pdf"))
-                            else:
-                                parts.append(f"[Anexo não suportado: {name}]")
-
-                    if user_input:
-                        parts.append(user_input)
-
-                    # ---------- DETECTAR INTENÇÃO DE IMAGEM ----------
-                    def should_generate_image(prompt: str) -> bool:
-                        try:
-                            analysis_prompt = (
-                                "Você é um verificador de intenção. "
-                                "Analise o texto e diga se ele pede geração de uma imagem. "
-                                "Perguntas como 'pode gerar imagem?' não contam. "
-                                "Responda apenas SIM ou NÃO.\n\n"
-                                f"{prompt}"
-                            )
-
-                            resp = client_gemini.models.generate_content(
-                                model="gemini-2.0-flash",
-                                contents=analysis_prompt
-                            )
-
-                            answer = resp.text.strip().upper()
-                            return answer == "SIM"
-
-                        except Exception as e:
-                            prompt_lower = prompt.lower()
-                            keys = ["imagem", "desenhe", "faça um desenho", "gere uma imagem", "foto de", "pinte"]
-                            return any(k in prompt_lower for k in keys)
-
-                    user_asked_image = should_generate_image(user_input)
-
-                    # ---------- ENVIO PARA GEMINI ----------
-                    response = send_with_retry_gemini(gemini_chat, parts)
-
-                    generated_text_local = None
-                    generated_images_paths = []
-
-                    for cand in getattr(response, "candidates", []):
-                        for part in getattr(cand.content, "parts", []):
-                            if getattr(part, "text", None):
-                                generated_text_local = part.text
-                            elif getattr(part, "inline_data", None):
-                                data = part.inline_data.data
-                                mime = part.inline_data.mime_type or "image/png"
-
-                                try:
-                                    img_bytes = base64.b64decode(data)
-                                except Exception:
-                                    img_bytes = data
-
-                                img = Image.open(BytesIO(img_bytes))
-                                filename = f"gemini_{uuid.uuid4().hex}.png"
-                                save_path = os.path.join(UPLOAD_DIR, filename)
-                                img.save(save_path)
-                                generated_images_paths.append(save_path)
-
-                    # ---------- SE USUÁRIO PEDIU IMAGEM E NÃO VEIO INLINE ----------
-                    if user_asked_image and not generated_images_paths:
-                        try:
-                            print("[INFO] Gerando imagem via API do Gemini...")
-                            img_response = client_gemini.models.generate_images(
-                                model="imagen-4.0-fast-generate-001",
-                                prompt=user_input,
-                                config=types.GenerateImagesConfig(
-                                    number_of_images=1,
-                                    aspect_ratio="1:1"
-                                )
-                            )
-
-                            if img_response.generated_images:
-                                img = img_response.generated_images[0].image
-                                filename = f"gemini_{uuid.uuid4().hex}.png"
-                                save_path = os.path.join(UPLOAD_DIR, filename)
-                                img.save(save_path)
-                                generated_images_paths.append(save_path)
-
-                                print(f"[INFO] Imagem salva em {save_path}")
-
-                        except Exception as e:
-                            print(f"[ERROR] Falha ao gerar imagem via API: {e}")
-
-                    # ---------- TRANSFORMAR EM uploaded_images (igual ao OPENAI) ----------
-                    for idx, p in enumerate(generated_images_paths):
-                        uploaded_images.append({
-                            "name": f"gemini_image_{idx}.png",
-                            "path": p,
-                            "url": f"/api/uploads/{os.path.basename(p)}"
-                        })
-
-                    # ---------- DEFINIR TEXTO OU VAZIO ----------
-                    if uploaded_images:
-                        generated_text = ""
-                    else:
-                        generated_text = generated_text_local or "[Sem retorno]"
-
-                except Exception as e:
-                    print(f"[ERROR] Gemini erro geral: {e}")
-                    generated_text = "[Erro ao gerar resposta da IA]"
-                    uploaded_images = []
-
-                # ---------- SALVAR MENSAGEM DA IA (EXATAMENTE COMO OPENAI) ----------
-                try:
-                    for img in uploaded_images:
-                        try:
-                            attachment_obj = ChatAttachment(
-                                message_id=ai_msg.id,
-                                name=img["name"],
-                                path=img["path"],
-                                mimetype="image/png",
-                                size_bytes=os.path.getsize(img["path"]),
-                                created_at=datetime.utcnow()
-                            )
-                            db.session.add(attachment_obj)
-                            db.session.commit()
-
-                            img["id"] = attachment_obj.id
-                            img["mimetype"] = attachment_obj.mimetype
-                            img["size_bytes"] = attachment_obj.size_bytes
-                            img["url"] = f"/api/chats/attachments/{attachment_obj.id}"
-
-                            print(f"[ATTACHMENT AI] Imagem {img['name']} salva (ID {attachment_obj.id})")
-
-                            # ---------- SALVAR EM GENERATED IMAGE CONTENT ----------
-                            generated_content = GeneratedImageContent(
-                                user_id=chat.user_id,
-                                prompt=user_input,
-                                model_used=model,
-                                content_data=None,
-                                file_path=img["path"],
-                                style=None,
-                                ratio=None
-                            )
-                            db.session.add(generated_content)
-                            db.session.commit()
-
-                        except Exception as ae:
-                            db.session.rollback()
-                            print(f"[WARN] Falha ao salvar attachment de IA {img['name']}: {ae}")
-
-                except Exception as e:
-                    print(f"[ERROR] Falha ao salvar mensagem da IA (Gemini): {e}")
-            
-            elif is_claude_model(model):
-                try:
-                    print(f"[INFO] Enviando para Claude ({model})")
-
-                    claude_messages = build_messages_for_claude(session_messages)
-
-                    response = send_with_retry_claude(
-                        messages=claude_messages,
-                        model=model,
-                        temperature=temperature
-                    )
-
-                    generated_text = ""
-
-                    for block in response.content:
-                        if block.type == "text":
-                            generated_text += block.text
-
-                    uploaded_images = []  # Claude não gera imagem
-
-                    print(f"[INFO] Texto Claude gerado: {generated_text[:200]}")
-
-                except Exception as ce:
-                    print(f"[ERROR] Falha Claude: {ce}")
-                    generated_text = "[Erro ao gerar resposta da IA]"
-                    uploaded_images = []
-
-
-            elif is_openrouter_model(model):
-                endpoint = "https://openrouter.ai/api/v1/chat/completions"
-                headers = {"Authorization": f"Bearer {OPENROUTER_API_KEY}", "Content-Type": "application/json"}
-                body = {
-                    "model": model,
-                    "messages": build_messages_for_openrouter(session_messages, model),
-                    "temperature": temperature
-                }
-
-                try:
-                    response = make_request_with_retry(endpoint, headers, body, max_retries=5, backoff=3)
-                    try:
-                        generated_text = response.json()["choices"][0]["message"]["content"]
-                    except Exception:
-                        print(f"[WARN] Resposta OpenRouter não é JSON:\n{response.text[:1000]}")
-                        generated_text = "[Erro ao gerar resposta da IA]"
-                except Exception as oe:
-                    print(f"[ERROR] Falha na chamada OpenRouter: {oe}")
-                    generated_text = "[Erro ao gerar resposta da IA]"
-
-            else:
-                endpoint = "https://api.openai.com/v1/chat/completions"
-                headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
-                body = {"model": model, "messages": build_messages_for_openai(session_messages, model)}
-                if not uses_completion_tokens_for_openai(model):
-                    body["temperature"] = temperature
-
-                try:
-                    response = make_request_with_retry(endpoint, headers, body, max_retries=5, backoff=3)
-
-                    try:
-                        generated_text = response.json()["choices"][0]["message"]["content"]
-                    except Exception:
-                        print(f"[WARN] Resposta OpenAI não é JSON:\n{response.text[:1000]}")
-                        generated_text = "[Erro ao gerar resposta da IA]"
-                    
-                    if supports_generate_image(model):
-                        try:
-                            # Chamada de geração de imagem via tool
-                            client = OpenAI(api_key=OPENAI_API_KEY)
-                            img_response = client.responses.create(
-                                model=model,
-                                input=[{"role": "user", "content": user_input}],
-                                tools=[{"type": "image_generation"}]
-                            )
-
-                            image_outputs = [
-                                o.result for o in getattr(img_response, "output", [])
-                                if getattr(o, "type", "") == "image_generation_call"
-                            ]
-
-                            for idx, img_base64 in enumerate(image_outputs):
-                                image_path = os.path.join(UPLOAD_DIR, f"ai_image_{uuid.uuid4().hex}.png")
-                                with open(image_path, "wb") as f:
-                                    f.write(base64.b64decode(img_base64))
-                                uploaded_images.append({
-                                    "name": f"ai_image_{idx}.png",
-                                    "path": image_path,
-                                    "url": f"/api/uploads/{os.path.basename(image_path)}"
-                                })
-                                print(f"[INFO] IA gerou imagem {uploaded_images[-1]['name']} salva em {image_path}")
-
-                        except Exception as e:
-                            if "moderation_blocked" in str(e):
-                                print("[WARN] Geração de imagem bloqueada pelo sistema de moderação da OpenAI")
-                                generated_text += "\n⚠️ A imagem não pôde ser gerada porque os termos utilizados não passaram pelo sistema de segurança."
-                            else:
-                                print(f"[WARN] Falha ao gerar imagem pelo GPT: {e}")
-
-                    print(f"[INFO] Texto gerado: {generated_text[:200]}")
-
-                except Exception as oe:
-                    print(f"[ERROR] Falha na chamada OpenAI: {oe}")
-                    generated_text = "[Erro ao gerar resposta da IA]"
-                    uploaded_images = []
-
-
+            result, cache_hit = generate_with_cache(turn, user_id, regenerate=wants_regenerate())
+            generated_text = result.text
+            # Resposta do cache não consumiu tokens do provedor
+            usage = None if cache_hit else normalize_usage(result.usage)
+            uploaded_images = save_generated_images(result.images)
+            print(f"[INFO] Texto gerado ({model}): {generated_text[:200]}")
         except Exception as e:
-            print(f"[ERROR] Falha geral ao gerar texto IA: {e}")
+            print(f"[ERROR] Falha ao gerar texto IA ({model}): {e}")
             generated_text = "[Erro ao gerar resposta da IA]"
+            uploaded_images = []
+            # A resposta continua 200 (o erro fica no chat), mas nada foi gerado
+            refund_request_quota()
 
+        # Mensagem da IA, imagens geradas e conteúdo da galeria numa única transação
+        ai_msg = None
         try:
             safe_text = generated_text if not uploaded_images else ""
             ai_msg = ChatMessage(
@@ -760,60 +336,75 @@ def generate_text():
                 role=SenderType.AI.value,
                 content=safe_text,
                 model_used=model,
+                provider=get_capabilities(model).provider,
+                temperature=None if get_capabilities(model).fixed_temperature else temperature,
+                **(usage or {}),
                 created_at=datetime.utcnow()
             )
-            db.session.add(ai_msg)
-            db.session.commit()
+            chat.record_message(ai_msg)
+            pending = [ai_msg]
+            saved_images = []
 
             for img in uploaded_images:
                 try:
                     attachment_obj = ChatAttachment(
-                        message_id=ai_msg.id,
+                        message=ai_msg,
                         name=img["name"],
                         path=img["path"],
                         mimetype="image/png",
                         size_bytes=os.path.getsize(img["path"]),
                         created_at=datetime.utcnow()
                     )
-                    db.session.add(attachment_obj)
-                    db.session.commit()
-                    img["id"] = attachment_obj.id
-                    img["mimetype"] = attachment_obj.mimetype
-                    img["size_bytes"] = attachment_obj.size_bytes
-                    img["url"] = f"/api/chats/attachments/{attachment_obj.id}"
-                    try:
-                        generated_content = GeneratedImageContent(
-                            user_id=chat.user_id,
-                            prompt=user_input,
-                            model_used=model,
-                            content_data=None,
-                            file_path=img["path"],
-                            style=None,
-                            ratio=None
-                        )
-                        db.session.add(generated_content)
-                        db.session.commit()
-                    except Exception as ge:
-                        db.session.rollback()
-                        print(f"[WARN] Falha ao salvar em GeneratedContent: {ge}")
-                except Exception as ae:
-                    db.session.rollback()
+                except OSError as ae:
                     print(f"[WARN] Falha ao salvar attachment de IA {img['name']}: {ae}")
+                    continue
+
+                pending.append(attachment_obj)
+                pending.append(GeneratedImageContent(
+                    user_id=chat.user_id,
+                    prompt=user_input,
+                    model_used=model,
+                    content_data=None,
+                    file_path=img["path"],
+                    style=None,
+                    ratio=None
+                ))
+                saved_images.append((img, attachment_obj))
+
+            db.session.add_all(pending)
+            db.session.commit()
+
+            for img, attachment_obj in saved_images:
+                img["id"] = attachment_obj.id
+                img["mimetype"] = attachment_obj.mimetype
+                img["size_bytes"] = attachment_obj.size_bytes
+                img["url"] = f"/api/chats/attachments/{attachment_obj.id}"
 
         except Exception as ae:
             db.session.rollback()
+            ai_msg = None
             print(f"[ERROR] Falha ao salvar mensagem AI: {ae}")
         
         response_text = "" if uploaded_images else generated_text
-
+        schedule_summary_refresh(current_app._get_current_object(), chat.id)
+        if usage:
+            record_usage(chat.user_id, model, usage)
+            start_usage_flusher(current_app._get_current_object())
+
+        # Só o turno novo; o histórico completo vem de /api/chats/<id>/messages.
+        # chat_version = seq da última mensagem gravada do chat
+        new_messages = [user_msg] + ([ai_msg] if ai_msg else [])
         return jsonify({
             "chat_id": chat.id,
-            "chat_title": chat.title,
-            "messages": [m.to_dict() for m in history] + [ai_msg.to_dict()] if 'ai_msg' in locals() else [m.to_dict() for m in history],
+            "chat_title": wait_for_title(chat.id) or chat.title,
+            "title_pending": is_title_pending(chat.id),
+            "messages": [m.to_dict() for m in new_messages],
+            "chat_version": new_messages[-1].seq,
             "generated_text": response_text,
             "model_used": model,
-            "temperature": None if uses_completion_tokens_for_openai(model) else temperature,
-            "uploaded_files": uploaded_files + uploaded_images
+            "temperature": None if get_capabilities(model).fixed_temperature else temperature,
+            "uploaded_files": uploaded_files + uploaded_images,
+            "cache_hit": cache_hit
         }), 200
 
     except Exception as e:
@@ -821,6 +412,128 @@ def generate_text():
         print(f"[EXCEPTION] {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@ai_generation_api.route("/generate-text/stream", methods=["POST"])
+@jwt_required()
+@idempotent
+@quota_required("text")
+def generate_text_stream():
+    """
+    Mesma geração de /generate-text, mas devolvendo Server-Sent Events:
+    `start` (chat e mensagem do usuário), vários `delta` com o texto parcial,
+    `error` (se houver) e `done` com a mensagem da IA já persistida.
+    """
+    user_input, model, temperature, chat_id, files_to_save = read_generation_request()
+
+    if not user_input and not files_to_save:
+        return jsonify({"error": "É necessário enviar uma mensagem ou anexos."}), 400
+
+    user_id = get_jwt_identity()
+    print(f"[INFO] Stream - Usuário: {user_id}, Chat ID: {chat_id}, Modelo: {model}, Input: {user_input[:50]}")
+
+    try:
+        keep_turn_objects_loaded()
+        chat, chat_created = get_or_create_chat(user_id, chat_id, user_input, model)
+        user_msg, uploaded_files = save_user_turn(chat, user_input, files_to_save)
+        if chat_created:
+            schedule_title_generation(current_app._get_current_object(), chat.id, user_input, chat.title)
+
+        history = load_turn_history(chat.id)
+        context, session_messages = build_turn_context(history, model, chat)
+        stream_usage = {}
+        deltas = open_text_stream(GenerationRequest(model, session_messages, context, user_input, temperature), stream_usage)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[EXCEPTION] {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        yield sse_event("start", {
+            "chat_id": chat.id,
+            "chat_title": chat.title,
+            "model_used": model,
+            "user_message": user_msg.to_dict(),
+            "uploaded_files": uploaded_files
+        })
+
+        chunks = []
+        error = None
+        ai_msg = None
+        title_pending = chat_created
+
+        try:
+            try:
+                for delta in iter_with_heartbeat(deltas):
+                    # Título definitivo do chat novo, enviado assim que ficar pronto
+                    title = wait_for_title(chat.id) if title_pending else None
+                    if title:
+                        title_pending = False
+                        yield sse_event("title", {"chat_id": chat.id, "title": title})
+
+                    if delta is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    chunks.append(delta)
+                    yield sse_event("delta", {"text": delta})
+            except Exception as e:
+                print(f"[ERROR] Falha no streaming ({model}): {e}")
+                error = str(e)
+        finally:
+            # Persiste mesmo se o cliente desconectar no meio do stream
+            generated_text = "".join(chunks)
+            if error and not generated_text:
+                generated_text = "[Erro ao gerar resposta da IA]"
+                # O status 200 já foi enviado; a cota volta por aqui
+                refund_request_quota()
+
+            usage = normalize_usage(stream_usage)
+            try:
+                ai_msg = ChatMessage(
+                    chat_id=chat.id,
+                    role=SenderType.AI.value,
+                    content=generated_text,
+                    model_used=model,
+                    provider=get_capabilities(model).provider,
+                    temperature=None if get_capabilities(model).fixed_temperature else temperature,
+                    **(usage or {}),
+                    created_at=datetime.utcnow()
+                )
+                chat.record_message(ai_msg)
+                db.session.add(ai_msg)
+                db.session.commit()
+                schedule_summary_refresh(current_app._get_current_object(), chat.id)
+                if usage:
+                    record_usage(chat.user_id, model, usage)
+                    start_usage_flusher(current_app._get_current_object())
+            except Exception as ae:
+                db.session.rollback()
+                ai_msg = None
+                print(f"[ERROR] Falha ao salvar mensagem AI (stream): {ae}")
+
+            done_event = sse_event("done", {
+                "chat_id": chat.id,
+                "message": ai_msg.to_dict() if ai_msg else None,
+                "chat_version": ai_msg.seq if ai_msg else user_msg.seq,
+                "generated_text": generated_text,
+                "temperature": None if get_capabilities(model).fixed_temperature else temperature
+            })
+            # Reenvio por Idempotency-Key, mesmo que o cliente saia antes do `done`
+            remember_stream_result(done_event)
+
+        if error:
+            yield sse_event("error", {"error": "[Erro ao gerar resposta da IA]"})
+
+        title = wait_for_title(chat.id, timeout=STREAM_TITLE_WAIT_SECONDS) if title_pending else None
+        if title:
+            yield sse_event("title", {"chat_id": chat.id, "title": title})
+
+        yield done_event
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Mapeia proporção para tamanho da imagem baseado no modelo
 def map_size(model, ratio):
     size_map = {
@@ -848,6 +561,8 @@ def map_aspectratio_gemini(ratio):
 
 @ai_generation_api.route("/generate-image", methods=["POST"])
 @jwt_required()
+@idempotent
+@quota_required("image")
 def generate_image():
     current_user_id = get_jwt_identity()
     user = User.query.get(current_user_id)
@@ -875,7 +590,6 @@ def generate_image():
         save_path = os.path.join(UPLOAD_DIR, filename)
         if not model.startswith("imagen-"):
             size = map_size(model, ratio)
-            client = OpenAI(api_key=OPENAI_API_KEY)
             kwargs = {
                 "model": model,
                 "prompt": final_prompt,
@@ -884,34 +598,53 @@ def generate_image():
             }
             if quality and quality != "auto":
                 kwargs["quality"] = quality
-
-            response = client.images.generate(**kwargs)
-
-            if hasattr(response.data[0], "b64_json") and response.data[0].b64_json:
-                image_data = base64.b64decode(response.data[0].b64_json)
-            elif hasattr(response.data[0], "url") and response.data[0].url:
-                img_res = requests.get(response.data[0].url)
-                img_res.raise_for_status()
-                image_data = img_res.content
-            else:
-                return jsonify({"error": "Resposta da API OpenAI não contém imagem válida"}), 500
-            with open(save_path, "wb") as f:
-                f.write(image_data)
             final_ratio = size
         else:
             config_map = map_aspectratio_gemini(ratio)
-            response = client_gemini.models.generate_images(
-                model=model,
-                prompt=final_prompt,
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio=config_map["aspectRatio"],
-                )
-            )
-            generated_image = response.generated_images[0].image
-            generated_image.save(save_path)
+            kwargs = {"model": model, "prompt": final_prompt, "aspect_ratio": config_map["aspectRatio"]}
             final_ratio = config_map["aspectRatio"]
-            
+
+        cache_key = None
+        image_data = None
+        if response_cache.image_cache_allowed(regenerate=wants_regenerate()):
+            cache_key = response_cache.image_cache_key(current_user_id, kwargs)
+            cached = response_cache.get_cached(cache_key)
+            if cached is not None:
+                print(f"[INFO] Imagem reaproveitada do cache ({model})")
+                image_data = base64.b64decode(cached["image"])
+        cache_hit = image_data is not None
+
+        if image_data is None:
+            if not model.startswith("imagen-"):
+                client = get_openai_client()
+                response = client.images.generate(**kwargs)
+
+                if hasattr(response.data[0], "b64_json") and response.data[0].b64_json:
+                    image_data = base64.b64decode(response.data[0].b64_json)
+                elif hasattr(response.data[0], "url") and response.data[0].url:
+                    img_res = http_client_for(response.data[0].url).get(response.data[0].url)
+                    img_res.raise_for_status()
+                    image_data = img_res.content
+                else:
+                    return jsonify({"error": "Resposta da API OpenAI não contém imagem válida"}), 500
+            else:
+                response = client_gemini.models.generate_images(
+                    model=model,
+                    prompt=final_prompt,
+                    config=types.GenerateImagesConfig(
+                        number_of_images=1,
+                        aspect_ratio=config_map["aspectRatio"],
+                    )
+                )
+                image_data = response.generated_images[0].image.image_bytes
+
+            if cache_key:
+                response_cache.store_cached(cache_key, {"image": base64.b64encode(image_data).decode("ascii")})
+
+        # Acerto no cache também grava um arquivo e uma linha próprios na galeria
+        with open(save_path, "wb") as f:
+            f.write(image_data)
+
         # Salva no banco
         generated = GeneratedImageContent(
             user_id=user.id,
@@ -926,7 +659,8 @@ def generate_image():
 
         return jsonify({
             "message": "Imagem gerada com sucesso",
-            "content": generated.to_dict()
+            "content": generated.to_dict(),
+            "cache_hit": cache_hit
         }), 201
 
     except Exception as e:
@@ -1,20 +1,20 @@
 import os
 import uuid
 import time
-from io import BytesIO
-from datetime import datetime
-from flask import Blueprint, request, jsonify
+import threading
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.generated_content import GeneratedVideoContent
 from models.user import User
-from google import genai
+from models.video_job import VideoJob, VideoJobStatus
 from google.genai import types
-from dotenv import load_dotenv
+from utils.provider_clients import get_gemini_client, http_client_for, GEMINI_API_KEY
+from utils.idempotency import idempotent
+from utils.quotas import quota_required, refund_user_quota, VIDEO_SECONDS_PER_JOB
 
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-client_gemini = genai.Client(api_key=GEMINI_API_KEY)
+client_gemini = get_gemini_client()
 
 ai_generation_video_api = Blueprint("ai_generation_video_api", __name__)
 
@@ -23,8 +23,192 @@ UPLOAD_DIR = os.path.join(BASE_DIR, "..", "static", "uploads")
 VIDEO_UPLOAD_DIR = os.path.join(UPLOAD_DIR, "videos")
 os.makedirs(VIDEO_UPLOAD_DIR, exist_ok=True)
 
+# Poller de operações Veo (backoff adaptativo por job)
+VIDEO_POLL_TICK = float(os.getenv("VIDEO_POLL_TICK", "2"))
+VIDEO_POLL_MIN_INTERVAL = float(os.getenv("VIDEO_POLL_MIN_INTERVAL", "5"))
+VIDEO_POLL_MAX_INTERVAL = float(os.getenv("VIDEO_POLL_MAX_INTERVAL", "30"))
+VIDEO_POLL_LEASE = float(os.getenv("VIDEO_POLL_LEASE", "60"))
+# Reserva do job durante o download do vídeo (arquivos grandes passam do lease do poll)
+VIDEO_DOWNLOAD_LEASE = float(os.getenv("VIDEO_DOWNLOAD_LEASE", "900"))
+VIDEO_POLL_BATCH = int(os.getenv("VIDEO_POLL_BATCH", "20"))
+VIDEO_JOB_TIMEOUT = float(os.getenv("VIDEO_JOB_TIMEOUT", "900"))
+VIDEO_EXPECTED_SECONDS = float(os.getenv("VIDEO_EXPECTED_SECONDS", "90"))
+VIDEO_DOWNLOAD_CHUNK = 1024 * 1024
+
+_poller_lock = threading.Lock()
+_poller_thread = None
+
+def next_poll_interval(attempts):
+    return min(VIDEO_POLL_MAX_INTERVAL, VIDEO_POLL_MIN_INTERVAL * (1.5 ** max(attempts - 1, 0)))
+
+def estimate_progress(job, now):
+    # A API do Veo não informa porcentagem; estimamos pelo tempo decorrido
+    elapsed = (now - job.created_at).total_seconds() if job.created_at else 0
+    return min(95, int(elapsed / VIDEO_EXPECTED_SECONDS * 100))
+
+def download_video(video, save_path):
+    """Grava o vídeo em disco em blocos, sem carregar o arquivo inteiro em memória."""
+    if getattr(video, "video_bytes", None):
+        with open(save_path, "wb") as f:
+            f.write(video.video_bytes)
+        return
+
+    if not getattr(video, "uri", None):
+        video_bytes = client_gemini.files.download(file=video)
+        with open(save_path, "wb") as f:
+            f.write(video_bytes)
+        return
+
+    headers = {"x-goog-api-key": GEMINI_API_KEY}
+    with http_client_for(video.uri).stream("GET", video.uri, headers=headers, follow_redirects=True) as r:
+        r.raise_for_status()
+        with open(save_path, "wb") as f:
+            for chunk in r.iter_bytes(VIDEO_DOWNLOAD_CHUNK):
+                f.write(chunk)
+
+def fail_video_job(job, message):
+    job.status = VideoJobStatus.FAILED.value
+    job.error = message
+    job.completed_at = datetime.utcnow()
+    job.next_poll_at = None
+    db.session.commit()
+    print(f"[ERROR] Job de vídeo {job.id} falhou: {message}")
+    # Nenhum vídeo gerado: devolve os segundos debitados na criação do job
+    refund_user_quota(job.user_id, {"video_seconds_per_month": VIDEO_SECONDS_PER_JOB})
+
+def advance_video_job(job):
+    now = datetime.utcnow()
+    job.poll_attempts = (job.poll_attempts or 0) + 1
+
+    try:
+        operation = client_gemini.operations.get(types.GenerateVideosOperation(name=job.operation_name))
+    except Exception as e:
+        if (now - job.created_at).total_seconds() > VIDEO_JOB_TIMEOUT:
+            return fail_video_job(job, str(e))
+        print(f"[WARN] Falha ao consultar operação do job {job.id}: {e}")
+        job.next_poll_at = now + timedelta(seconds=next_poll_interval(job.poll_attempts))
+        db.session.commit()
+        return
+
+    if not operation.done:
+        if (now - job.created_at).total_seconds() > VIDEO_JOB_TIMEOUT:
+            return fail_video_job(job, "Tempo limite de geração excedido")
+        job.status = VideoJobStatus.RUNNING.value
+        job.progress = estimate_progress(job, now)
+        job.next_poll_at = now + timedelta(seconds=next_poll_interval(job.poll_attempts))
+        db.session.commit()
+        return
+
+    if operation.error:
+        err = operation.error
+        return fail_video_job(job, err.get("message", str(err)) if isinstance(err, dict) else str(err))
+
+    generated_videos = getattr(operation.response, "generated_videos", None) if operation.response else None
+    if not generated_videos:
+        return fail_video_job(job, "Nenhum vídeo retornado (possível bloqueio de segurança)")
+
+    # Estende a reserva antes do download, condicionada ao lease atual: se
+    # outro worker já pegou o job, este desiste
+    downloading = VideoJob.query.filter_by(
+        id=job.id, status=job.status, next_poll_at=job.next_poll_at, content_id=None
+    ).update({
+        "status": VideoJobStatus.DOWNLOADING.value,
+        "next_poll_at": now + timedelta(seconds=VIDEO_DOWNLOAD_LEASE),
+    }, synchronize_session=False)
+    db.session.commit()
+    if not downloading:
+        print(f"[INFO] Job de vídeo {job.id} já está com outro worker")
+        return
+
+    save_path = os.path.join(VIDEO_UPLOAD_DIR, f"{uuid.uuid4()}.mp4")
+    try:
+        download_video(generated_videos[0].video, save_path)
+    except Exception as e:
+        return fail_video_job(job, f"Falha ao baixar vídeo: {e}")
+
+    video_entry = GeneratedVideoContent(
+        user_id=job.user_id,
+        prompt=job.prompt,
+        model_used=job.model_used,
+        file_path=save_path,
+        ratio=job.ratio,
+        created_at=datetime.utcnow(),
+    )
+    db.session.add(video_entry)
+    db.session.flush()
+
+    # Um conteúdo por job: só conclui se nenhum outro worker concluiu antes
+    completed = VideoJob.query.filter_by(id=job.id, content_id=None).update({
+        "content_id": video_entry.id,
+        "status": VideoJobStatus.COMPLETED.value,
+        "progress": 100,
+        "completed_at": datetime.utcnow(),
+        "next_poll_at": None,
+    }, synchronize_session=False)
+    if not completed:
+        db.session.rollback()
+        if os.path.exists(save_path):
+            os.remove(save_path)
+        print(f"[INFO] Job de vídeo {job.id} já tinha sido concluído, descartando download duplicado")
+        return
+    db.session.commit()
+    print(f"[INFO] Job de vídeo {job.id} concluído (conteúdo {video_entry.id})")
+
+def poll_video_jobs_once():
+    """Avança os jobs com poll vencido. Devolve quantos foram processados."""
+    now = datetime.utcnow()
+    due = db.session.query(VideoJob.id, VideoJob.next_poll_at).filter(
+        # DOWNLOADING com lease vencido: o worker que baixava morreu, outro retoma
+        VideoJob.status.in_([VideoJobStatus.PENDING.value, VideoJobStatus.RUNNING.value,
+                             VideoJobStatus.DOWNLOADING.value]),
+        VideoJob.next_poll_at <= now,
+    ).order_by(VideoJob.next_poll_at).limit(VIDEO_POLL_BATCH).all()
+
+    processed = 0
+    for job_id, next_poll_at in due:
+        # Reserva o job (lease) para que outro worker não consulte o mesmo ao mesmo tempo
+        claimed = VideoJob.query.filter_by(id=job_id, next_poll_at=next_poll_at).update(
+            {"next_poll_at": now + timedelta(seconds=VIDEO_POLL_LEASE)},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        if not claimed:
+            continue
+
+        job = db.session.get(VideoJob, job_id)
+        try:
+            advance_video_job(job)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Falha ao avançar job de vídeo {job_id}: {e}")
+        processed += 1
+
+    return processed
+
+def _video_poller_loop(app):
+    while True:
+        with app.app_context():
+            try:
+                poll_video_jobs_once()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Poller de vídeo: {e}")
+            finally:
+                db.session.remove()
+        time.sleep(VIDEO_POLL_TICK)
+
+def start_video_poller(app):
+    global _poller_thread
+    with _poller_lock:
+        if _poller_thread is None or not _poller_thread.is_alive():
+            _poller_thread = threading.Thread(target=_video_poller_loop, args=(app,), daemon=True, name="video-poller")
+            _poller_thread.start()
+    return _poller_thread
+
 @ai_generation_video_api.route("/generate-video", methods=["POST"])
 @jwt_required()
+@idempotent
+@quota_required("video")
 def generate_video():
     current_user_id = get_jwt_identity()
     user = User.query.get(current_user_id)
@@ -40,46 +224,48 @@ def generate_video():
         return jsonify({"error": "Campo 'prompt' é obrigatório"}), 400
 
     try:
-        filename = f"{uuid.uuid4()}.mp4"
-        save_path = os.path.join(VIDEO_UPLOAD_DIR, filename)
-        print(f"[DEBUG] Gerando vídeo com modelo {model_used}, ratio {aspect_ratio}...")
+        print(f"[DEBUG] Criando job de vídeo com modelo {model_used}, ratio {aspect_ratio}...")
 
-        # Cria operação assíncrona
+        # Só dispara a operação assíncrona; o poller acompanha a conclusão
         operation = client_gemini.models.generate_videos(
             model=model_used,
             prompt=prompt,
             config=types.GenerateVideosConfig(aspect_ratio=aspect_ratio)
         )
 
-        # Aguarda conclusão da operação
-        while not operation.done:
-            time.sleep(5)
-            operation = client_gemini.operations.get(operation)
-
-        generated_video = operation.response.generated_videos[0]
-        video_bytes = client_gemini.files.download(file=generated_video.video)
-
-        # Salva o arquivo localmente
-        with open(save_path, "wb") as f:
-            f.write(video_bytes)
-
-        # Salva no banco
-        video_entry = GeneratedVideoContent(
+        job = VideoJob(
             user_id=user.id,
             prompt=prompt,
             model_used=model_used,
-            file_path=save_path,
-            created_at=datetime.utcnow(),
+            ratio=aspect_ratio,
+            operation_name=operation.name,
+            next_poll_at=datetime.utcnow() + timedelta(seconds=VIDEO_POLL_MIN_INTERVAL),
         )
-        db.session.add(video_entry)
+        db.session.add(job)
         db.session.commit()
 
+        start_video_poller(current_app._get_current_object())
+
         return jsonify({
-            "message": "Vídeo gerado com sucesso!",
-            "video": video_entry.to_dict()
-        }), 201
+            "message": "Geração de vídeo iniciada",
+            "job": job.to_dict()
+        }), 202
 
     except Exception as e:
         db.session.rollback()
         print("Erro ao gerar vídeo:", str(e))
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@ai_generation_video_api.route("/video-jobs/<string:job_id>", methods=["GET"])
+@jwt_required()
+def get_video_job(job_id):
+    current_user_id = get_jwt_identity()
+    job = VideoJob.query.filter_by(id=job_id, user_id=current_user_id).first()
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+
+    # Garante o poller neste processo (ex.: após reinício com jobs pendentes)
+    if not job.is_finished:
+        start_video_poller(current_app._get_current_object())
+
+    return jsonify({"job": job.to_dict()}), 200
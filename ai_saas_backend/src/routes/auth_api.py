@@ -4,6 +4,7 @@ from extensions import (
     jwt_required, create_access_token, set_access_cookies, get_jwt, get_jwt_identity
 )
 from utils import add_token_to_blacklist
+from utils.entitlements import entitlement_claims, plan_payload
 from models import User, Plan
 from dotenv import load_dotenv
 import uuid, re, os, secrets
@@ -33,20 +34,10 @@ def login():
     if user and bcrypt.check_password_hash(user.password, password):
         access_token = create_access_token(
             identity=user.id,
-            additional_claims={"role": user.role},
+            additional_claims={"role": user.role, **entitlement_claims(user.plan_id)},
             expires_delta=timedelta(hours=2)
         )
 
-        # Extrair features corretamente
-        features_list = []
-        if user.plan:
-            for pf in user.plan.features:
-                features_list.append({
-                    "key": pf.feature.key,
-                    "description": pf.feature.description,
-                    "value": pf.value
-                })
-
         resp = make_response(jsonify({
             "message": "Login bem-sucedido",
             "access_token": access_token,
@@ -56,18 +47,7 @@ def login():
                 "username": user.username,
                 "email": user.email,
                 "role": user.role,
-                "plan": {
-                    "id": user.plan.id if user.plan else None,
-                    "name": user.plan.name if user.plan else None,
-                    "features": [
-                        {
-                            "key": pf.feature.key if pf.feature else "",
-                            "description": pf.feature.description if pf.feature else "",
-                            "value": pf.value
-                        }
-                        for pf in user.plan.features
-                    ] if user.plan else []
-                } if user.plan else None,
+                "plan": plan_payload(user.plan_id),
                 "perfil_photo": user.perfil_photo,
                 "is_active": user.is_active,
                 "created_at": user.created_at.isoformat(),
@@ -3,7 +3,11 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.chat import Chat, ChatMessage, ChatAttachment
 from datetime import datetime
-from sqlalchemy.orm import joinedload
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+from utils.chat_title import is_title_pending
+from utils.pagination import parse_limit, decode_cursor, keyset_after, page_items
+from utils.search import search_chat_snippets
 import os
 
 chat_api = Blueprint("chat_api", __name__)
@@ -33,48 +37,124 @@ def create_chat():
 @chat_api.route("/", methods=["GET"])
 @jwt_required()
 def list_chats():
+    """
+    Resumos dos chats do usuário (sem mensagens), do mais recente para o
+    mais antigo, paginados por keyset em (updated_at, id).
+    Query: limit, cursor, archived=true|false (omitido = todos), q.
+    """
     try:
         user_id = get_jwt_identity()
         q = request.args.get("q", "").strip()
+        archived = request.args.get("archived")
+        limit = parse_limit()
 
-        # Query base
-        query = Chat.query.options(joinedload(Chat.messages)).filter_by(user_id=user_id)
+        query = Chat.query.filter_by(user_id=user_id)
 
+        if archived == "true":
+            query = query.filter(Chat.archived.is_(True))
+        elif archived == "false":
+            query = query.filter(or_(Chat.archived.is_(False), Chat.archived.is_(None)))
+
+        snippets = {}
         if q:
-            query = query.outerjoin(ChatMessage).filter(
-                (Chat.title.ilike(f"%{q}%")) |
-                (ChatMessage.content.ilike(f"%{q}%"))
-            )
+            # Índice full-text (título e mensagens); a página segue a ordem normal da listagem
+            snippets = search_chat_snippets(user_id, q)
+            query = query.filter(Chat.id.in_(list(snippets)))
 
-        chats = query.order_by(Chat.created_at.desc()).all()
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                values = decode_cursor(cursor, (datetime, str))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            query = query.filter(keyset_after((Chat.updated_at, Chat.id), values))
+
+        chats = query.order_by(Chat.updated_at.desc(), Chat.id.desc()).limit(limit + 1).all()
+        chats, next_cursor = page_items(chats, limit, lambda c: (c.updated_at, c.id))
 
-        chat_list = []
         chat_list = []
         for c in chats:
-            chat_dict = c.to_dict(with_messages=True)
-            snippet = None
+            chat_dict = c.to_summary_dict()
             if q:
-                for m in c.messages:
-                    if m.content and q.lower() in m.content.lower():
-                        snippet = (m.content[:100] + "...") if len(m.content) > 100 else m.content
-                        break
-            chat_dict["snippet"] = snippet
+                chat_dict["snippet"] = snippets.get(c.id)
             chat_list.append(chat_dict)
 
-
-        return jsonify(chat_list)
+        return jsonify({"chats": chat_list, "next_cursor": next_cursor})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @chat_api.route("/<string:chat_id>", methods=["GET"])
 @jwt_required()
 def get_chat(chat_id):
+    """
+    Dados do chat com o histórico completo, como antes. Com ?limit=N vêm só
+    as N mensagens mais recentes, com has_more/next_before para continuar em
+    /messages; ?with_messages=false devolve só os dados do chat.
+    """
+    try:
+        user_id = get_jwt_identity()
+        chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first()
+        if not chat:
+            return jsonify({"error": "Chat não encontrado"}), 404
+        with_messages = request.args.get("with_messages", "true").lower() == "true"
+        msg_limit = parse_limit() if "limit" in request.args else None
+        return jsonify(chat.to_dict(with_messages=with_messages, msg_limit=msg_limit))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@chat_api.route("/<string:chat_id>/messages", methods=["GET"])
+@jwt_required()
+def list_chat_messages(chat_id):
+    """
+    Mensagens do chat em ordem crescente de seq, paginadas para trás:
+    sem `before` vem a página mais recente; a próxima usa before=next_before.
+    """
+    try:
+        user_id = get_jwt_identity()
+        if not db.session.query(Chat.query.filter_by(id=chat_id, user_id=user_id).exists()).scalar():
+            return jsonify({"error": "Chat não encontrado"}), 404
+
+        limit = parse_limit()
+        query = (
+            ChatMessage.query
+            .options(selectinload(ChatMessage.attachments))
+            .filter(ChatMessage.chat_id == chat_id)
+        )
+        before = request.args.get("before")
+        if before:
+            try:
+                query = query.filter(ChatMessage.seq < int(before))
+            except ValueError:
+                return jsonify({"error": "before inválido"}), 400
+
+        rows = query.order_by(ChatMessage.seq.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        messages = list(reversed(rows[:limit]))
+
+        return jsonify({
+            "chat_id": chat_id,
+            "messages": [m.to_dict() for m in messages],
+            "has_more": has_more,
+            "next_before": messages[0].seq if has_more else None,
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@chat_api.route("/<string:chat_id>/title", methods=["GET"])
+@jwt_required()
+def get_chat_title(chat_id):
+    """
+    Título atual do chat e se a geração em background ainda está pendente.
+    Responde na hora (sem segurar o worker); o cliente repete enquanto pending.
+    """
     try:
         user_id = get_jwt_identity()
+        # Antes de ler o chat: a marca no Redis só sai depois do commit do título
+        pending = is_title_pending(chat_id)
         chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first()
         if not chat:
             return jsonify({"error": "Chat não encontrado"}), 404
-        return jsonify(chat.to_dict(with_messages=True))
+        return jsonify({"chat_id": chat.id, "title": chat.title, "pending": pending})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -7,10 +7,21 @@ from models import (
     GeneratedVideoContent,
     User
 )
+from models.associations import project_content_association
+from utils.search import search_ref_ids
+from utils.pagination import parse_limit, decode_cursor, keyset_after, page_items
+from sqlalchemy import select, func, or_
+from datetime import datetime
 import os
 
 generated_content_api = Blueprint("generated_content_api", __name__)
 
+CONTENT_MODELS = {
+    "text": GeneratedTextContent,
+    "image": GeneratedImageContent,
+    "video": GeneratedVideoContent,
+}
+
 @generated_content_api.before_request
 def skip_jwt_for_options():
     if request.method == "OPTIONS":
@@ -90,18 +101,91 @@ def create_generated_content():
 @generated_content_api.route("/", methods=["GET"])
 @jwt_required()
 def list_generated_contents():
+    """
+    Galeria do usuário, do mais recente para o mais antigo, paginada por
+    keyset em (created_at, id). Query: limit, cursor, type=text|image|video, q.
+    Resposta: {"contents": [...], "next_cursor": str|None} (antes era a lista pura).
+    """
     current_user_id = get_jwt_identity()
     query_param = request.args.get("q", "").strip().lower()
+    content_type = request.args.get("type")
+    limit = parse_limit()
+
+    if content_type and content_type not in CONTENT_MODELS:
+        return jsonify({"error": "Tipo inválido, use text, image ou video"}), 400
 
-    base_query = GeneratedContent.query.filter_by(user_id=current_user_id)
+    # Com tipo, consulta a subclasse: só um JOIN com a tabela dela
+    model = CONTENT_MODELS.get(content_type, GeneratedContent)
+    base_query = model.query.filter(GeneratedContent.user_id == current_user_id)
 
     if query_param:
-        base_query = base_query.filter(
-            GeneratedContent.prompt.ilike(f"%{query_param}%")
+        # Índice full-text (palavras, sem acento) mais o ILIKE de antes, para
+        # termos curtos ou parciais que o full-text não casa
+        base_query = base_query.filter(or_(
+            GeneratedContent.id.in_(search_ref_ids(current_user_id, query_param, "content")),
+            GeneratedContent.prompt.ilike(f"%{query_param}%"),
+        ))
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            values = decode_cursor(cursor, (datetime, str))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        base_query = base_query.filter(keyset_after((GeneratedContent.created_at, GeneratedContent.id), values))
+
+    contents = (
+        base_query
+        .order_by(GeneratedContent.created_at.desc(), GeneratedContent.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    contents, next_cursor = page_items(contents, limit, lambda c: (c.created_at, c.id))
+
+    projects_by_content = project_ids_for([c.id for c in contents])
+    return jsonify({
+        "contents": [c.to_dict(projects_by_content.get(c.id, [])) for c in contents],
+        "next_cursor": next_cursor,
+    }), 200
+
+def project_ids_for(content_ids):
+    """content_id → ids dos projetos, numa consulta só na tabela de associação."""
+    if not content_ids:
+        return {}
+    rows = db.session.execute(
+        select(project_content_association.c.content_id, project_content_association.c.project_id)
+        .where(project_content_association.c.content_id.in_(content_ids))
+    )
+    projects = {}
+    for content_id, project_id in rows:
+        projects.setdefault(content_id, []).append(project_id)
+    return projects
+
+
+# TOTAIS DO USUÁRIO (cards da home e das configurações)
+@generated_content_api.route("/stats", methods=["GET"])
+@jwt_required()
+def generated_content_stats():
+    """Total e criados no mês corrente, por tipo, numa consulta só (COUNT ... GROUP BY)."""
+    current_user_id = get_jwt_identity()
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    rows = db.session.execute(
+        select(
+            GeneratedContent.content_type,
+            func.count(GeneratedContent.id),
+            func.count(GeneratedContent.id).filter(GeneratedContent.created_at >= month_start),
         )
+        .where(GeneratedContent.user_id == current_user_id)
+        .group_by(GeneratedContent.content_type)
+    ).all()
 
-    contents = base_query.all()
-    return jsonify([c.to_dict() for c in contents]), 200
+    by_type = {content_type: {"total": total, "this_month": this_month} for content_type, total, this_month in rows}
+    return jsonify({
+        "total": sum(t["total"] for t in by_type.values()),
+        "this_month": sum(t["this_month"] for t in by_type.values()),
+        "by_type": by_type,
+    }), 200
 
 
 # OBTER DETALHES DE UM CONTEÚDO ESPECÍFICO
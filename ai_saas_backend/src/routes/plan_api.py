@@ -1,24 +1,13 @@
-from flask import Blueprint, jsonify
-from models import Plan
+from flask import Blueprint, request, Response
+from utils.entitlements import get_snapshot
 
 plan_api = Blueprint("plan_api", __name__)
 
 @plan_api.route("/", methods=["GET"])
 def get_plans():
-    plans = Plan.query.all()
-    return jsonify([
-        {
-            "id": plan.id,
-            "name": plan.name,
-            "features": [
-                {
-                    "key": pf.feature.key,
-                    "description": pf.feature.description,
-                    "value": pf.value
-                }
-                for pf in plan.features
-            ],
-            "created_at": plan.created_at.isoformat()
-        }
-        for plan in plans
-    ])
+    # Servido do snapshot compilado; o ETag muda junto com o conteúdo
+    snapshot = get_snapshot()
+    response = Response(snapshot.plans_json, mimetype="application/json")
+    response.set_etag(snapshot.etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
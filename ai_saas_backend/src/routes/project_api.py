@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from extensions import db, jwt_required, get_jwt_identity
 from models import Project, User, GeneratedContent
 from datetime import datetime
+from utils.search import search_ref_ids
 
 project_api = Blueprint("project_api", __name__)
 
@@ -42,8 +43,9 @@ def list_projects():
     base_query = Project.query.filter_by(user_id=current_user_id)
 
     if query_param:
+        # Índice full-text em vez de ILIKE
         base_query = base_query.filter(
-            Project.name.ilike(f"%{query_param}%")
+            Project.id.in_(search_ref_ids(current_user_id, query_param, "project"))
         )
 
     projects = base_query.all()
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from extensions import db, jwt_required, get_jwt_identity
+from models import Chat
+from utils.pagination import parse_limit, encode_cursor, decode_cursor
+from utils.search import search_documents, KINDS
+
+search_api = Blueprint("search_api", __name__)
+
+# Busca full-text em chats, mensagens, conteúdos gerados e projetos do usuário
+@search_api.route("/", methods=["GET"])
+@jwt_required()
+def search():
+    """
+    Query: q, types (lista separada por vírgula; padrão todos), limit, cursor.
+    Resultados por relevância; snippet já vem escapado, com <mark> no termo.
+    """
+    user_id = get_jwt_identity()
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "Parâmetro q é obrigatório"}), 400
+
+    types = [t for t in request.args.get("types", ",".join(KINDS)).split(",") if t]
+    invalid = [t for t in types if t not in KINDS]
+    if invalid:
+        return jsonify({"error": f"Tipos inválidos: {', '.join(invalid)}"}), 400
+
+    limit = parse_limit(default=20)
+    offset = 0
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            offset, = decode_cursor(cursor, (int,))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    try:
+        rows = search_documents(user_id, q, types, limit=limit + 1, offset=offset)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Falha na busca: {e}")
+        return jsonify({"error": "Falha ao buscar"}), 500
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Título do chat para resultados de mensagens, numa consulta só
+    chat_ids = {r["chat_id"] for r in rows if r["kind"] == "message"}
+    chat_titles = dict(
+        db.session.query(Chat.id, Chat.title).filter(Chat.id.in_(chat_ids)).all()
+    ) if chat_ids else {}
+
+    return jsonify({
+        "results": [
+            {
+                "type": r["kind"],
+                "id": r["ref_id"],
+                "chat_id": r["chat_id"],
+                "title": chat_titles.get(r["chat_id"]) if r["kind"] == "message" else r["title"],
+                "snippet": r["snippet"],
+                "rank": r["rank"],
+            }
+            for r in rows
+        ],
+        "next_cursor": encode_cursor(offset + limit) if has_more else None,
+    }), 200
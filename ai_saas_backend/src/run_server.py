@@ -1,6 +1,12 @@
 from waitress import serve
 from main import app  # importa seu Flask app
+from routes.ai_generation_video_api import start_video_poller
+from utils.usage import start_usage_flusher
 
 if __name__ == "__main__":
+    # Retoma jobs de vídeo pendentes deixados por um processo anterior
+    start_video_poller(app)
+    # Copia os contadores de uso do Redis para usage_rollups
+    start_usage_flusher(app)
     # Serve em 0.0.0.0 para aceitar conexões externas
     serve(app, host="0.0.0.0", port=8000)
@@ -1,9 +1,11 @@
 from .decorators import admin_required
-from .utils import add_token_to_blacklist, check_if_token_revoked, create_default_plans
+from .utils import add_token_to_blacklist, check_if_token_revoked, create_default_plans, backfill_message_seq, backfill_chat_summaries
 
 __all__ = [
     "admin_required",
     "add_token_to_blacklist",
     "check_if_token_revoked",
-    "create_default_plans"
+    "create_default_plans",
+    "backfill_message_seq",
+    "backfill_chat_summaries"
 ]
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+Cache dos anexos já codificados (base64 / data URL) usados nos payloads multimodais.
+
+A chave é (sha256 do arquivo, mimetype, formato). O hash de cada arquivo é
+memorizado por (path, tamanho, mtime), então um anexo só é lido e codificado
+uma vez por processo. Opcionalmente o base64 também é gravado num arquivo
+`<anexo>.b64` ao lado do original, sobrevivendo a reinícios.
+"""
+import os
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+ATTACHMENT_CACHE_MAX_BYTES = int(os.getenv("ATTACHMENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+ATTACHMENT_CACHE_SIDECAR = os.getenv("ATTACHMENT_CACHE_SIDECAR", "false").lower() == "true"
+
+FORMATS = ("base64", "data_url")
+SIDECAR_SUFFIX = ".b64"
+HASH_MEMO_MAX_ENTRIES = 4096
+
+class AttachmentPayloadCache:
+    def __init__(self, max_bytes=ATTACHMENT_CACHE_MAX_BYTES, sidecar=ATTACHMENT_CACHE_SIDECAR):
+        self.max_bytes = max_bytes
+        self.sidecar = sidecar
+        self._entries = OrderedDict()
+        self._hashes = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sidecar_hits = 0
+        self.evictions = 0
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        memo_key = (path, st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+            if digest is not None:
+                self._hashes.move_to_end(memo_key)
+                return digest
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        digest = h.hexdigest()
+
+        with self._lock:
+            self._hashes[memo_key] = digest
+            if len(self._hashes) > HASH_MEMO_MAX_ENTRIES:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def get(self, path, mimetype, fmt="base64"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de payload inválido: {fmt}")
+
+        key = (self.file_hash(path), mimetype, fmt)
+
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        encoded = self._read_sidecar(path)
+        if encoded is None:
+            with open(path, "rb") as f:
+                encoded = base64.b64encode(f.read()).decode("utf-8")
+            self._write_sidecar(path, encoded)
+
+        payload = f"data:{mimetype};base64,{encoded}" if fmt == "data_url" else encoded
+        self._put(key, payload)
+        return payload
+
+    def _put(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = payload
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def _sidecar_path(self, path):
+        return path + SIDECAR_SUFFIX
+
+    def _read_sidecar(self, path):
+        if not self.sidecar:
+            return None
+        sidecar_path = self._sidecar_path(path)
+        try:
+            if os.path.getmtime(sidecar_path) < os.path.getmtime(path):
+                return None
+            with open(sidecar_path, "r", encoding="ascii") as f:
+                encoded = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self.sidecar_hits += 1
+        return encoded
+
+    def _write_sidecar(self, path, encoded):
+        if not self.sidecar:
+            return
+        sidecar_path = self._sidecar_path(path)
+        tmp_path = f"{sidecar_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="ascii") as f:
+                f.write(encoded)
+            os.replace(tmp_path, sidecar_path)
+        except OSError as e:
+            print(f"[WARN] Falha ao gravar sidecar de {path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hashes.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "sidecar_hits": self.sidecar_hits,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "sidecar_enabled": self.sidecar,
+            }
+
+attachment_cache = AttachmentPayloadCache()
@@ -0,0 +1,169 @@
+"""
+Resumo incremental (rolling summary) de chats longos.
+
+Depois que a resposta da IA é salva, um worker em background verifica se já
+se acumularam CHAT_SUMMARY_EVERY_N_MESSAGES mensagens após a marca d'água
+(Chat.summary_message_id). Se sim, funde o resumo anterior com essas
+mensagens usando um modelo barato e avança a marca, deixando as
+CHAT_SUMMARY_KEEP_RECENT mais recentes fora do resumo. O payload enviado ao
+provedor passa a ser resumo + cauda recente.
+
+Desligado por padrão (CHAT_SUMMARY_ENABLED=true para ativar): cada resumo é
+uma chamada extra ao provedor, feita direto pelo client, sem o retry dos
+adapters e fora da contabilização de uso.
+"""
+import os
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from extensions import db
+from models.chat import Chat, ChatMessage
+from utils.provider_clients import get_gemini_client, get_openai_client
+
+load_dotenv()
+CHAT_SUMMARY_ENABLED = os.getenv("CHAT_SUMMARY_ENABLED", "false").lower() == "true"
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "gemini-2.5-flash-lite")
+CHAT_SUMMARY_EVERY_N_MESSAGES = int(os.getenv("CHAT_SUMMARY_EVERY_N_MESSAGES", "20"))
+CHAT_SUMMARY_KEEP_RECENT = int(os.getenv("CHAT_SUMMARY_KEEP_RECENT", "10"))
+CHAT_SUMMARY_MAX_CHARS_PER_MESSAGE = 4000
+CHAT_SUMMARY_WORKERS = int(os.getenv("CHAT_SUMMARY_WORKERS", "2"))
+
+SUMMARY_PROMPT = (
+    "Você mantém o resumo de uma conversa entre um usuário e uma IA. "
+    "Atualize o resumo anterior incorporando as novas mensagens. Preserve fatos, "
+    "decisões, preferências do usuário, nomes, números e pendências; descarte "
+    "cumprimentos e repetições. Responda apenas com o resumo, em até 400 palavras."
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = set()
+
+class SummaryMarker:
+    """Mensagem sintética com o resumo dos turnos anteriores à marca d'água."""
+    role = "user"
+    attachments = ()
+
+    def __init__(self, summary):
+        self.content = f"[Resumo da conversa até aqui]\n{summary}"
+
+def watermark_index(history, message_id):
+    if not message_id:
+        return None
+    for i, m in enumerate(history):
+        if m.id == message_id:
+            return i
+    return None
+
+def apply_chat_summary(chat, history):
+    """Troca as mensagens já resumidas pelo resumo salvo no chat."""
+    if chat is None or not chat.summary:
+        return history
+    idx = watermark_index(history, chat.summary_message_id)
+    if idx is None:
+        return history
+    return [SummaryMarker(chat.summary)] + history[idx + 1:]
+
+def format_transcript(messages):
+    lines = []
+    for m in messages:
+        speaker = "Usuário" if m.role == "user" else "IA"
+        content = (m.content or "")[:CHAT_SUMMARY_MAX_CHARS_PER_MESSAGE]
+        lines.append(f"{speaker}: {content}")
+    return "\n\n".join(lines)
+
+def summarize_text(previous_summary, messages, model=CHAT_SUMMARY_MODEL):
+    prompt = (
+        f"{SUMMARY_PROMPT}\n\n"
+        f"Resumo anterior:\n{previous_summary or '(nenhum)'}\n\n"
+        f"Novas mensagens:\n{format_transcript(messages)}"
+    )
+    if model.startswith("gemini"):
+        resp = get_gemini_client().models.generate_content(model=model, contents=prompt)
+        return (resp.text or "").strip()
+
+    resp = get_openai_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return (resp.choices[0].message.content or "").strip()
+
+def refresh_chat_summary(chat_id):
+    """Atualiza o resumo do chat se houver mensagens suficientes após a marca d'água."""
+    chat = db.session.get(Chat, chat_id)
+    if chat is None:
+        return False
+
+    # A marca d'água vira um seq; Chat.last_seq diz quantas vieram depois sem ler o histórico
+    watermark_seq = None
+    if chat.summary_message_id:
+        watermark_seq = (
+            db.session.query(ChatMessage.seq)
+            .filter_by(id=chat.summary_message_id, chat_id=chat_id)
+            .scalar()
+        )
+    previous_summary = chat.summary if watermark_seq is not None else None
+    after = watermark_seq or 0
+
+    if (chat.last_seq or 0) - after < CHAT_SUMMARY_EVERY_N_MESSAGES:
+        return False
+
+    # Só a fatia depois da marca
+    recent = (
+        ChatMessage.query
+        .with_entities(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+        .filter(ChatMessage.chat_id == chat_id, ChatMessage.seq > after)
+        .order_by(ChatMessage.seq)
+        .all()
+    )
+    if len(recent) < CHAT_SUMMARY_EVERY_N_MESSAGES:
+        return False
+
+    pending = recent[:len(recent) - CHAT_SUMMARY_KEEP_RECENT]
+    if not pending:
+        return False
+
+    summary = summarize_text(previous_summary, pending)
+    if not summary:
+        return False
+
+    # Condicional na marca antiga: se outro worker já avançou, descarta este resultado
+    updated = Chat.query.filter_by(id=chat_id, summary_message_id=chat.summary_message_id).update({
+        "summary": summary,
+        "summary_message_id": pending[-1].id,
+        "summary_updated_at": datetime.utcnow(),
+        "updated_at": Chat.updated_at,
+    }, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        print(f"[INFO] Resumo do chat {chat_id} atualizado ({len(pending)} mensagens)")
+    return bool(updated)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CHAT_SUMMARY_WORKERS, thread_name_prefix="chat-summary")
+    return _executor
+
+def _run_refresh(app, chat_id):
+    try:
+        with app.app_context():
+            refresh_chat_summary(chat_id)
+    except Exception as e:
+        print(f"[WARN] Falha ao resumir chat {chat_id}: {e}")
+    finally:
+        with _executor_lock:
+            _in_flight.discard(chat_id)
+
+def schedule_summary_refresh(app, chat_id):
+    """Agenda a atualização do resumo fora do caminho da requisição (um job por chat)."""
+    if not CHAT_SUMMARY_ENABLED:
+        return
+    with _executor_lock:
+        if chat_id in _in_flight:
+            return
+        _in_flight.add(chat_id)
+    _get_executor().submit(_run_refresh, app, chat_id)
@@ -0,0 +1,133 @@
+"""
+Título de chats novos.
+
+O chat é criado com um título provisório derivado da primeira mensagem, sem
+chamada externa. O título definitivo é gerado por LLM em background e só
+substitui o provisório se o usuário não tiver renomeado o chat nesse meio
+tempo. Os futures ficam registrados por chat_id para que o stream (evento
+`title`) do mesmo processo entregue o título assim que ficar pronto. Para
+/api/chats/<id>/title, que pode cair em outro worker, a geração pendente é
+marcada no Redis e o título pronto já está na linha do Chat.
+"""
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dotenv import load_dotenv
+from extensions import db, redis_client
+from models.chat import Chat
+from utils.provider_clients import http_client_for, OPENAI_API_KEY
+from utils.search import reindex_chat_title
+
+load_dotenv()
+CHAT_TITLE_MODEL = os.getenv("CHAT_TITLE_MODEL", "gpt-3.5-turbo")
+CHAT_TITLE_WORKERS = int(os.getenv("CHAT_TITLE_WORKERS", "2"))
+CHAT_TITLE_TIMEOUT = float(os.getenv("CHAT_TITLE_TIMEOUT", "10"))
+PROVISIONAL_TITLE_WORDS = 6
+PROVISIONAL_TITLE_MAX_CHARS = 60
+DEFAULT_TITLE = "Novo Chat"
+PENDING_KEY_PREFIX = "chat_title:pending:"
+# Expira sozinha se o worker morrer no meio da geração
+PENDING_TTL = int(CHAT_TITLE_TIMEOUT) + 30
+
+_executor = None
+_lock = threading.Lock()
+_pending = {}
+
+def provisional_title(user_input):
+    words = re.sub(r"\s+", " ", user_input or "").strip().split(" ")
+    title = " ".join(words[:PROVISIONAL_TITLE_WORDS])[:PROVISIONAL_TITLE_MAX_CHARS].strip()
+    if not title:
+        return DEFAULT_TITLE
+    if len(words) > PROVISIONAL_TITLE_WORDS or len(title) == PROVISIONAL_TITLE_MAX_CHARS:
+        title += "…"
+    return title
+
+def generate_chat_title(user_input):
+    title_url = "https://api.openai.com/v1/chat/completions"
+    title_res = http_client_for(title_url).post(
+        title_url,
+        headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"},
+        json={
+            "model": CHAT_TITLE_MODEL,
+            "messages": [{"role": "user", "content": f"Crie um título curto (menos de 5 palavras) sem aspas para: {user_input[:1000]}"}],
+            "max_tokens": 12,
+            "temperature": 0.5
+        },
+        timeout=CHAT_TITLE_TIMEOUT
+    )
+    if title_res.status_code != 200:
+        return None
+    return title_res.json().get("choices", [{}])[0].get("message", {}).get("content", "").strip() or None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=CHAT_TITLE_WORKERS, thread_name_prefix="chat-title")
+    return _executor
+
+def _pending_key(chat_id):
+    return f"{PENDING_KEY_PREFIX}{chat_id}"
+
+def _mark_pending(chat_id, pending):
+    try:
+        if pending:
+            redis_client.set(_pending_key(chat_id), "1", ex=PENDING_TTL)
+        else:
+            redis_client.delete(_pending_key(chat_id))
+    except Exception as e:
+        print(f"[WARN] Falha ao marcar título pendente no Redis: {e}")
+
+def _run_title(app, chat_id, user_input, provisional):
+    try:
+        title = generate_chat_title(user_input)
+        with app.app_context():
+            if title:
+                # Só troca se o chat ainda estiver com o título provisório
+                changed = Chat.query.filter_by(id=chat_id, title=provisional).update(
+                    {"title": title[:180], "updated_at": Chat.updated_at},
+                    synchronize_session=False
+                )
+                db.session.commit()
+                if changed:
+                    reindex_chat_title(chat_id)
+            current = db.session.query(Chat.title).filter_by(id=chat_id).scalar()
+        return current
+    except Exception as e:
+        print(f"[WARN] Falha ao gerar título do chat {chat_id}: {e}")
+        return provisional
+    finally:
+        # Depois do commit: quem vir pending=False já lê o título novo no banco
+        _mark_pending(chat_id, False)
+
+def schedule_title_generation(app, chat_id, user_input, provisional):
+    if not user_input:
+        return None
+    _mark_pending(chat_id, True)
+    future = _get_executor().submit(_run_title, app, chat_id, user_input, provisional)
+    with _lock:
+        for done_id in [cid for cid, f in _pending.items() if f.done()]:
+            del _pending[done_id]
+        _pending[chat_id] = future
+    return future
+
+def wait_for_title(chat_id, timeout=0):
+    """Título definitivo se já (ou em até `timeout`s) estiver pronto; None se ainda pendente ou desconhecido."""
+    with _lock:
+        future = _pending.get(chat_id)
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return None
+
+def is_title_pending(chat_id):
+    """Vale para qualquer worker: a marca fica no Redis até o título ser gravado."""
+    try:
+        return bool(redis_client.exists(_pending_key(chat_id)))
+    except Exception as e:
+        print(f"[WARN] Falha ao consultar título pendente no Redis: {e}")
+        return False
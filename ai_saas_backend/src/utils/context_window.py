@@ -0,0 +1,138 @@
+"""
+Montagem da janela de contexto enviada aos provedores.
+
+Cada mensagem tem seu custo em tokens estimado uma vez e salvo em
+ChatMessage.token_count. A janela é preenchida da mensagem mais nova para a
+mais antiga até o orçamento do modelo (contexto - saída - system prompt),
+sempre mantendo o turno atual. As mensagens que ficam de fora viram um
+único marcador no início do histórico.
+"""
+import os
+import math
+from dotenv import load_dotenv
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _encoding = None
+
+load_dotenv()
+# Teto opcional de tokens de entrada por turno, para todos os modelos (controle de
+# custo). Sem valor, o orçamento vem só da janela de cada modelo em MODEL_LIMITS.
+CONTEXT_INPUT_TOKEN_CAP = int(os.getenv("CONTEXT_INPUT_TOKEN_CAP") or 0) or None
+MESSAGE_OVERHEAD_TOKENS = 4
+IMAGE_TOKENS = 1000
+PDF_FALLBACK_TOKENS = 2000
+
+# Limites por modelo: (janela de contexto, tokens reservados para a resposta).
+# A busca é pelo prefixo mais longo que casar com o nome do modelo.
+MODEL_LIMITS = {
+    "gpt-4o": (128000, 4096),
+    "gpt-4.1": (1000000, 8192),
+    "gpt-5": (400000, 8192),
+    "o1-mini": (128000, 8192),
+    "o1": (200000, 8192),
+    "o3": (200000, 8192),
+    "o4-mini": (200000, 8192),
+    "gpt-3.5-turbo": (16000, 1024),
+    "claude-": (200000, 2048),
+    "gemini-2.5": (1000000, 8192),
+    "gemini-2.0": (1000000, 8192),
+    "sonar-deep-research": (128000, 8192),
+    "sonar-reasoning": (128000, 8192),
+    "sonar": (128000, 4096),
+    "deepseek/": (64000, 4096),
+}
+DEFAULT_MODEL_LIMITS = (32000, 4096)
+
+class ModelLimits:
+    def __init__(self, context_tokens, max_output_tokens):
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+
+    @property
+    def input_budget(self):
+        budget = self.context_tokens - self.max_output_tokens
+        if CONTEXT_INPUT_TOKEN_CAP:
+            budget = min(budget, CONTEXT_INPUT_TOKEN_CAP)
+        return budget
+
+def get_model_limits(model: str) -> ModelLimits:
+    best = None
+    for prefix in MODEL_LIMITS:
+        if model and model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return ModelLimits(*(MODEL_LIMITS[best] if best else DEFAULT_MODEL_LIMITS))
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Aproximação sem tokenizer: ~4 caracteres por token
+    return math.ceil(len(text) / 4)
+
+def attachment_tokens(att) -> int:
+    mimetype = getattr(att, "mimetype", "") or ""
+    if mimetype.startswith("image/"):
+        return IMAGE_TOKENS
+    if mimetype == "application/pdf":
+        pdf_text = getattr(att, "extracted_text", None)
+        return estimate_tokens(pdf_text) if pdf_text is not None else PDF_FALLBACK_TOKENS
+    return estimate_tokens(getattr(att, "name", ""))
+
+def message_tokens(msg) -> int:
+    """Tokens da mensagem (texto + anexos), calculados uma vez e salvos em msg.token_count."""
+    cached = getattr(msg, "token_count", None)
+    if cached is not None:
+        return cached
+
+    total = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(msg.content or "")
+    total += sum(attachment_tokens(a) for a in (getattr(msg, "attachments", None) or []))
+
+    if hasattr(msg, "token_count"):
+        msg.token_count = total  # persistido no próximo commit da sessão
+    return total
+
+class ContextMarker:
+    """Mensagem sintética que substitui os turnos antigos que não couberam na janela."""
+    role = "user"
+    attachments = ()
+
+    def __init__(self, omitted, tokens=0):
+        self.omitted = omitted
+        self.tokens = tokens
+        self.content = (
+            f"[{omitted} mensagens anteriores desta conversa foram omitidas "
+            "por limite de contexto.]"
+        )
+
+def fit_history_to_budget(history, model, system_tokens=0):
+    """
+    Devolve as mensagens que cabem no orçamento do modelo, em ordem
+    cronológica. A última mensagem (turno atual) entra sempre; as mais
+    antigas que não couberem são trocadas por um ContextMarker.
+    """
+    if not history:
+        return []
+
+    budget = get_model_limits(model).input_budget - system_tokens
+    *older, current = history
+    used = message_tokens(current)
+    kept = []
+
+    for msg in reversed(older):
+        cost = message_tokens(msg)
+        if used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+
+    kept.reverse()
+    omitted = len(older) - len(kept)
+    if omitted:
+        marker = ContextMarker(omitted, sum(message_tokens(m) for m in older[:omitted]))
+        print(f"[INFO] Contexto de {model}: {omitted} mensagens antigas omitidas ({marker.tokens} tokens)")
+        return [marker] + kept + [current]
+    return kept + [current]
@@ -0,0 +1,204 @@
+"""
+Snapshot compilado dos planos e dos recursos de cada um.
+
+Planos, features e valores são carregados numa consulta só (com
+selectinload) e compilados num snapshot imutável: por plano, o valor
+tipado de cada feature e um bitmask das features booleanas ligadas. O
+snapshot tem uma versão guardada no Redis; qualquer mudança nos planos
+incrementa a versão e os processos reconstroem o snapshot na próxima
+verificação. Login e /api/users/me leem daqui, /api/plans é servido
+pronto com ETag e o token JWT leva claims pequenas (plano, bitmask e
+versão) para as rotas de geração não precisarem ir ao banco.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from types import MappingProxyType
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from sqlalchemy.orm import selectinload
+from extensions import redis_client
+from models import Plan, PlanFeature
+
+load_dotenv()
+# De quanto em quanto tempo cada processo confere a versão no Redis
+ENTITLEMENTS_CHECK_SECONDS = float(os.getenv("ENTITLEMENTS_CHECK_SECONDS", "5"))
+# Mesmo prazo do token emitido no login: depois disso não há claims antigas
+ENTITLEMENTS_CLAIMS_TTL = int(os.getenv("ENTITLEMENTS_CLAIMS_TTL", str(2 * 3600)))
+
+VERSION_KEY = "entitlements:version"
+USER_PLAN_PREFIX = "entitlements:user:"
+
+# Posição de cada feature booleana no bitmask. Só acrescente no fim:
+# tokens já emitidos guardam o bitmask com esta ordem.
+FLAG_BITS = {
+    "generate_text": 0,
+    "attach_files": 1,
+    "limit_chats": 2,
+    "limit_messages": 3,
+    "customization": 4,
+    "generate_image": 5,
+    "generate_video": 6,
+}
+
+@dataclass(frozen=True)
+class PlanEntitlements:
+    id: int
+    name: str
+    values: MappingProxyType  # feature → bool, int ou None (sem limite)
+    flags: int
+    payload: MappingProxyType  # formato devolvido ao frontend
+
+    def allows(self, feature):
+        # Feature ausente do plano conta como desligada (igual ao frontend)
+        return self.values.get(feature) is True
+
+@dataclass(frozen=True)
+class EntitlementSnapshot:
+    version: int
+    plans: MappingProxyType  # plan_id → PlanEntitlements
+    plans_json: str
+    etag: str
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def parse_feature_value(value):
+    """"true"/"false" viram bool, números viram int; "unlimited"/vazio é sem limite (None)."""
+    value = (value or "").strip().lower()
+    if value in ("true", "false"):
+        return value == "true"
+    if value in ("", "unlimited", "ilimitado"):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def flags_for(values):
+    flags = 0
+    for feature, bit in FLAG_BITS.items():
+        if values.get(feature) is True:
+            flags |= 1 << bit
+    return flags
+
+def flag_enabled(flags, feature):
+    return bool(flags >> FLAG_BITS[feature] & 1)
+
+def compile_plan(plan):
+    plan_features = sorted(plan.features, key=lambda pf: pf.id or 0)
+    values = {pf.feature.key: parse_feature_value(pf.value) for pf in plan_features}
+    payload = {
+        "id": plan.id,
+        "name": plan.name,
+        "features": [
+            {"key": pf.feature.key, "description": pf.feature.description, "value": pf.value}
+            for pf in plan_features
+        ],
+        "created_at": plan.created_at.isoformat() if plan.created_at else None,
+    }
+    return PlanEntitlements(
+        id=plan.id,
+        name=plan.name,
+        values=MappingProxyType(values),
+        flags=flags_for(values),
+        payload=MappingProxyType(payload),
+    )
+
+def build_snapshot(version):
+    plans = (
+        Plan.query
+        .options(selectinload(Plan.features).selectinload(PlanFeature.feature))
+        .order_by(Plan.id)
+        .all()
+    )
+    compiled = {plan.id: compile_plan(plan) for plan in plans}
+    plans_json = json.dumps([dict(p.payload) for p in compiled.values()], ensure_ascii=False)
+    return EntitlementSnapshot(
+        version=version,
+        plans=MappingProxyType(compiled),
+        plans_json=plans_json,
+        etag=hashlib.sha256(plans_json.encode("utf-8")).hexdigest()[:32],
+    )
+
+def _current_version():
+    try:
+        return int(redis_client.get(VERSION_KEY) or 0)
+    except Exception as e:
+        print(f"[WARN] Versão dos planos indisponível no Redis: {e}")
+        return None
+
+def get_snapshot():
+    """Snapshot atual; reconstrói se a versão no Redis mudou desde a última verificação."""
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - _checked_at < ENTITLEMENTS_CHECK_SECONDS:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and now - _checked_at < ENTITLEMENTS_CHECK_SECONDS:
+            return _snapshot
+        version = _current_version()
+        if _snapshot is None or (version is not None and version != _snapshot.version):
+            _snapshot = build_snapshot(version or 0)
+        _checked_at = now
+        return _snapshot
+
+def invalidate_entitlements():
+    """Chamar depois de alterar planos ou features (após o commit)."""
+    global _snapshot
+    try:
+        redis_client.incr(VERSION_KEY)
+    except Exception as e:
+        print(f"[WARN] Falha ao incrementar versão dos planos: {e}")
+    with _lock:
+        _snapshot = None
+
+def get_plan(plan_id):
+    if plan_id is None:
+        return None
+    return get_snapshot().plans.get(plan_id)
+
+def plan_payload(plan_id):
+    plan = get_plan(plan_id)
+    if plan is None:
+        return None
+    return {key: plan.payload[key] for key in ("id", "name", "features")}
+
+def entitlement_claims(plan_id):
+    """Claims adicionadas ao JWT no login."""
+    snapshot = get_snapshot()
+    plan = snapshot.plans.get(plan_id)
+    return {"plan": plan_id, "ent": plan.flags if plan else 0, "ev": snapshot.version}
+
+def user_plan_changed(user_id, plan_id):
+    """
+    Tokens emitidos antes da troca ainda levam o plano antigo nas claims;
+    a troca fica no Redis pelo prazo do token e tem prioridade sobre elas.
+    """
+    try:
+        redis_client.set(f"{USER_PLAN_PREFIX}{user_id}", plan_id, ex=ENTITLEMENTS_CLAIMS_TTL)
+    except Exception as e:
+        print(f"[WARN] Falha ao registrar troca de plano do usuário {user_id}: {e}")
+
+def plan_from_claims(user_id, claims):
+    """
+    Plano do usuário a partir do token. Devolve (plan_id, flags); flags é
+    None quando as claims estão desatualizadas e o snapshot deve decidir.
+    Sem claims (tokens antigos) devolve (None, None) e quem chama vai ao banco.
+    """
+    if "plan" not in claims:
+        return None, None
+    try:
+        override = redis_client.get(f"{USER_PLAN_PREFIX}{user_id}")
+    except Exception:
+        return None, None
+    if override is not None:
+        return int(override), None
+    if claims.get("ev") != get_snapshot().version:
+        return claims["plan"], None
+    return claims["plan"], claims.get("ent", 0)
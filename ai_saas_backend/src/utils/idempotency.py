@@ -0,0 +1,195 @@
+"""
+Suporte ao header Idempotency-Key nos endpoints de geração.
+
+A primeira requisição com uma chave pega um lock no Redis e executa; as
+duplicadas que chegam enquanto ela roda esperam o resultado (single-flight)
+e recebem a mesma resposta. Respostas concluídas ficam guardadas por
+IDEMPOTENCY_TTL e são reenviadas com o header Idempotent-Replayed: true.
+A chave vale por usuário e rota; reutilizá-la com outro corpo devolve 422.
+
+Em respostas SSE o lock só é liberado quando o stream termina. O que fica
+guardado é um resumo reenviável: os eventos do stream sem os `delta` (o
+`done` já traz o texto completo e a mensagem gravada).
+"""
+import os
+import time
+import uuid
+import json
+import hashlib
+from functools import wraps
+from dotenv import load_dotenv
+from flask import request, jsonify, Response, make_response
+from flask_jwt_extended import get_jwt_identity
+from extensions import redis_client
+
+load_dotenv()
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "3600"))
+# Maior que o prazo de uma geração: se o processo morrer, o lock expira sozinho
+IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "300"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+
+HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+KEY_PREFIX = "idem:"
+ACTIVE_FLAG = "idempotency.active"
+STREAM_RESULT = "idempotency.stream_result"
+# Eventos SSE que não entram no resumo guardado
+SKIPPED_STREAM_EVENTS = ("delta",)
+
+# Só apaga o lock se ele ainda for nosso
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def request_fingerprint():
+    return hashlib.sha256(request.get_data(cache=True)).hexdigest()
+
+def _replay(stored):
+    response = Response(stored["body"], status=stored["status"], mimetype=stored["mimetype"])
+    response.headers[REPLAY_HEADER] = "true"
+    return response
+
+def _mismatch():
+    return jsonify({"error": f"{HEADER} já usada com outro corpo de requisição."}), 422
+
+def _save(result_key, fingerprint, status, mimetype, body):
+    redis_client.set(result_key, json.dumps({
+        "fingerprint": fingerprint,
+        "status": status,
+        "mimetype": mimetype,
+        "body": body,
+    }), ex=IDEMPOTENCY_TTL)
+
+def _store(result_key, fingerprint, response):
+    # Erros 5xx não são guardados: o cliente pode tentar de novo com a mesma chave
+    if response.status_code >= 500:
+        return
+    _save(result_key, fingerprint, response.status_code, response.mimetype, response.get_data(as_text=True))
+
+def remember_stream_result(event):
+    """
+    Rotas SSE: evento final (`done`) já com a resposta gravada. Chamar assim
+    que o turno for persistido, antes de emiti-lo: se o cliente desconectar
+    antes de recebê-lo, o reenvio ainda o inclui.
+    """
+    request.environ[STREAM_RESULT] = event
+
+def _is_kept_event(chunk):
+    if not chunk.startswith("event: "):
+        return False  # keep-alive e comentários
+    name = chunk[len("event: "):].split("\n", 1)[0]
+    return name not in SKIPPED_STREAM_EVENTS
+
+class _StreamGuard:
+    """
+    Envolve o corpo de uma resposta SSE: repassa os chunks e, quando o
+    servidor fecha a resposta (fim do stream ou cliente desconectado),
+    guarda o resumo e só então libera o lock.
+    """
+    def __init__(self, response, environ, result_key, fingerprint, release):
+        self.inner = response.response
+        self.status = response.status_code
+        self.mimetype = response.mimetype
+        self.environ = environ
+        self.result_key = result_key
+        self.fingerprint = fingerprint
+        self.release = release
+        self.kept = []
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.inner:
+            text = chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+            if _is_kept_event(text):
+                self.kept.append(text)
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            # Fecha o gerador da rota primeiro: é no finally dele que o turno é gravado
+            if hasattr(self.inner, "close"):
+                self.inner.close()
+            final_event = self.environ.get(STREAM_RESULT)
+            # Sem o evento final o turno não foi gravado: nada a reenviar
+            if final_event:
+                if final_event not in self.kept:
+                    self.kept.append(final_event)
+                _save(self.result_key, self.fingerprint, self.status, self.mimetype, "".join(self.kept))
+        except Exception as e:
+            print(f"[WARN] Falha ao guardar resumo do stream idempotente: {e}")
+        finally:
+            self.release()
+
+def idempotent(fn):
+    """Usar depois de @jwt_required(): a chave é isolada por usuário."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        # generate_text repassa para generate_text_stream: o lock já é desta requisição
+        if not key or request.environ.get(ACTIVE_FLAG):
+            return fn(*args, **kwargs)
+        if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} muito longa."}), 400
+
+        scope = f"{KEY_PREFIX}{get_jwt_identity()}:{request.path}:{key}"
+        result_key, lock_key = f"{scope}:result", f"{scope}:lock"
+        fingerprint = request_fingerprint()
+        token = f"{uuid.uuid4().hex}:{fingerprint}"
+
+        try:
+            deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+            delay = 0.1
+            while True:
+                stored = redis_client.get(result_key)
+                if stored:
+                    stored = json.loads(stored)
+                    if stored["fingerprint"] != fingerprint:
+                        return _mismatch()
+                    print(f"[INFO] Reenviando resposta guardada para {HEADER} {key}")
+                    return _replay(stored)
+
+                if redis_client.set(lock_key, token, nx=True, ex=IDEMPOTENCY_LOCK_TTL):
+                    break
+
+                holder = redis_client.get(lock_key)
+                if holder and not holder.endswith(f":{fingerprint}"):
+                    return _mismatch()
+                if time.monotonic() >= deadline:
+                    return jsonify({"error": f"Requisição com esta {HEADER} ainda em andamento."}), 409
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+        except Exception as e:
+            print(f"[WARN] Idempotência indisponível, executando sem ela: {e}")
+            return fn(*args, **kwargs)
+
+        def release():
+            try:
+                redis_client.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except Exception as e:
+                print(f"[WARN] Falha ao liberar lock de idempotência: {e}")
+
+        request.environ[ACTIVE_FLAG] = True
+        streaming = False
+        try:
+            response = make_response(fn(*args, **kwargs))
+            if response.is_streamed:
+                # O corpo SSE roda depois do return: o lock fica com o gerador
+                response.response = _StreamGuard(response, request.environ, result_key, fingerprint, release)
+                streaming = True
+                return response
+            try:
+                _store(result_key, fingerprint, response)
+            except Exception as e:
+                print(f"[WARN] Falha ao guardar resposta idempotente: {e}")
+            return response
+        finally:
+            if not streaming:
+                release()
+    return wrapper
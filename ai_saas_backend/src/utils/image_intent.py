@@ -0,0 +1,114 @@
+"""
+Detecção de pedido de geração de imagem (chat Gemini).
+
+Um classificador local resolve a maioria dos prompts na hora (sem menção a
+imagem → não; verbo de criação + imagem → sim). Só os casos ambíguos sobem
+para o LLM verificador, com cache LRU por prompt normalizado, e essa
+chamada roda em paralelo com a geração principal.
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.provider_clients import get_gemini_client
+
+load_dotenv()
+IMAGE_INTENT_MODEL = os.getenv("IMAGE_INTENT_MODEL", "gemini-2.0-flash")
+IMAGE_INTENT_CACHE_SIZE = int(os.getenv("IMAGE_INTENT_CACHE_SIZE", "2048"))
+IMAGE_INTENT_WORKERS = int(os.getenv("IMAGE_INTENT_WORKERS", "4"))
+
+NOUNS = (
+    r"imagem|imagens|foto|fotos|fotografia|desenho|desenhos|ilustra[çc][ãa]o|pintura|logo|logotipo|"
+    r"wallpaper|papel de parede|retrato|avatar|figura|arte|picture|image|drawing"
+)
+IMAGE_NOUNS = re.compile(rf"\b({NOUNS})\b")
+DRAW_VERBS = re.compile(r"\b(desenhe|pinte|ilustre|draw|paint)\b")
+# Verbo de criação seguido do substantivo, com no máximo artigos/quantidades no meio
+CREATE_REQUEST = re.compile(
+    r"\b(gere|gera|gerar|crie|cria|criar|fa[çc]a|faz|fazer|produza|renderize|monte|me d[êe]|generate|create|make)"
+    r"(\s+(um|uma|uns|umas|o|a|os|as|me|mim|pra|para|nova|novo|novas|novos|outra|outro|mais|an?|\d+))*"
+    rf"\s+({NOUNS})\b"
+)
+ANALYSIS_VERBS = re.compile(
+    r"\b(analise|analisa|descreva|descreve|explique|explica|leia|l[êe]|traduza|"
+    r"o que (tem|h[áa]|aparece)|nessa|nesta|desta|dessa|anexad[ao])\b"
+)
+CAPABILITY_QUESTION = re.compile(
+    r"\b(pode|podes|consegue|voc[êe] gera|voc[êe] cria|[ée] poss[íi]vel|sabe)\b.*\b(gerar|criar|fazer|desenhar)\b"
+)
+FALLBACK_KEYWORDS = ["imagem", "desenhe", "faça um desenho", "gere uma imagem", "foto de", "pinte"]
+
+_executor = None
+_lock = threading.Lock()
+
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", (prompt or "").strip().lower())
+
+def classify_locally(prompt):
+    """True/False quando o texto é conclusivo; None quando for ambíguo."""
+    text = normalize_prompt(prompt)
+    if not text:
+        return False
+
+    has_noun = bool(IMAGE_NOUNS.search(text))
+    if DRAW_VERBS.search(text) and not CAPABILITY_QUESTION.search(text):
+        return True
+    if not has_noun:
+        return False
+    if CAPABILITY_QUESTION.search(text) and text.endswith("?") and len(text) < 80:
+        return False
+    if CREATE_REQUEST.search(text):
+        # "crie uma imagem ... desta foto anexada" fica para o verificador
+        return None if ANALYSIS_VERBS.search(text) else True
+    if ANALYSIS_VERBS.search(text):
+        return False
+    return None
+
+@lru_cache(maxsize=IMAGE_INTENT_CACHE_SIZE)
+def _ask_llm(text):
+    analysis_prompt = (
+        "Você é um verificador de intenção. "
+        "Analise o texto e diga se ele pede geração de uma imagem. "
+        "Perguntas como 'pode gerar imagem?' não contam. "
+        "Responda apenas SIM ou NÃO.\n\n"
+        f"{text}"
+    )
+    resp = get_gemini_client().models.generate_content(model=IMAGE_INTENT_MODEL, contents=analysis_prompt)
+    return resp.text.strip().upper() == "SIM"
+
+def should_generate_image(prompt):
+    local = classify_locally(prompt)
+    if local is not None:
+        return local
+    try:
+        return _ask_llm(normalize_prompt(prompt))
+    except Exception as e:
+        print(f"[WARN] Verificador de intenção de imagem falhou: {e}")
+        prompt_lower = (prompt or "").lower()
+        return any(k in prompt_lower for k in FALLBACK_KEYWORDS)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IMAGE_INTENT_WORKERS, thread_name_prefix="image-intent")
+    return _executor
+
+def start_image_intent(prompt):
+    """
+    Future com a decisão. Casos conclusivos já voltam resolvidos; os ambíguos
+    consultam o LLM em background enquanto a chamada principal acontece.
+    """
+    local = classify_locally(prompt)
+    if local is not None:
+        future = Future()
+        future.set_result(local)
+        return future
+    return _get_executor().submit(should_generate_image, prompt)
+
+def cache_stats():
+    info = _ask_llm.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "entries": info.currsize, "max_entries": info.maxsize}
@@ -0,0 +1,55 @@
+"""
+Paginação por keyset (cursor) para listagens.
+
+O cursor é opaco para o cliente: os valores da chave de ordenação do último
+item da página, em JSON base64. A próxima página começa logo depois dele,
+então o custo não cresce com o número de páginas já lidas.
+"""
+import json
+import base64
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+def parse_limit(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(request.args.get("limit", default))
+    except ValueError:
+        return default
+    return min(max(limit, 1), maximum)
+
+def encode_cursor(*values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, types):
+    """Devolve os valores do cursor convertidos para `types`; ValueError se for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("cursor inválido")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("cursor inválido")
+    try:
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types)]
+    except (TypeError, ValueError):
+        raise ValueError("cursor inválido")
+
+def keyset_after(columns, values, descending=True):
+    """Condição "vem depois de `values`" na ordem (col1, col2, ...) asc ou desc."""
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        beyond = column < value if descending else column > value
+        conditions.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], beyond))
+    return or_(*conditions)
+
+def page_items(items, limit, cursor_values):
+    """Recebe até limit + 1 itens; devolve (página, próximo cursor ou None)."""
+    if len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    return page, encode_cursor(*cursor_values(page[-1]))
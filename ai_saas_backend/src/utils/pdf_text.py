@@ -0,0 +1,58 @@
+"""
+Extração de texto de PDFs anexados ao chat.
+
+Roda uma vez, quando o ChatAttachment é criado: uma passada do pypdfium2
+(mais rápido que o pdfplumber) no próprio processo, com fallback para
+pdfplumber se o pdfium falhar. Com no máximo PDF_MAX_PAGES páginas, um pool
+de processos custaria mais em IPC e no boot dos filhos do que a extração.
+"""
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "10"))
+
+# O pdfium não é thread-safe; chamadas concorrentes são serializadas
+_pdfium_lock = threading.Lock()
+
+def extract_with_pdfium(path, max_pages):
+    import pypdfium2 as pdfium
+
+    texts = []
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for i in range(min(len(pdf), max_pages)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    return texts
+
+def extract_with_pdfplumber(path, max_pages):
+    import pdfplumber
+
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            if i >= max_pages:
+                break
+            texts.append(page.extract_text() or "")
+    return texts
+
+def extract_pdf_text(path, max_pages=PDF_MAX_PAGES):
+    try:
+        with _pdfium_lock:
+            pages = extract_with_pdfium(path, max_pages)
+    except Exception as e:
+        print(f"[WARN] pypdfium2 falhou em {path}, usando pdfplumber: {e}")
+        try:
+            pages = extract_with_pdfplumber(path, max_pages)
+        except Exception as pe:
+            print(f"[WARN] Falha ao extrair texto do PDF {path}: {pe}")
+            return ""
+
+    return "\n\n".join(t.strip() for t in pages if t and t.strip())
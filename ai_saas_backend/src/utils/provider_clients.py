@@ -0,0 +1,102 @@
+"""
+Registro de clientes HTTP dos provedores de IA.
+
+Cada origem (scheme + host) ganha um único httpx.Client com keep-alive,
+pool configurável e HTTP/2 quando o pacote `h2` está instalado. Os SDKs
+(OpenAI, Anthropic, Gemini) também são criados uma vez por processo e
+reaproveitam esses pools, evitando TCP+TLS a cada chamada.
+"""
+import os
+import threading
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI
+from anthropic import Anthropic
+from google import genai
+from google.genai import types
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("API_KEY")
+ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+PROVIDER_POOL_SIZE = int(os.getenv("PROVIDER_POOL_SIZE", "20"))
+PROVIDER_POOL_KEEPALIVE = int(os.getenv("PROVIDER_POOL_KEEPALIVE", "10"))
+PROVIDER_KEEPALIVE_EXPIRY = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "60"))
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "10"))
+PROVIDER_READ_TIMEOUT = float(os.getenv("PROVIDER_READ_TIMEOUT", "120"))
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+ANTHROPIC_BASE_URL = "https://api.anthropic.com"
+
+_lock = threading.RLock()
+_http_clients = {}
+_sdk_clients = {}
+
+def _client_args():
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=PROVIDER_POOL_SIZE,
+            max_keepalive_connections=PROVIDER_POOL_KEEPALIVE,
+            keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(PROVIDER_READ_TIMEOUT, connect=PROVIDER_CONNECT_TIMEOUT),
+    }
+
+def _origin(url):
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+def get_http_client(base_url):
+    origin = _origin(base_url)
+    client = _http_clients.get(origin)
+    if client is None:
+        with _lock:
+            client = _http_clients.get(origin)
+            if client is None:
+                client = httpx.Client(**_client_args())
+                _http_clients[origin] = client
+    return client
+
+def http_client_for(url):
+    """Atalho para chamadas com URL absoluta (ex.: .../chat/completions)."""
+    return get_http_client(url)
+
+def _get_sdk_client(key, factory):
+    client = _sdk_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _sdk_clients.get(key)
+            if client is None:
+                client = factory()
+                _sdk_clients[key] = client
+    return client
+
+def get_openai_client():
+    return _get_sdk_client("openai", lambda: OpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=get_http_client(OPENAI_BASE_URL),
+    ))
+
+def get_anthropic_client():
+    return _get_sdk_client("anthropic", lambda: Anthropic(
+        api_key=ANTHROPIC_API_KEY,
+        http_client=get_http_client(ANTHROPIC_BASE_URL),
+    ))
+
+def get_gemini_client():
+    # O SDK do Gemini cria o próprio httpx.Client; passamos os mesmos limites
+    return _get_sdk_client("gemini", lambda: genai.Client(
+        api_key=GEMINI_API_KEY,
+        http_options=types.HttpOptions(
+            timeout=int(PROVIDER_READ_TIMEOUT * 1000),
+            client_args={"http2": HTTP2_AVAILABLE, "limits": _client_args()["limits"]},
+        ),
+    ))
@@ -0,0 +1,200 @@
+"""
+Handles de anexos nas Files APIs dos provedores.
+
+Cada (anexo, provedor) é enviado uma única vez; o id/URI remoto fica salvo em
+ProviderFile com a data de expiração (arquivos do Gemini expiram em 48h).
+Quando o handle expira, o anexo é reenviado automaticamente na próxima vez
+que for usado. Os builders referenciam o arquivo pelo handle em vez de
+reenviar os bytes a cada turno.
+
+O handle é gravado numa transação própria (INSERT ... ON CONFLICT DO
+NOTHING), fora do commit do turno: dois turnos simultâneos com o mesmo
+anexo não colidem na constraint única e a resposta paga de nenhum deles é
+perdida. Quem perde a corrida usa o handle do outro.
+
+Arquivos da OpenAI e da Anthropic não expiram. Quando um ProviderFile é
+apagado pela sessão (direto ou em cascata, ao apagar anexo, chat ou
+usuário), o arquivo remoto é apagado no provedor depois do commit, em
+background; um rollback descarta a remoção.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from google.genai import types
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from extensions import db
+from models.chat import ProviderFile, generate_uuid
+from utils.provider_clients import get_gemini_client, get_openai_client, get_anthropic_client
+
+load_dotenv()
+GEMINI_FILE_TTL = timedelta(hours=int(os.getenv("GEMINI_FILE_TTL_HOURS", "47")))
+PROVIDER_FILE_EXPIRY_MARGIN = timedelta(minutes=int(os.getenv("PROVIDER_FILE_EXPIRY_MARGIN_MINUTES", "10")))
+ANTHROPIC_FILES_API = os.getenv("ANTHROPIC_FILES_API", "false").lower() == "true"
+ANTHROPIC_FILES_BETA = "files-api-2025-04-14"
+PROVIDER_FILE_DELETE_WORKERS = int(os.getenv("PROVIDER_FILE_DELETE_WORKERS", "1"))
+# Chave em Session.info com os (provedor, id remoto) apagados na transação corrente
+PENDING_DELETES_KEY = "provider_files_deleted"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _to_naive_utc(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def _upload_gemini(att):
+    remote = get_gemini_client().files.upload(
+        file=att.path,
+        config=types.UploadFileConfig(mime_type=att.mimetype, display_name=att.name),
+    )
+    expires_at = _to_naive_utc(remote.expiration_time) or datetime.utcnow() + GEMINI_FILE_TTL
+    return remote.name, remote.uri, expires_at
+
+def _upload_openai(att):
+    with open(att.path, "rb") as f:
+        remote = get_openai_client().files.create(file=(att.name, f, att.mimetype), purpose="user_data")
+    return remote.id, None, None
+
+def _upload_anthropic(att):
+    with open(att.path, "rb") as f:
+        remote = get_anthropic_client().beta.files.upload(
+            file=(att.name, f, att.mimetype),
+            betas=[ANTHROPIC_FILES_BETA],
+        )
+    return remote.id, None, None
+
+UPLOADERS = {
+    "gemini": _upload_gemini,
+    "openai": _upload_openai,
+    "anthropic": _upload_anthropic,
+}
+
+def _delete_gemini(remote_id):
+    get_gemini_client().files.delete(name=remote_id)
+
+def _delete_openai(remote_id):
+    get_openai_client().files.delete(remote_id)
+
+def _delete_anthropic(remote_id):
+    get_anthropic_client().beta.files.delete(remote_id, betas=[ANTHROPIC_FILES_BETA])
+
+DELETERS = {
+    "gemini": _delete_gemini,
+    "openai": _delete_openai,
+    "anthropic": _delete_anthropic,
+}
+
+def _insert_ignore(table, values):
+    """INSERT que não faz nada se (attachment_id, provider) já existir."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).values(**values).on_conflict_do_nothing(
+            index_elements=["attachment_id", "provider"])
+    if dialect == "sqlite":
+        return sqlite.insert(table).values(**values).on_conflict_do_nothing(
+            index_elements=["attachment_id", "provider"])
+    return insert(table).values(**values)
+
+def _save_handle(att, provider, values, renew):
+    """Grava o handle numa transação curta e própria e devolve o registro lido de volta."""
+    table = ProviderFile.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as connection:
+            if renew:
+                connection.execute(
+                    update(table)
+                    .where(table.c.attachment_id == att.id, table.c.provider == provider)
+                    .values(updated_at=now, **values)
+                )
+            else:
+                connection.execute(_insert_ignore(table, {
+                    "id": generate_uuid(), "attachment_id": att.id, "provider": provider,
+                    "created_at": now, "updated_at": now, **values,
+                }))
+    except IntegrityError:
+        # Bancos sem ON CONFLICT: outro turno gravou primeiro
+        pass
+
+    handle = db.session.execute(
+        select(ProviderFile)
+        .where(ProviderFile.attachment_id == att.id, ProviderFile.provider == provider)
+        .execution_options(populate_existing=True)
+    ).scalar_one()
+    if handle not in att.provider_files:
+        # Mantém a coleção já carregada coerente sem marcar o anexo como alterado
+        set_committed_value(att, "provider_files", list(att.provider_files) + [handle])
+    return handle
+
+def get_provider_file(att, provider):
+    """
+    Devolve o ProviderFile válido do anexo para o provedor, enviando (ou
+    reenviando, se expirado) quando necessário. O registro é gravado na hora,
+    numa transação própria; o commit do turno não depende dele.
+    """
+    now = datetime.utcnow()
+    handle = next((h for h in att.provider_files if h.provider == provider), None)
+    if handle is not None and handle.is_valid(now + PROVIDER_FILE_EXPIRY_MARGIN):
+        return handle
+
+    if handle is not None:
+        print(f"[INFO] Handle {provider} do anexo {att.name} expirou, reenviando")
+
+    remote_id, remote_uri, expires_at = UPLOADERS[provider](att)
+    values = {
+        "remote_id": remote_id,
+        "remote_uri": remote_uri,
+        "mimetype": att.mimetype,
+        "expires_at": expires_at,
+    }
+    handle = _save_handle(att, provider, values, renew=handle is not None)
+    print(f"[INFO] Anexo {att.name} enviado para {provider} ({handle.remote_id})")
+    return handle
+
+def delete_remote_files(handles):
+    """Apaga no provedor cada (provedor, id remoto); falhas só vão para o log."""
+    for provider, remote_id in handles:
+        deleter = DELETERS.get(provider)
+        if deleter is None:
+            continue
+        try:
+            deleter(remote_id)
+            print(f"[INFO] Arquivo {remote_id} apagado em {provider}")
+        except Exception as e:
+            print(f"[WARN] Falha ao apagar arquivo {remote_id} em {provider}: {e}")
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PROVIDER_FILE_DELETE_WORKERS, thread_name_prefix="provider-files")
+    return _executor
+
+def schedule_remote_deletes(handles):
+    _get_executor().submit(delete_remote_files, handles)
+
+@event.listens_for(Session, "after_flush")
+def _collect_deleted_handles(session, flush_context):
+    deleted = [(h.provider, h.remote_id) for h in session.deleted if isinstance(h, ProviderFile)]
+    if deleted:
+        session.info.setdefault(PENDING_DELETES_KEY, []).extend(deleted)
+
+@event.listens_for(Session, "after_commit")
+def _delete_after_commit(session):
+    handles = session.info.pop(PENDING_DELETES_KEY, None)
+    if handles:
+        schedule_remote_deletes(handles)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_DELETES_KEY, None)
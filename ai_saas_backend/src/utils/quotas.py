@@ -0,0 +1,243 @@
+"""
+Cotas dos planos aplicadas antes de qualquer chamada aos provedores.
+
+As features numéricas do plano (PlanFeature.value = "50", "1000"...) viram
+token buckets por usuário no Redis: a capacidade é o limite do período e
+os tokens voltam continuamente ao longo dele. Todos os buckets de uma
+requisição são verificados e debitados numa única chamada Lua atômica
+(tudo ou nada). Features booleanas (generate_video, attach_files e a de
+modelos premium) são checadas antes, pelo bitmask das claims do JWT ou
+pelo snapshot de utils.entitlements, sem ir ao banco.
+
+O débito acontece antes da rota validar a entrada e chamar o provedor; se
+a resposta for de erro (4xx/5xx) o custo é devolvido. Falhas que a rota
+responde com 200 (texto de erro salvo no chat, stream interrompido) chamam
+refund_request_quota(); jobs de vídeo que falham chamam refund_user_quota().
+"""
+import os
+import time
+import math
+from functools import wraps
+from dotenv import load_dotenv
+from flask import request, jsonify, make_response
+from flask_jwt_extended import get_jwt_identity, get_jwt
+from extensions import db, redis_client
+from models import User
+from providers import get_capabilities
+from utils.entitlements import get_plan, plan_from_claims, flag_enabled, FLAG_BITS
+
+load_dotenv()
+# Duração cobrada por job de vídeo (o Veo gera clipes de 8s)
+VIDEO_SECONDS_PER_JOB = int(os.getenv("VIDEO_SECONDS_PER_JOB", "8"))
+
+DAY_MS = 24 * 3600 * 1000
+MONTH_MS = 30 * DAY_MS
+KEY_PREFIX = "quota:"
+CHECKED_FLAG = "quota.checked"
+# (user_id, custos) debitados nesta requisição, para devolver se ela falhar
+DEBIT_KEY = "quota.debit"
+
+# feature numérica → (período do bucket, descrição para a mensagem de erro)
+QUOTA_FEATURES = {
+    "messages_per_day": (DAY_MS, "mensagens por dia"),
+    "images_per_month": (MONTH_MS, "imagens por mês"),
+    "video_seconds_per_month": (MONTH_MS, "segundos de vídeo por mês"),
+}
+
+# KEYS: um bucket por feature. ARGV: agora (ms) e, por bucket, capacidade, período (ms) e custo.
+# Devolve {1, 0, 0} se debitou tudo ou {0, índice do bucket, espera em ms} sem debitar nada.
+_TAKE_TOKENS = """
+local now = tonumber(ARGV[1])
+local new_tokens = {}
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 3
+    local capacity = tonumber(ARGV[base + 1])
+    local period = tonumber(ARGV[base + 2])
+    local cost = tonumber(ARGV[base + 3])
+    if capacity <= 0 then
+        return {0, i, -1}
+    end
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if tokens == nil or ts == nil then
+        tokens = capacity
+        ts = now
+    end
+    local rate = capacity / period
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    if tokens < cost then
+        return {0, i, math.ceil((cost - tokens) / rate)}
+    end
+    new_tokens[i] = tokens - cost
+end
+for i, key in ipairs(KEYS) do
+    local period = tonumber(ARGV[1 + (i - 1) * 3 + 2])
+    redis.call('HSET', key, 'tokens', tostring(new_tokens[i]), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, period)
+end
+return {1, 0, 0}
+"""
+
+# Devolve o custo a cada bucket (sem passar da capacidade). ARGV: por bucket, capacidade e custo.
+_REFUND_TOKENS = """
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[(i - 1) * 2 + 1])
+    local cost = tonumber(ARGV[(i - 1) * 2 + 2])
+    local tokens = tonumber(redis.call('HGET', key, 'tokens'))
+    if tokens ~= nil then
+        redis.call('HSET', key, 'tokens', tostring(math.min(capacity, tokens + cost)))
+    end
+end
+return 1
+"""
+
+def _bucket_keys(user_id, features):
+    return [f"{KEY_PREFIX}{user_id}:{feature}" for feature in features]
+
+def take_tokens(user_id, costs, now_ms=None):
+    """
+    Debita `costs` ({feature: (capacidade, custo)}) dos buckets do usuário
+    numa chamada só. Devolve None se passou ou (feature, espera em s) se não.
+    """
+    if not costs:
+        return None
+    features = list(costs)
+    keys = _bucket_keys(user_id, features)
+    args = [now_ms if now_ms is not None else int(time.time() * 1000)]
+    for feature in features:
+        capacity, cost = costs[feature]
+        args += [capacity, QUOTA_FEATURES[feature][0], cost]
+
+    allowed, index, wait_ms = redis_client.eval(_TAKE_TOKENS, len(keys), *keys, *args)
+    if allowed:
+        return None
+    retry_after = None if wait_ms < 0 else max(1, math.ceil(wait_ms / 1000))
+    return features[index - 1], retry_after
+
+def refund_tokens(user_id, costs):
+    """Desfaz o débito de take_tokens quando a requisição foi recusada depois dele."""
+    if not costs:
+        return
+    features = list(costs)
+    args = []
+    for feature in features:
+        args += list(costs[feature])
+    redis_client.eval(_REFUND_TOKENS, len(features), *_bucket_keys(user_id, features), *args)
+
+def refund_request_quota():
+    """Devolve o que @quota_required debitou nesta requisição (uma vez só)."""
+    debit = request.environ.pop(DEBIT_KEY, None)
+    if not debit:
+        return
+    try:
+        refund_tokens(*debit)
+    except Exception as e:
+        print(f"[WARN] Falha ao devolver cota: {e}")
+
+def refund_user_quota(user_id, raw_costs):
+    """Devolução fora de uma requisição (ex.: job de vídeo que falhou no poller)."""
+    plan_id = db.session.query(User.plan_id).filter_by(id=user_id).scalar()
+    plan = get_plan(plan_id)
+    if plan is None:
+        return
+    try:
+        refund_tokens(user_id, _bucket_costs(raw_costs, plan.values))
+    except Exception as e:
+        print(f"[WARN] Falha ao devolver cota: {e}")
+
+def _request_data():
+    if (request.content_type or "").startswith("multipart/form-data"):
+        return request.form
+    return request.get_json(silent=True) or {}
+
+def _forbidden(feature, message):
+    return jsonify({"error": message, "feature": feature}), 403
+
+def _requirements(kind, entitlements):
+    """Features booleanas exigidas e custos numéricos desta requisição."""
+    required, costs = [], {}
+    if kind == "text":
+        model = _request_data().get("model", "gpt-4o")
+        if get_capabilities(model).premium:
+            required.append("generate_text")
+        if request.files.getlist("files"):
+            required.append("attach_files")
+        costs["messages_per_day"] = 1
+    elif kind == "image":
+        required.append("generate_image")
+        costs["images_per_month"] = 1
+    elif kind == "video":
+        required.append("generate_video")
+        costs["video_seconds_per_month"] = VIDEO_SECONDS_PER_JOB
+
+    return required, _bucket_costs(costs, entitlements)
+
+def _bucket_costs(costs, entitlements):
+    # Feature ausente do plano ou sem limite numérico não entra no bucket
+    return {
+        feature: (entitlements[feature], cost)
+        for feature, cost in costs.items()
+        if isinstance(entitlements.get(feature), int) and not isinstance(entitlements.get(feature), bool)
+    }
+
+def quota_required(kind):
+    """
+    Usar depois de @jwt_required() e @idempotent (respostas reenviadas não
+    consomem cota). kind: "text", "image" ou "video".
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # generate_text repassa para generate_text_stream: a cota já foi debitada
+            if request.environ.get(CHECKED_FLAG):
+                return fn(*args, **kwargs)
+            request.environ[CHECKED_FLAG] = True
+
+            user_id = get_jwt_identity()
+            plan_id, flags = plan_from_claims(user_id, get_jwt())
+            if plan_id is None:
+                # Token sem claims de plano (emitido antes delas existirem)
+                plan_id = db.session.query(User.plan_id).filter_by(id=user_id).scalar()
+            plan = get_plan(plan_id)
+            if plan is None:
+                return fn(*args, **kwargs)
+
+            entitlements = plan.values
+            required, costs = _requirements(kind, entitlements)
+            for feature in required:
+                if flags is not None and feature in FLAG_BITS:
+                    allowed = flag_enabled(flags, feature)
+                else:
+                    allowed = plan.allows(feature)
+                if not allowed:
+                    return _forbidden(feature, "Seu plano atual não permite este recurso.")
+
+            try:
+                rejected = take_tokens(user_id, costs)
+            except Exception as e:
+                print(f"[WARN] Verificação de cota indisponível, liberando requisição: {e}")
+                rejected = None
+
+            if rejected:
+                feature, retry_after = rejected
+                description = QUOTA_FEATURES[feature][1]
+                response = jsonify({
+                    "error": f"Limite do plano atingido ({entitlements[feature]} {description}).",
+                    "feature": feature,
+                    "retry_after": retry_after,
+                })
+                response.status_code = 429
+                if retry_after:
+                    response.headers["Retry-After"] = str(retry_after)
+                return response
+
+            if costs:
+                request.environ[DEBIT_KEY] = (user_id, costs)
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code >= 400:
+                # Entrada recusada ou falha da rota/provedor: nada foi gerado, a cota volta
+                refund_request_quota()
+            return response
+        return wrapper
+    return decorator
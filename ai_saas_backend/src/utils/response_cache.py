@@ -0,0 +1,108 @@
+"""
+Cache opcional de respostas para gerações determinísticas.
+
+A chave é o sha256 do pedido normalizado (usuário, modelo, mensagens,
+temperatura e o hash de cada anexo), então o mesmo histórico com o mesmo
+prompt acerta o cache mesmo vindo de outro chat do mesmo usuário; nunca de
+outro usuário. Os valores ficam no Redis com TTL e um limite de tamanho por
+entrada. Só é usado com RESPONSE_CACHE_ENABLED=true.
+"""
+import os
+import json
+import hashlib
+import threading
+from dotenv import load_dotenv
+from extensions import redis_client
+from utils.attachment_cache import attachment_cache
+
+load_dotenv()
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+# Acima dessa temperatura a resposta varia demais para valer a pena reaproveitar
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0.2"))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024)))
+
+# Mudou o formato do payload ou do valor? Troque a versão para invalidar tudo
+CACHE_PREFIX = "gencache:v2:"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "skipped_too_large": 0, "errors": 0}
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+def canonical_hash(payload):
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def attachment_fingerprint(att):
+    """Identifica o anexo pelo conteúdo, não pelo caminho (cada upload ganha um nome novo)."""
+    try:
+        digest = attachment_cache.file_hash(att.path)
+    except OSError:
+        digest = f"{att.name}:{att.size_bytes}"
+    return {"sha256": digest, "mimetype": att.mimetype}
+
+def text_cache_key(user_id, model, temperature, session_messages):
+    return CACHE_PREFIX + "text:" + canonical_hash({
+        "user_id": user_id,
+        "model": model,
+        "temperature": temperature,
+        "messages": [
+            {
+                "role": m["role"],
+                "content": m["content"],
+                "attachments": [attachment_fingerprint(a) for a in (m.get("attachments") or [])],
+            }
+            for m in session_messages
+        ],
+    })
+
+def image_cache_key(user_id, request_payload):
+    return CACHE_PREFIX + "image:" + canonical_hash({"user_id": user_id, "request": request_payload})
+
+def text_cache_allowed(temperature, fixed_temperature=False, regenerate=False):
+    # Modelos de temperatura fixa não aceitam 0, então nunca são determinísticos
+    return (
+        RESPONSE_CACHE_ENABLED
+        and not regenerate
+        and not fixed_temperature
+        and temperature is not None
+        and temperature <= RESPONSE_CACHE_MAX_TEMPERATURE
+    )
+
+def image_cache_allowed(regenerate=False):
+    return RESPONSE_CACHE_ENABLED and not regenerate
+
+def get_cached(key):
+    try:
+        raw = redis_client.get(key)
+    except Exception as e:
+        _count("errors")
+        print(f"[WARN] Cache de respostas indisponível: {e}")
+        return None
+
+    if raw is None:
+        _count("misses")
+        return None
+    _count("hits")
+    return json.loads(raw)
+
+def store_cached(key, value):
+    encoded = json.dumps(value, ensure_ascii=False)
+    if len(encoded.encode("utf-8")) > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+        _count("skipped_too_large")
+        return False
+    try:
+        redis_client.set(key, encoded, ex=RESPONSE_CACHE_TTL)
+    except Exception as e:
+        _count("errors")
+        print(f"[WARN] Falha ao gravar no cache de respostas: {e}")
+        return False
+    _count("stores")
+    return True
+
+def cache_stats():
+    with _lock:
+        return {"enabled": RESPONSE_CACHE_ENABLED, **_stats}
@@ -0,0 +1,239 @@
+"""
+Busca full-text em chats, mensagens, conteúdos gerados e projetos.
+
+Cada registro indexável tem uma linha em search_documents, atualizada num
+listener after_flush da sessão: inserir, editar ou apagar o registro
+reescreve o documento na mesma transação. Alterações feitas com
+Query.update() não passam pela sessão e devem chamar reindex_chat_title
+(ou equivalente). A consulta usa o índice do banco (tsvector/GIN no
+Postgres, FTS5 no SQLite) e devolve resultados ordenados por relevância,
+com o trecho encontrado destacado.
+"""
+import os
+import re
+import html
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, select, insert, delete, literal, text, bindparam, func
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Chat, ChatMessage, GeneratedContent, Project
+from models.search import SearchDocument, SEARCH_TEXT_CONFIG
+
+load_dotenv()
+# Teto de ids devolvidos quando a busca só filtra uma listagem (?q= em /api/chats etc.)
+SEARCH_FILTER_LIMIT = int(os.getenv("SEARCH_FILTER_LIMIT", "500"))
+SNIPPET_WORDS = int(os.getenv("SEARCH_SNIPPET_WORDS", "16"))
+
+KINDS = ("chat", "message", "content", "project")
+
+# Marcadores internos do destaque: escapamos o HTML do texto e só então viram <mark>
+_START, _STOP = "\ue000", "\ue001"
+
+def _chat_doc(chat):
+    return {"user_id": chat.user_id, "chat_id": chat.id, "title": chat.title or "", "body": ""}
+
+def _message_doc(message):
+    return {"chat_id": message.chat_id, "title": "", "body": message.content or ""}
+
+def _content_doc(content):
+    return {"user_id": content.user_id, "chat_id": None, "title": content.content_type or "", "body": content.prompt or ""}
+
+def _project_doc(project):
+    return {"user_id": project.user_id, "chat_id": None, "title": project.name or "", "body": project.description or ""}
+
+# modelo → (kind, colunas indexadas, função que monta o documento)
+INDEXED = (
+    (Chat, "chat", ("title",), _chat_doc),
+    (ChatMessage, "message", ("content",), _message_doc),
+    (GeneratedContent, "content", ("prompt",), _content_doc),
+    (Project, "project", ("name", "description"), _project_doc),
+)
+
+def _indexed_spec(obj):
+    for model, kind, fields, build in INDEXED:
+        if isinstance(obj, model):
+            return kind, fields, build
+    return None
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields)
+
+def _write_document(connection, kind, ref_id, doc):
+    connection.execute(delete(SearchDocument).where(SearchDocument.kind == kind, SearchDocument.ref_id == ref_id))
+    if not (doc["title"] or doc["body"]):
+        return
+    if "user_id" in doc:
+        connection.execute(insert(SearchDocument).values(kind=kind, ref_id=ref_id, **doc))
+    else:
+        # Mensagem: o dono vem do chat (ChatMessage.user_id nem sempre é preenchido)
+        connection.execute(
+            insert(SearchDocument).from_select(
+                ["kind", "ref_id", "user_id", "chat_id", "title", "body"],
+                select(literal(kind), literal(ref_id), Chat.user_id, literal(doc["chat_id"]),
+                       literal(doc["title"]), literal(doc["body"]))
+                .where(Chat.id == doc["chat_id"]),
+            )
+        )
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_documents(session, flush_context):
+    connection = session.connection()
+    for obj in list(session.new) + list(session.dirty):
+        spec = _indexed_spec(obj)
+        if spec is None:
+            continue
+        kind, fields, build = spec
+        if obj in session.new or _changed(obj, fields):
+            _write_document(connection, kind, obj.id, build(obj))
+
+    for obj in session.deleted:
+        spec = _indexed_spec(obj)
+        if spec is None:
+            continue
+        kind = spec[0]
+        connection.execute(delete(SearchDocument).where(SearchDocument.kind == kind, SearchDocument.ref_id == obj.id))
+        if kind == "chat":
+            # Garante que as mensagens do chat saiam do índice mesmo sem terem sido carregadas
+            connection.execute(delete(SearchDocument).where(SearchDocument.chat_id == obj.id))
+
+def reindex_chat_title(chat_id):
+    """Para títulos trocados com Query.update() (fora do listener da sessão)."""
+    chat = db.session.get(Chat, chat_id)
+    if chat is not None:
+        _write_document(db.session.connection(), "chat", chat.id, _chat_doc(chat))
+        db.session.commit()
+
+def rebuild_search_index(only_if_empty=True):
+    """Popula search_documents a partir das tabelas de origem (um INSERT ... SELECT por tipo)."""
+    if only_if_empty and db.session.query(SearchDocument.id).first() is not None:
+        return 0
+    columns = ["kind", "ref_id", "user_id", "chat_id", "title", "body"]
+    empty = literal("")
+    sources = [
+        select(literal("chat"), Chat.id, Chat.user_id, Chat.id, func.coalesce(Chat.title, empty), empty)
+        .where(Chat.title.isnot(None), Chat.title != ""),
+        select(literal("message"), ChatMessage.id, Chat.user_id, ChatMessage.chat_id, empty, ChatMessage.content)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.content.isnot(None), ChatMessage.content != ""),
+        select(literal("content"), GeneratedContent.id, GeneratedContent.user_id, literal(None),
+               func.coalesce(GeneratedContent.content_type, empty), func.coalesce(GeneratedContent.prompt, empty)),
+        select(literal("project"), Project.id, Project.user_id, literal(None),
+               func.coalesce(Project.name, empty), func.coalesce(Project.description, empty)),
+    ]
+    db.session.execute(delete(SearchDocument))
+    total = 0
+    for source in sources:
+        total += db.session.execute(insert(SearchDocument).from_select(columns, source)).rowcount or 0
+    db.session.commit()
+    if total:
+        print(f"[INFO] Índice de busca reconstruído com {total} documentos")
+    return total
+
+def _fts5_query(q):
+    """Cada palavra vira um termo entre aspas (sem operadores do usuário); a última casa por prefixo."""
+    words = re.findall(r"\w+", q, flags=re.UNICODE)
+    if not words:
+        return None
+    terms = ['"' + w.replace('"', '""') + '"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def _highlight(fragment):
+    return html.escape(fragment or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+def _kinds_param(kinds):
+    return bindparam("kinds", value=list(kinds), expanding=True)
+
+def _search_postgres(user_id, q, kinds, limit, offset):
+    statement = text(f"""
+        WITH hits AS (
+            SELECT d.id, d.kind, d.ref_id, d.chat_id, d.title, d.body, ts_rank_cd(d.tsv, query) AS rank, query
+            FROM search_documents d, websearch_to_tsquery('{SEARCH_TEXT_CONFIG}', :q) AS query
+            WHERE d.user_id = :user_id AND d.kind IN :kinds AND d.tsv @@ query
+            ORDER BY rank DESC, d.id DESC
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT id, kind, ref_id, chat_id, title, rank,
+               ts_headline('{SEARCH_TEXT_CONFIG}', CASE WHEN body <> '' THEN body ELSE title END, query,
+                           :headline_options) AS snippet
+        FROM hits
+        ORDER BY rank DESC, id DESC
+    """).bindparams(_kinds_param(kinds))
+    options = f"StartSel={_START}, StopSel={_STOP}, MaxWords={SNIPPET_WORDS * 2}, MinWords={SNIPPET_WORDS // 2}"
+    rows = db.session.execute(statement, {
+        "q": q, "user_id": user_id, "limit": limit, "offset": offset, "headline_options": options,
+    }).mappings().all()
+    return [dict(r) for r in rows]
+
+def _search_sqlite(user_id, q, kinds, limit, offset):
+    match = _fts5_query(q)
+    if match is None:
+        return []
+    statement = text("""
+        SELECT d.id, d.kind, d.ref_id, d.chat_id, d.title,
+               bm25(search_fts, 4.0, 1.0) AS rank,
+               snippet(search_fts, 1, :start, :stop, '…', :words) AS body_snippet,
+               highlight(search_fts, 0, :start, :stop) AS title_snippet
+        FROM search_fts JOIN search_documents d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH :match AND d.user_id = :user_id AND d.kind IN :kinds
+        ORDER BY rank, d.id DESC
+        LIMIT :limit OFFSET :offset
+    """).bindparams(_kinds_param(kinds))
+    rows = db.session.execute(statement, {
+        "match": match, "user_id": user_id, "limit": limit, "offset": offset,
+        "start": _START, "stop": _STOP, "words": SNIPPET_WORDS,
+    }).mappings().all()
+    results = []
+    for r in rows:
+        row = dict(r)
+        body_snippet, title_snippet = row.pop("body_snippet"), row.pop("title_snippet")
+        # bm25: menor é melhor; invertido para o cliente comparar como no Postgres
+        row["rank"] = -row["rank"]
+        row["snippet"] = body_snippet if _START in (body_snippet or "") else title_snippet
+        results.append(row)
+    return results
+
+def _search_fallback(user_id, q, kinds, limit, offset):
+    """Outros bancos: sem índice full-text, só para desenvolvimento."""
+    pattern = f"%{q}%"
+    docs = (
+        SearchDocument.query
+        .filter(SearchDocument.user_id == user_id, SearchDocument.kind.in_(kinds))
+        .filter(SearchDocument.title.ilike(pattern) | SearchDocument.body.ilike(pattern))
+        .order_by(SearchDocument.id.desc())
+        .limit(limit).offset(offset)
+        .all()
+    )
+    marked = re.compile(re.escape(q), re.IGNORECASE)
+    return [{
+        "id": d.id, "kind": d.kind, "ref_id": d.ref_id, "chat_id": d.chat_id, "title": d.title, "rank": 0.0,
+        "snippet": marked.sub(lambda m: _START + m.group(0) + _STOP, d.body or d.title),
+    } for d in docs]
+
+def search_documents(user_id, q, kinds=KINDS, limit=20, offset=0):
+    """Resultados ordenados por relevância: dicts com kind, ref_id, chat_id, title, rank e snippet (HTML)."""
+    q = (q or "").strip()
+    kinds = [k for k in kinds if k in KINDS]
+    if not q or not kinds:
+        return []
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        rows = _search_postgres(user_id, q, kinds, limit, offset)
+    elif dialect == "sqlite":
+        rows = _search_sqlite(user_id, q, kinds, limit, offset)
+    else:
+        rows = _search_fallback(user_id, q, kinds, limit, offset)
+    for row in rows:
+        row["snippet"] = _highlight(row["snippet"])
+    return rows
+
+def search_chat_snippets(user_id, q):
+    """chat_id → trecho mais relevante (título ou mensagem), na ordem de relevância."""
+    snippets = {}
+    for row in search_documents(user_id, q, ("chat", "message"), limit=SEARCH_FILTER_LIMIT):
+        snippets.setdefault(row["chat_id"], row["snippet"])
+    return snippets
+
+def search_ref_ids(user_id, q, kind):
+    return [row["ref_id"] for row in search_documents(user_id, q, (kind,), limit=SEARCH_FILTER_LIMIT)]
@@ -0,0 +1,186 @@
+"""
+Uso de tokens por mensagem e agregados por usuário/modelo/dia.
+
+Cada geração incrementa dois hashes no Redis (o do modelo e o total do
+usuário no dia), então cotas e dashboards leem contadores em O(1). Um
+worker copia periodicamente os hashes alterados para a tabela
+usage_rollups; como os hashes guardam o acumulado do dia, a cópia é um
+upsert de valores absolutos e pode ser repetida sem contar em dobro.
+"""
+import os
+import time
+import threading
+from datetime import datetime, date
+from dotenv import load_dotenv
+from extensions import db, redis_client
+
+load_dotenv()
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "60"))
+USAGE_FLUSH_BATCH = int(os.getenv("USAGE_FLUSH_BATCH", "500"))
+# Os hashes só precisam sobreviver até o próximo flush; alguns dias de folga
+USAGE_KEY_TTL = int(os.getenv("USAGE_KEY_TTL", str(8 * 24 * 3600)))
+
+KEY_PREFIX = "usage:"
+DIRTY_SET = "usage:dirty"
+TOTAL_MODEL = "_total"
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "total_tokens", "cost_microusd")
+
+# Preço em USD por 1M de tokens: (entrada, saída).
+# A busca é pelo prefixo mais longo que casar com o nome do modelo.
+MODEL_PRICING = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "gpt-5.1": (1.25, 10.00),
+    "gpt-5.2": (1.75, 14.00),
+    "o1-mini": (1.10, 4.40),
+    "o1": (15.00, 60.00),
+    "o3-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+    "claude-haiku-4-5": (1.00, 5.00),
+    "claude-sonnet-4-5": (3.00, 15.00),
+    "claude-opus-4-5": (5.00, 25.00),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "sonar-deep-research": (2.00, 8.00),
+    "sonar-reasoning-pro": (2.00, 8.00),
+    "sonar-reasoning": (1.00, 5.00),
+    "sonar-pro": (3.00, 15.00),
+    "sonar": (1.00, 1.00),
+}
+DEFAULT_PRICING = (0.0, 0.0)
+
+# Modelos sem preço já avisados no log (um aviso por modelo e processo)
+_unpriced_models = set()
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+
+def get_model_pricing(model):
+    if model and model.endswith(":free"):
+        return DEFAULT_PRICING
+    best = None
+    for prefix in MODEL_PRICING:
+        if model and model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    if best:
+        return MODEL_PRICING[best]
+    if model not in _unpriced_models:
+        _unpriced_models.add(model)
+        print(f"[WARN] Modelo sem preço em MODEL_PRICING, custo registrado como 0: {model}")
+    return DEFAULT_PRICING
+
+def normalize_usage(usage):
+    """Converte o uso devolvido pelo adapter em inteiros; None se o provedor não informou."""
+    if not usage:
+        return None
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    total = int(usage.get("total_tokens") or 0) or prompt + completion
+    if not total:
+        return None
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": total}
+
+def estimate_cost_microusd(model, usage):
+    input_price, output_price = get_model_pricing(model)
+    # preço por 1M de tokens em USD == micro-dólares por token
+    return round(usage["prompt_tokens"] * input_price + usage["completion_tokens"] * output_price)
+
+def usage_key(user_id, model, day):
+    return f"{KEY_PREFIX}{day.isoformat()}:{user_id}:{model}"
+
+def record_usage(user_id, model, usage, day=None):
+    """Soma uma geração aos contadores do dia. Falhas do Redis não derrubam a requisição."""
+    usage = normalize_usage(usage)
+    if usage is None or not user_id:
+        return None
+
+    day = day or datetime.utcnow().date()
+    increments = {**usage, "requests": 1, "cost_microusd": estimate_cost_microusd(model, usage)}
+    try:
+        pipe = redis_client.pipeline()
+        for key in (usage_key(user_id, model, day), usage_key(user_id, TOTAL_MODEL, day)):
+            for field, amount in increments.items():
+                pipe.hincrby(key, field, amount)
+            pipe.expire(key, USAGE_KEY_TTL)
+            pipe.sadd(DIRTY_SET, key)
+        pipe.execute()
+    except Exception as e:
+        print(f"[WARN] Falha ao registrar uso no Redis: {e}")
+    return increments
+
+def get_usage(user_id, model=TOTAL_MODEL, day=None):
+    day = day or datetime.utcnow().date()
+    raw = redis_client.hgetall(usage_key(user_id, model, day)) or {}
+    return {field: int(raw.get(field, 0)) for field in COUNTERS}
+
+def _parse_key(key):
+    _, day, user_id, model = key.split(":", 3)
+    return user_id, model, date.fromisoformat(day)
+
+def flush_usage_rollups():
+    """Copia os hashes alterados desde o último flush para usage_rollups. Devolve quantas chaves processou."""
+    from models.usage import UsageRollup
+
+    keys = redis_client.spop(DIRTY_SET, USAGE_FLUSH_BATCH) or []
+    if not keys:
+        return 0
+
+    pipe = redis_client.pipeline()
+    for key in keys:
+        pipe.hgetall(key)
+    values = pipe.execute()
+
+    parsed = [(key, *_parse_key(key), raw) for key, raw in zip(keys, values) if raw]
+    if not parsed:
+        return len(keys)
+
+    existing = {
+        (r.user_id, r.model, r.day): r
+        for r in UsageRollup.query.filter(
+            UsageRollup.user_id.in_({p[1] for p in parsed}),
+            UsageRollup.day.in_({p[3] for p in parsed}),
+        )
+    }
+    try:
+        for key, user_id, model, day, raw in parsed:
+            row = existing.get((user_id, model, day))
+            if row is None:
+                row = UsageRollup(user_id=user_id, model=model, day=day)
+                db.session.add(row)
+            for field in COUNTERS:
+                setattr(row, field, int(raw.get(field, 0)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # Devolve as chaves para o próximo flush
+        redis_client.sadd(DIRTY_SET, *keys)
+        raise
+    return len(keys)
+
+def _usage_flusher_loop(app):
+    while True:
+        time.sleep(USAGE_FLUSH_INTERVAL)
+        with app.app_context():
+            try:
+                while flush_usage_rollups() >= USAGE_FLUSH_BATCH:
+                    pass
+            except Exception as e:
+                print(f"[ERROR] Flush de uso: {e}")
+            finally:
+                db.session.remove()
+
+def start_usage_flusher(app):
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(target=_usage_flusher_loop, args=(app,), daemon=True, name="usage-flusher")
+            _flusher_thread.start()
+    return _flusher_thread
@@ -1,5 +1,8 @@
 from extensions import redis_client, db
-from models import User, Plan, Feature, PlanFeature
+from sqlalchemy import select, update, func
+from models import User, Plan, Feature, PlanFeature, Chat, ChatMessage
+from models.chat import SNIPPET_LENGTH
+from utils.entitlements import invalidate_entitlements
 
 from flask_jwt_extended.exceptions import RevokedTokenError
 import redis
@@ -25,39 +28,55 @@ def create_default_plans():
         "customization": "Personalização das respostas (temperatura)",
         "generate_image": "Geração de imagem",
         "generate_video": "Geração de vídeo",
+        "messages_per_day": "Mensagens por dia",
+        "images_per_month": "Imagens por mês",
+        "video_seconds_per_month": "Segundos de vídeo por mês",
     }
 
-    feature_objs = {}
+    # Limites numéricos por plano (aplicados por utils.quotas)
+    plan_limits = {
+        "Básico": {"messages_per_day": "50", "images_per_month": "10", "video_seconds_per_month": "0"},
+        "Pro": {"messages_per_day": "500", "images_per_month": "100", "video_seconds_per_month": "120"},
+        "Premium": {"messages_per_day": "2000", "images_per_month": "500", "video_seconds_per_month": "600"},
+    }
+
+    # Carrega tudo de uma vez em vez de uma consulta por feature e por plano
+    feature_objs = {f.key: f for f in Feature.query.filter(Feature.key.in_(features)).all()}
     for key, desc in features.items():
-        f = Feature.query.filter_by(key=key).first()
+        f = feature_objs.get(key)
         if not f:
             f = Feature(key=key, description=desc)
             db.session.add(f)
-            db.session.flush()
+            feature_objs[key] = f
         else:
             # Atualiza descrição se já existir
             f.description = desc
 
-        feature_objs[key] = f
-
     # Planos
     plan_names = ["Básico", "Pro", "Premium"]
 
+    plans = {p.name: p for p in Plan.query.filter(Plan.name.in_(plan_names)).all()}
     for name in plan_names:
-        plan = Plan.query.filter_by(name=name).first()
-        if not plan:
-            plan = Plan(name=name)
-            db.session.add(plan)
-            db.session.flush()
+        if name not in plans:
+            plans[name] = Plan(name=name)
+            db.session.add(plans[name])
+    db.session.flush()
+
+    existing_pfs = {
+        (pf.plan_id, pf.feature_id): pf
+        for pf in PlanFeature.query.filter(PlanFeature.plan_id.in_([p.id for p in plans.values()])).all()
+    }
 
+    for name in plan_names:
+        plan = plans[name]
         for key, f in feature_objs.items():
 
-            existing = PlanFeature.query.filter_by(
-                plan_id=plan.id, feature_id=f.id
-            ).first()
+            existing = existing_pfs.get((plan.id, f.id))
 
             # Valores por plano
-            if plan.name == "Básico":
+            if key in plan_limits.get(plan.name, {}):
+                value = plan_limits[plan.name][key]
+            elif plan.name == "Básico":
                 if key in ["generate_text", "generate_video"]:
                     value = "false"
                 else:
@@ -71,4 +90,55 @@ def create_default_plans():
             else:
                 existing.value = value
 
-    db.session.commit()
\ No newline at end of file
+    db.session.commit()
+    invalidate_entitlements()
+
+def backfill_message_seq():
+    """Numera (seq) mensagens gravadas antes da coluna existir, na ordem de created_at, e acerta Chat.last_seq."""
+    pending_chats = select(ChatMessage.chat_id).where(ChatMessage.seq.is_(None)).distinct()
+    numbered = (
+        select(
+            ChatMessage.id,
+            func.row_number().over(
+                partition_by=ChatMessage.chat_id,
+                order_by=(ChatMessage.created_at, ChatMessage.id),
+            ).label("seq"),
+        )
+        .where(ChatMessage.chat_id.in_(pending_chats))
+        .subquery()
+    )
+    result = db.session.execute(
+        update(ChatMessage)
+        .where(ChatMessage.id == numbered.c.id)
+        .values(seq=numbered.c.seq)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        db.session.execute(
+            update(Chat)
+            .where(Chat.id.in_(select(ChatMessage.chat_id).distinct()))
+            .values(last_seq=select(func.max(ChatMessage.seq)).where(ChatMessage.chat_id == Chat.id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        print(f"[INFO] seq preenchido em {result.rowcount} mensagens")
+    db.session.commit()
+
+def backfill_chat_summaries():
+    """Preenche message_count/last_message_at/last_snippet de chats anteriores a essas colunas."""
+    def of_chat(column):
+        return select(column).where(ChatMessage.chat_id == Chat.id)
+
+    last_message = of_chat(ChatMessage.content).order_by(ChatMessage.created_at.desc()).limit(1)
+    result = db.session.execute(
+        update(Chat)
+        .where(Chat.last_message_at.is_(None), of_chat(ChatMessage.id).exists())
+        .values(
+            message_count=of_chat(func.count(ChatMessage.id)).scalar_subquery(),
+            last_message_at=of_chat(func.max(ChatMessage.created_at)).scalar_subquery(),
+            last_snippet=func.substr(last_message.scalar_subquery(), 1, SNIPPET_LENGTH),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if result.rowcount:
+        print(f"[INFO] Resumo de {result.rowcount} chats preenchido")
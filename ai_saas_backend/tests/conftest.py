@@ -10,7 +10,7 @@ from models import User
 import uuid
 from extensions import bcrypt, db
 from datetime import timedelta
-from flask_jwt_extended import decode_token
+from flask_jwt_extended import decode_token, create_access_token
 
 @pytest.fixture(scope="module")
 def test_client():
@@ -18,6 +18,8 @@ def test_client():
     # Use o modo WAL para evitar o erro de "database is locked"
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:?mode=wal"
     app.config["WTF_CSRF_ENABLED"] = False
+    # Nos testes o token vai no header Authorization (em produção é cookie)
+    app.config["JWT_TOKEN_LOCATION"] = ["headers", "cookies"]
 
     with app.app_context():
         # Criação do banco de dados
@@ -45,4 +47,11 @@ def test_client():
         db.drop_all()
 
     # Nota: Não é necessário fazer um rollback explícito aqui, 
-    # já que estamos limpando o banco após o "yield".
\ No newline at end of file
+    # já que estamos limpando o banco após o "yield".
+
+@pytest.fixture
+def auth_headers(test_client):
+    with test_client.application.app_context():
+        user = User.query.filter_by(username="testuser").first()
+        token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))
+    return {"Authorization": f"Bearer {token}"}
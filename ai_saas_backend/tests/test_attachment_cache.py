@@ -0,0 +1,53 @@
+import base64
+from utils.attachment_cache import AttachmentPayloadCache
+
+
+def write_file(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_payload_is_encoded_once(tmp_path):
+    cache = AttachmentPayloadCache(max_bytes=1024 * 1024)
+    path = write_file(tmp_path, "foto.png", b"\x89PNG fake")
+
+    first = cache.get(path, "image/png", "data_url")
+    second = cache.get(path, "image/png", "data_url")
+
+    assert first == second == "data:image/png;base64," + base64.b64encode(b"\x89PNG fake").decode()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_format_is_part_of_the_key(tmp_path):
+    cache = AttachmentPayloadCache(max_bytes=1024 * 1024)
+    path = write_file(tmp_path, "doc.pdf", b"%PDF-1.4")
+
+    raw = cache.get(path, "application/pdf", "base64")
+    url = cache.get(path, "application/pdf", "data_url")
+
+    assert url.endswith(raw)
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    cache = AttachmentPayloadCache(max_bytes=20)
+    a = write_file(tmp_path, "a.bin", b"a" * 9)
+    b = write_file(tmp_path, "b.bin", b"b" * 9)
+
+    cache.get(a, "application/octet-stream")
+    cache.get(b, "application/octet-stream")
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 20
+
+
+def test_sidecar_survives_new_instance(tmp_path):
+    path = write_file(tmp_path, "foto.jpg", b"jpeg bytes")
+    AttachmentPayloadCache(sidecar=True).get(path, "image/jpeg")
+
+    fresh = AttachmentPayloadCache(sidecar=True)
+    assert fresh.get(path, "image/jpeg") == base64.b64encode(b"jpeg bytes").decode()
+    assert fresh.stats()["sidecar_hits"] == 1
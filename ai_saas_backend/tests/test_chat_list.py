@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from extensions import db
+from models import Chat, ChatMessage, User
+from utils import backfill_chat_summaries
+
+
+@pytest.fixture
+def chats(test_client):
+    """Cinco chats do usuário de teste, um a cada minuto; o último arquivado."""
+    with test_client.application.app_context():
+        Chat.query.delete()
+        db.session.commit()
+        user_id = User.query.filter_by(username="testuser").one().id
+        base = datetime.utcnow() - timedelta(hours=1)
+        ids = []
+        for i in range(5):
+            chat = Chat(user_id=user_id, title=f"chat {i}", archived=(i == 4))
+            db.session.add(chat)
+            for j, content in enumerate([f"pergunta {i}", f"resposta {i} com a palavra kiwi" if i == 2 else f"resposta {i}"]):
+                msg = ChatMessage(chat=chat, role="user" if j == 0 else "assistant", content=content,
+                                  created_at=base + timedelta(minutes=i, seconds=j))
+                chat.record_message(msg)
+                db.session.add(msg)
+            db.session.commit()
+            ids.append(chat.id)
+    return ids
+
+
+def test_list_returns_summaries_without_messages(test_client, auth_headers, chats):
+    res = test_client.get("/api/chats/", headers=auth_headers)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [c["id"] for c in data["chats"]] == list(reversed(chats))
+    assert data["next_cursor"] is None
+
+    newest = data["chats"][0]
+    assert "messages" not in newest
+    assert newest["message_count"] == 2
+    assert newest["snippet"] == "resposta 4"
+    assert newest["archived"] is True
+
+
+def test_keyset_pages_cover_every_chat_once(test_client, auth_headers, chats):
+    seen, cursor = [], None
+    while True:
+        url = "/api/chats/?limit=2&archived=false" + (f"&cursor={cursor}" if cursor else "")
+        data = test_client.get(url, headers=auth_headers).get_json()
+        seen += [c["id"] for c in data["chats"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert seen == list(reversed(chats[:4]))
+
+    archived = test_client.get("/api/chats/?archived=true", headers=auth_headers).get_json()
+    assert [c["id"] for c in archived["chats"]] == [chats[4]]
+
+    assert test_client.get("/api/chats/?cursor=lixo", headers=auth_headers).status_code == 400
+
+
+def test_search_returns_match_snippet(test_client, auth_headers, chats):
+    data = test_client.get("/api/chats/?q=kiwi", headers=auth_headers).get_json()
+    assert [c["id"] for c in data["chats"]] == [chats[2]]
+    assert "kiwi" in data["chats"][0]["snippet"]
+
+
+def test_generation_updates_summary_fields(test_client, auth_headers, chats):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="nova resposta")], usage=None)
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"):
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "mais uma", "model": "claude-haiku-4-5-20251001", "chat_id": chats[0]},
+            headers=auth_headers,
+        )
+    assert res.status_code == 200
+
+    first = test_client.get("/api/chats/?limit=1", headers=auth_headers).get_json()["chats"][0]
+    assert first["id"] == chats[0]
+    assert first["message_count"] == 4
+    assert first["snippet"] == "nova resposta"
+
+
+def test_backfill_fills_chats_created_before_the_columns(test_client, chats):
+    with test_client.application.app_context():
+        Chat.query.update({"message_count": 0, "last_message_at": None, "last_snippet": None})
+        db.session.commit()
+        backfill_chat_summaries()
+        chat = db.session.get(Chat, chats[1])
+        db.session.refresh(chat)
+        assert chat.message_count == 2
+        assert chat.last_snippet == "resposta 1"
+        assert chat.last_message_at is not None
@@ -0,0 +1,98 @@
+from datetime import datetime
+from unittest.mock import patch
+from types import SimpleNamespace
+from extensions import db
+from models import Chat, ChatMessage
+from utils import backfill_message_seq
+from tests.test_turn_queries import make_chat, count_selects
+
+
+def test_messages_page_backwards_by_seq(test_client, auth_headers):
+    with test_client.application.app_context():
+        chat_id = make_chat(120)
+
+    res = test_client.get(f"/api/chats/{chat_id}/messages?limit=50", headers=auth_headers)
+    assert res.status_code == 200
+    page = res.get_json()
+    assert [m["seq"] for m in page["messages"]] == list(range(71, 121))
+    assert page["has_more"] is True and page["next_before"] == 71
+
+    seen = page["messages"]
+    while page["has_more"]:
+        page = test_client.get(
+            f"/api/chats/{chat_id}/messages?limit=50&before={page['next_before']}", headers=auth_headers
+        ).get_json()
+        seen = page["messages"] + seen
+    assert [m["seq"] for m in seen] == list(range(1, 121))
+    assert page["next_before"] is None
+
+
+def test_messages_page_query_count_is_constant(test_client, auth_headers):
+    with test_client.application.app_context():
+        small, large = make_chat(60), make_chat(600)
+        engine = db.engine
+
+    counts = []
+    for chat_id in (small, large):
+        with count_selects(engine) as selects:
+            res = test_client.get(f"/api/chats/{chat_id}/messages?limit=50", headers=auth_headers)
+        assert len(res.get_json()["messages"]) == 50
+        counts.append(len(selects))
+    assert counts[0] == counts[1] <= 3
+
+
+def test_other_users_chat_is_not_found(test_client, auth_headers):
+    with test_client.application.app_context():
+        chat = Chat(user_id="outro-usuario", title="alheio")
+        db.session.add(chat)
+        db.session.commit()
+        chat_id = chat.id
+    assert test_client.get(f"/api/chats/{chat_id}/messages", headers=auth_headers).status_code == 404
+
+
+def test_new_turn_continues_chat_seq(test_client, auth_headers):
+    with test_client.application.app_context():
+        chat_id = make_chat(4)
+
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")], usage=None)
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"):
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "oi", "model": "claude-haiku-4-5-20251001", "chat_id": chat_id},
+            headers=auth_headers,
+        )
+    data = res.get_json()
+    assert [m["seq"] for m in data["messages"]] == [5, 6]
+    assert data["chat_version"] == 6
+
+
+def test_backfill_numbers_legacy_messages_by_created_at(test_client):
+    with test_client.application.app_context():
+        chat = Chat(user_id="legado", title="antigo")
+        db.session.add(chat)
+        for second in (3, 1, 2):
+            db.session.add(ChatMessage(chat=chat, role="user", content=f"m{second}",
+                                       created_at=datetime(2024, 1, 1, 0, 0, second)))
+        db.session.commit()
+
+        backfill_message_seq()
+        rows = db.session.query(ChatMessage.content, ChatMessage.seq).filter_by(chat_id=chat.id).order_by(ChatMessage.seq).all()
+        assert rows == [("m1", 1), ("m2", 2), ("m3", 3)]
+        assert db.session.query(Chat.last_seq).filter_by(id=chat.id).scalar() == 3
+
+
+def test_get_chat_keeps_full_history_unless_limited(test_client, auth_headers):
+    with test_client.application.app_context():
+        chat_id = make_chat(60)
+
+    data = test_client.get(f"/api/chats/{chat_id}", headers=auth_headers).get_json()
+    assert [m["seq"] for m in data["messages"]] == list(range(1, 61))
+    assert "has_more" not in data
+
+    data = test_client.get(f"/api/chats/{chat_id}?limit=20", headers=auth_headers).get_json()
+    assert [m["seq"] for m in data["messages"]] == list(range(41, 61))
+    assert data["has_more"] is True and data["next_before"] == 41
+
+    data = test_client.get(f"/api/chats/{chat_id}?with_messages=false", headers=auth_headers).get_json()
+    assert "messages" not in data
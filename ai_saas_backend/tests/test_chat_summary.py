@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from extensions import db
+from models import Chat, ChatMessage
+from routes.ai_generation_api import build_turn_context
+from utils import chat_summary
+from utils.chat_summary import SummaryMarker, refresh_chat_summary
+from tests.test_turn_queries import count_selects
+
+
+def make_chat(n_messages):
+    user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+    chat = Chat(user_id=user_id, title="longo")
+    db.session.add(chat)
+    base = datetime.utcnow()
+    msgs = [
+        ChatMessage(
+            chat=chat,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"mensagem {i}",
+            created_at=base + timedelta(seconds=i),
+        )
+        for i in range(n_messages)
+    ]
+    for msg in msgs:
+        chat.record_message(msg)
+    db.session.add_all(msgs)
+    db.session.commit()
+    return chat, msgs
+
+
+def test_summary_advances_watermark_and_keeps_recent_tail(test_client):
+    with test_client.application.app_context():
+        chat, msgs = make_chat(25)
+
+        with patch.object(chat_summary, "summarize_text", return_value="resumo v1") as summarize:
+            assert refresh_chat_summary(chat.id) is True
+            summarized = summarize.call_args[0][1]
+
+        keep = chat_summary.CHAT_SUMMARY_KEEP_RECENT
+        assert len(summarized) == 25 - keep
+        db.session.refresh(chat)
+        assert chat.summary == "resumo v1"
+        assert chat.summary_message_id == msgs[-keep - 1].id
+
+        history = ChatMessage.query.filter_by(chat_id=chat.id).order_by(ChatMessage.created_at).all()
+        context, session_messages = build_turn_context(history, "gpt-4o", chat)
+        assert isinstance(context[0], SummaryMarker)
+        assert "resumo v1" in session_messages[0]["content"]
+        assert [m["content"] for m in session_messages[1:]] == [m.content for m in msgs[-keep:]]
+
+
+def test_summary_waits_for_enough_new_messages(test_client):
+    with test_client.application.app_context():
+        chat, _ = make_chat(chat_summary.CHAT_SUMMARY_EVERY_N_MESSAGES - 1)
+
+        with patch.object(chat_summary, "summarize_text") as summarize:
+            assert refresh_chat_summary(chat.id) is False
+        summarize.assert_not_called()
+
+
+
+def add_messages(chat, contents):
+    for content in contents:
+        msg = ChatMessage(chat=chat, role="user", content=content)
+        chat.record_message(msg)
+        db.session.add(msg)
+    db.session.commit()
+
+
+def test_next_summary_reads_only_messages_after_watermark(test_client):
+    with test_client.application.app_context():
+        chat, msgs = make_chat(25)
+        with patch.object(chat_summary, "summarize_text", return_value="resumo v1"):
+            assert refresh_chat_summary(chat.id) is True
+
+        keep = chat_summary.CHAT_SUMMARY_KEEP_RECENT
+        every = chat_summary.CHAT_SUMMARY_EVERY_N_MESSAGES
+        # Falta uma mensagem depois da marca: decide pelo last_seq, sem ler mensagens
+        new = [f"nova {i}" for i in range(every - keep)]
+        add_messages(chat, new[:-1])
+        with count_selects(db.engine) as selects, \
+             patch.object(chat_summary, "summarize_text") as summarize:
+            assert refresh_chat_summary(chat.id) is False
+        summarize.assert_not_called()
+        assert not [s for s in selects if "chat_messages.content" in s]
+
+        add_messages(chat, new[-1:])
+        with count_selects(db.engine) as selects, \
+             patch.object(chat_summary, "summarize_text", return_value="resumo v2") as summarize:
+            assert refresh_chat_summary(chat.id) is True
+        previous, summarized = summarize.call_args[0][:2]
+        assert previous == "resumo v1"
+        after_watermark = [m.content for m in msgs[-keep:]] + new
+        assert [m.content for m in summarized] == after_watermark[:len(after_watermark) - keep]
+        assert [s for s in selects if "chat_messages.content" in s][0].count("chat_messages.seq >") == 1
@@ -0,0 +1,71 @@
+from unittest.mock import patch
+from types import SimpleNamespace
+from extensions import db
+from models import Chat
+from utils import chat_title
+from utils.chat_title import provisional_title, schedule_title_generation
+
+
+def test_provisional_title_from_first_message():
+    assert provisional_title("  como   fazer pão de fermentação natural em casa hoje?") == "como fazer pão de fermentação natural…"
+    assert provisional_title("oi") == "oi"
+    assert provisional_title("") == "Novo Chat"
+
+
+def test_new_chat_responds_with_provisional_title(test_client, auth_headers):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="claro")])
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation") as schedule:
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "receita de bolo de cenoura", "model": "claude-haiku-4-5-20251001"},
+            headers=auth_headers,
+        )
+
+    data = res.get_json()
+    assert res.status_code == 200
+    assert data["chat_title"] == "receita de bolo de cenoura"
+    schedule.assert_called_once()
+    assert schedule.call_args[0][1:] == (data["chat_id"], "receita de bolo de cenoura", "receita de bolo de cenoura")
+
+
+def test_generated_title_replaces_provisional_only(test_client, auth_headers):
+    app = test_client.application
+    with app.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+        kept = Chat(user_id=user_id, title="gatos surfando")
+        renamed = Chat(user_id=user_id, title="Meu título")
+        db.session.add_all([kept, renamed])
+        db.session.commit()
+        kept_id, renamed_id = kept.id, renamed.id
+
+    with patch.object(chat_title, "generate_chat_title", return_value="Gatos Surfistas"):
+        assert schedule_title_generation(app, kept_id, "gatos surfando", "gatos surfando").result(timeout=5) == "Gatos Surfistas"
+        assert schedule_title_generation(app, renamed_id, "gatos surfando", "gatos surfando").result(timeout=5) == "Meu título"
+
+    res = test_client.get(f"/api/chats/{kept_id}/title", headers=auth_headers)
+    assert res.get_json() == {"chat_id": kept_id, "title": "Gatos Surfistas", "pending": False}
+
+
+def test_title_poll_reads_pending_state_from_redis(test_client, auth_headers):
+    app = test_client.application
+    with app.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+        chat = Chat(user_id=user_id, title="receita de pão")
+        db.session.add(chat)
+        db.session.commit()
+        chat_id = chat.id
+
+    # Outro worker gerando o título: este processo não tem o future
+    chat_title._mark_pending(chat_id, True)
+    assert chat_id not in chat_title._pending
+    res = test_client.get(f"/api/chats/{chat_id}/title", headers=auth_headers)
+    assert res.get_json() == {"chat_id": chat_id, "title": "receita de pão", "pending": True}
+
+    with app.app_context():
+        Chat.query.filter_by(id=chat_id).update({"title": "Pão Caseiro"})
+        db.session.commit()
+    chat_title._mark_pending(chat_id, False)
+    res = test_client.get(f"/api/chats/{chat_id}/title", headers=auth_headers)
+    assert res.get_json() == {"chat_id": chat_id, "title": "Pão Caseiro", "pending": False}
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from utils import context_window
+from utils.context_window import fit_history_to_budget, get_model_limits, message_tokens, ContextMarker
+
+
+def msg(content, role="user", attachments=()):
+    return SimpleNamespace(role=role, content=content, attachments=list(attachments), token_count=None)
+
+
+def test_model_limits_use_longest_prefix():
+    assert get_model_limits("gpt-4o-mini").context_tokens == 128000
+    assert get_model_limits("o1-mini").context_tokens == 128000
+    assert get_model_limits("o1").context_tokens == 200000
+    assert get_model_limits("modelo-desconhecido").context_tokens == context_window.DEFAULT_MODEL_LIMITS[0]
+
+
+def test_budget_comes_from_model_window_unless_capped(monkeypatch):
+    monkeypatch.setattr(context_window, "CONTEXT_INPUT_TOKEN_CAP", None)
+    assert get_model_limits("gemini-2.5-pro").input_budget == 1000000 - 8192
+    assert get_model_limits("claude-sonnet-4-5").input_budget == 200000 - 2048
+
+    monkeypatch.setattr(context_window, "CONTEXT_INPUT_TOKEN_CAP", 32000)
+    assert get_model_limits("gemini-2.5-pro").input_budget == 32000
+
+
+def test_token_count_is_cached_on_message():
+    m = msg("a" * 400, attachments=[SimpleNamespace(mimetype="image/png", name="x.png")])
+    first = message_tokens(m)
+    assert m.token_count == first
+    m.content = "mudou"
+    assert message_tokens(m) == first
+
+
+def test_history_fits_budget_newest_first(monkeypatch):
+    monkeypatch.setattr(context_window, "CONTEXT_INPUT_TOKEN_CAP", 100)
+    history = [msg("x" * 120, role="user" if i % 2 == 0 else "assistant") for i in range(10)]
+    history.append(msg("pergunta atual"))
+
+    context = fit_history_to_budget(history, "gpt-4o")
+
+    assert isinstance(context[0], ContextMarker)
+    assert context[-1] is history[-1]
+    kept = context[1:]
+    assert kept == history[-len(kept):]
+    assert context[0].omitted == len(history) - len(kept)
+    assert sum(m.token_count for m in kept) <= 100
+
+
+def test_current_turn_is_kept_even_over_budget(monkeypatch):
+    monkeypatch.setattr(context_window, "CONTEXT_INPUT_TOKEN_CAP", 10)
+    history = [msg("antiga"), msg("y" * 1000)]
+
+    context = fit_history_to_budget(history, "gpt-4o")
+
+    assert context[-1] is history[-1]
+    assert context[0].omitted == 1
+
+
+def test_short_history_is_untouched():
+    history = [msg("oi"), msg("olá", role="assistant"), msg("tudo bem?")]
+    assert fit_history_to_budget(history, "claude-sonnet-4-5-20250929") == history
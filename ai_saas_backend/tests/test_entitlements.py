@@ -0,0 +1,83 @@
+from unittest.mock import patch
+import pytest
+from extensions import db
+from flask_jwt_extended import decode_token
+from models import User, Plan
+from utils import create_default_plans
+from utils.entitlements import (
+    get_snapshot, invalidate_entitlements, plan_from_claims, user_plan_changed,
+    flag_enabled, entitlement_claims,
+)
+
+
+@pytest.fixture
+def default_plans(test_client):
+    with test_client.application.app_context():
+        create_default_plans()
+        plans = {p.name: p.id for p in Plan.query.all()}
+    yield plans
+    invalidate_entitlements()
+
+
+def test_snapshot_compiles_typed_values_and_flags(test_client, default_plans):
+    with test_client.application.app_context():
+        basic = get_snapshot().plans[default_plans["Básico"]]
+    assert basic.values["messages_per_day"] == 50
+    assert basic.values["attach_files"] is True
+    assert not flag_enabled(basic.flags, "generate_text")
+    assert flag_enabled(basic.flags, "generate_image")
+    assert [f["key"] for f in basic.payload["features"]][:2] == ["generate_text", "attach_files"]
+
+
+def test_snapshot_is_rebuilt_only_after_invalidation(test_client, default_plans):
+    with test_client.application.app_context():
+        first = get_snapshot()
+        with patch("utils.entitlements.build_snapshot") as build:
+            assert get_snapshot() is first
+            build.assert_not_called()
+
+        db.session.get(Plan, default_plans["Pro"]).name = "Pro Plus"
+        db.session.commit()
+        invalidate_entitlements()
+        second = get_snapshot()
+        assert second.version > first.version
+        assert second.plans[default_plans["Pro"]].name == "Pro Plus"
+
+        db.session.get(Plan, default_plans["Pro"]).name = "Pro"
+        db.session.commit()
+
+
+def test_plans_endpoint_supports_etag(test_client, default_plans):
+    res = test_client.get("/api/plans/")
+    assert res.status_code == 200
+    assert {p["name"] for p in res.get_json()} >= {"Básico", "Pro", "Premium"}
+
+    etag = res.headers["ETag"]
+    cached = test_client.get("/api/plans/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_login_embeds_claims_and_admin_change_overrides_them(test_client, default_plans):
+    with test_client.application.app_context():
+        user = User.query.filter_by(username="testuser").one()
+        user.plan_id = default_plans["Básico"]
+        db.session.commit()
+
+    res = test_client.post("/api/auth/login", json={"identifier": "testuser", "password": "Senha123!"})
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["user"]["plan"]["name"] == "Básico"
+
+    with test_client.application.app_context():
+        claims = decode_token(body["access_token"])
+        assert claims["plan"] == default_plans["Básico"]
+        assert plan_from_claims(claims["sub"], claims) == (default_plans["Básico"], claims["ent"])
+
+        # Tokens emitidos antes da troca não valem mais para o plano
+        user_plan_changed(claims["sub"], default_plans["Premium"])
+        assert plan_from_claims(claims["sub"], claims) == (default_plans["Premium"], None)
+
+        # Sem claims (token antigo) quem chama consulta o banco
+        assert plan_from_claims(claims["sub"], {"sub": claims["sub"]}) == (None, None)
+        assert entitlement_claims(None) == {"plan": None, "ent": 0, "ev": get_snapshot().version}
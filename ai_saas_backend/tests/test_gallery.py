@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+import pytest
+from extensions import db
+from models import (
+    GeneratedContent, GeneratedTextContent, GeneratedImageContent, GeneratedVideoContent,
+    Project, User,
+)
+from tests.test_turn_queries import count_selects
+
+MODELS = [GeneratedTextContent, GeneratedImageContent, GeneratedVideoContent]
+
+
+@pytest.fixture
+def contents(test_client):
+    """Nove conteúdos do usuário de teste (text, image, video alternados), um por minuto; os dois primeiros num projeto."""
+    with test_client.application.app_context():
+        for content in GeneratedContent.query.all():
+            content.projects = []
+            db.session.delete(content)
+        db.session.commit()
+        user_id = User.query.filter_by(username="testuser").one().id
+        project = Project(user_id=user_id, name="galeria")
+        db.session.add(project)
+        base = datetime.utcnow() - timedelta(hours=1)
+        items = []
+        for i in range(9):
+            item = MODELS[i % 3](user_id=user_id, prompt=f"prompt {i}", model_used="teste",
+                                 created_at=base + timedelta(minutes=i))
+            if i < 2:
+                item.projects.append(project)
+            db.session.add(item)
+            items.append(item)
+        db.session.commit()
+        return [(c.id, c.content_type) for c in items], project.id
+
+
+def test_pages_cover_every_content_once(test_client, auth_headers, contents):
+    items, project_id = contents
+    seen, cursor = [], None
+    while True:
+        url = "/api/contents/?limit=4" + (f"&cursor={cursor}" if cursor else "")
+        data = test_client.get(url, headers=auth_headers).get_json()
+        seen += data["contents"]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert [c["id"] for c in seen] == [i for i, _ in reversed(items)]
+
+    by_id = {c["id"]: c for c in seen}
+    assert by_id[items[0][0]]["projects"] == [project_id]
+    assert by_id[items[2][0]]["projects"] == []
+    # Colunas da subclasse vêm preenchidas mesmo sem with_polymorphic
+    assert "ratio" in by_id[items[1][0]] and "duration" in by_id[items[2][0]]
+
+    assert test_client.get("/api/contents/?cursor=lixo", headers=auth_headers).status_code == 400
+
+
+def test_type_filter(test_client, auth_headers, contents):
+    items, _ = contents
+    data = test_client.get("/api/contents/?type=image", headers=auth_headers).get_json()
+    assert [c["id"] for c in data["contents"]] == [i for i, t in reversed(items) if t == "image"]
+    assert {c["content_type"] for c in data["contents"]} == {"image"}
+
+    assert test_client.get("/api/contents/?type=audio", headers=auth_headers).status_code == 400
+
+
+def test_query_count_does_not_grow_with_page_size(test_client, auth_headers, contents):
+    with test_client.application.app_context():
+        engine = db.engine
+
+    counts = []
+    for limit in (3, 9):
+        with count_selects(engine) as selects:
+            res = test_client.get(f"/api/contents/?limit={limit}", headers=auth_headers)
+        assert res.status_code == 200
+        counts.append(len(selects))
+    assert counts[0] == counts[1]
+
+
+def test_stats_counts_without_listing(test_client, auth_headers, contents):
+    items, _ = contents
+    with test_client.application.app_context():
+        engine = db.engine
+        # Um conteúdo antigo: conta no total, não no mês
+        old = GeneratedImageContent(user_id=User.query.filter_by(username="testuser").one().id,
+                                    prompt="antigo", model_used="teste", created_at=datetime(2020, 1, 1))
+        db.session.add(old)
+        db.session.commit()
+        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        recent = {c.id: c.content_type for c in GeneratedContent.query.filter(GeneratedContent.created_at >= month_start)}
+
+    with count_selects(engine) as selects:
+        res = test_client.get("/api/contents/stats", headers=auth_headers)
+    assert res.status_code == 200
+    stats = res.get_json()
+    assert stats["total"] == len(items) + 1
+    assert stats["this_month"] == len(recent)
+    assert stats["by_type"]["image"] == {"total": 4, "this_month": list(recent.values()).count("image")}
+    assert len([s for s in selects if "generated_contents" in s]) == 1
+
+
+def test_search_matches_partial_terms(test_client, auth_headers, contents):
+    items, _ = contents
+    # "romp" não é palavra para o full-text; o ILIKE cobre o trecho
+    data = test_client.get("/api/contents/?q=romp", headers=auth_headers).get_json()
+    assert len(data["contents"]) == len(items)
+
+    data = test_client.get("/api/contents/?q=prompt 4", headers=auth_headers).get_json()
+    assert [c["id"] for c in data["contents"]] == [items[4][0]]
@@ -0,0 +1,103 @@
+import threading
+from unittest.mock import patch
+from types import SimpleNamespace
+from models import ChatMessage
+from tests.test_text_streaming import parse_sse
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+def post(test_client, auth_headers, key, text="oi", model=MODEL):
+    return test_client.post(
+        "/api/ai/generate-text",
+        json={"input": text, "model": model},
+        headers={**auth_headers, "Idempotency-Key": key},
+    )
+
+
+def test_completed_request_is_replayed(test_client, auth_headers):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="uma vez")])
+    with patch("providers.claude.create_claude_message", return_value=reply) as create, \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        first = post(test_client, auth_headers, "chave-replay")
+        second = post(test_client, auth_headers, "chave-replay")
+
+    assert create.call_count == 1
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert second.get_json() == first.get_json()
+
+    with test_client.application.app_context():
+        assert ChatMessage.query.filter_by(chat_id=first.get_json()["chat_id"]).count() == 2
+
+
+def test_same_key_with_other_body_is_rejected(test_client, auth_headers):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")])
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        post(test_client, auth_headers, "chave-corpo", text="primeiro")
+        res = post(test_client, auth_headers, "chave-corpo", text="segundo")
+
+    assert res.status_code == 422
+
+
+def test_concurrent_duplicate_waits_for_first_execution(test_client, auth_headers):
+    started, release = threading.Event(), threading.Event()
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="devagar")])
+
+    def slow_create(payload, timeout=None):
+        started.set()
+        release.wait(5)
+        return reply
+
+    results = {}
+    with patch("providers.claude.create_claude_message", side_effect=slow_create) as create, \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        first = threading.Thread(target=lambda: results.setdefault("first", post(test_client, auth_headers, "chave-paralela")))
+        first.start()
+        assert started.wait(5)
+
+        second = threading.Thread(target=lambda: results.setdefault("second", post(test_client, auth_headers, "chave-paralela")))
+        second.start()
+        release.set()
+        first.join(10)
+        second.join(10)
+
+    assert create.call_count == 1
+    assert results["second"].headers.get("Idempotent-Replayed") == "true"
+    assert results["second"].get_json()["chat_id"] == results["first"].get_json()["chat_id"]
+
+
+def post_stream(test_client, auth_headers, key):
+    return test_client.post(
+        "/api/ai/generate-text/stream",
+        json={"input": "oi stream", "model": "gpt-4o"},
+        headers={**auth_headers, "Idempotency-Key": key},
+    )
+
+
+def test_stream_holds_lock_until_finished_and_is_replayed(test_client, auth_headers, monkeypatch):
+    monkeypatch.setattr("utils.idempotency.IDEMPOTENCY_WAIT_SECONDS", 0.2)
+    with patch("routes.ai_generation_api.open_text_stream", side_effect=lambda *a: iter(["Olá", " mundo"])) as opened, \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        first = post_stream(test_client, auth_headers, "chave-stream")
+        # Corpo SSE ainda não consumido: a duplicata não executa de novo
+        assert post_stream(test_client, auth_headers, "chave-stream").status_code == 409
+
+        events = parse_sse(first.get_data(as_text=True))
+        first.close()
+        replay = post_stream(test_client, auth_headers, "chave-stream")
+
+    assert opened.call_count == 1
+    assert replay.headers.get("Idempotent-Replayed") == "true"
+    replayed = parse_sse(replay.get_data(as_text=True))
+    # Resumo sem os deltas; o `done` traz a resposta completa
+    assert [e for e, _ in replayed] == [e for e, _ in events if e != "delta"]
+    assert replayed[-1][1] == events[-1][1]
+    assert replayed[-1][1]["generated_text"] == "Olá mundo"
+
+    with test_client.application.app_context():
+        assert ChatMessage.query.filter_by(chat_id=events[0][1]["chat_id"]).count() == 2
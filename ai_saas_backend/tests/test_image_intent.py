@@ -0,0 +1,30 @@
+from unittest.mock import patch
+from utils import image_intent
+from utils.image_intent import classify_locally, start_image_intent
+
+
+def test_local_classifier_decides_clear_prompts():
+    assert classify_locally("gere uma imagem de um gato astronauta") is True
+    assert classify_locally("Desenhe um castelo medieval") is True
+    assert classify_locally("crie um logotipo para minha padaria") is True
+    assert classify_locally("qual a capital da França?") is False
+    assert classify_locally("pode gerar imagem?") is False
+    assert classify_locally("analise essa imagem") is False
+
+
+def test_ambiguous_prompt_is_escalated_once():
+    image_intent._ask_llm.cache_clear()
+    with patch.object(image_intent, "get_gemini_client") as client:
+        client.return_value.models.generate_content.return_value.text = "SIM"
+        assert classify_locally("quero  uma arte   do meu cachorro") is None
+        assert start_image_intent("quero uma arte do meu cachorro").result(timeout=5) is True
+        assert start_image_intent("Quero uma arte do meu cachorro").result(timeout=5) is True
+
+    assert client.return_value.models.generate_content.call_count == 1
+
+
+def test_clear_prompt_never_calls_llm():
+    with patch.object(image_intent, "get_gemini_client") as client:
+        future = start_image_intent("me explique a fotossíntese")
+        assert future.done() and future.result() is False
+    client.assert_not_called()
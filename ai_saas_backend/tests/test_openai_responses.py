@@ -0,0 +1,61 @@
+import base64
+from io import BytesIO
+from PIL import Image
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from providers.messages import to_responses_input
+
+
+def test_to_responses_input_maps_parts():
+    items = to_responses_input([
+        {"role": "system", "content": "regras"},
+        {"role": "assistant", "content": [{"type": "text", "text": "oi"}]},
+        {"role": "user", "content": [
+            {"type": "text", "text": "veja"},
+            {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAA"}},
+            {"type": "file", "file": {"file_id": "file-1"}},
+        ]},
+    ])
+
+    assert items[0] == {"role": "system", "content": "regras"}
+    assert items[1]["content"] == [{"type": "output_text", "text": "oi"}]
+    assert items[2]["content"] == [
+        {"type": "input_text", "text": "veja"},
+        {"type": "input_image", "image_url": "data:image/png;base64,AAA"},
+        {"type": "input_file", "file_id": "file-1"},
+    ]
+
+
+def test_gpt_turn_is_a_single_responses_call(test_client, auth_headers, tmp_path):
+    png = BytesIO()
+    Image.new("RGB", (4, 4)).save(png, format="PNG")
+    client = MagicMock()
+    client.with_options.return_value = client
+    client.responses.create.return_value = SimpleNamespace(
+        output_text="",
+        output=[SimpleNamespace(type="image_generation_call", result=base64.b64encode(png.getvalue()).decode())],
+    )
+
+    with patch("providers.openai_compat.get_openai_client", return_value=client), \
+         patch("providers.openai_compat.post_chat_completions") as chat_completions, \
+         patch("routes.ai_generation_api.UPLOAD_DIR", str(tmp_path)), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "gere uma imagem de um farol", "model": "gpt-4o"},
+            headers=auth_headers,
+        )
+
+    assert res.status_code == 200, res.get_data(as_text=True)
+    chat_completions.assert_not_called()
+    client.responses.create.assert_called_once()
+
+    request = client.responses.create.call_args.kwargs
+    assert request["tools"] == [{"type": "image_generation"}]
+    assert request["input"][0]["role"] == "system"
+    assert request["input"][-1] == {"role": "user", "content": "gere uma imagem de um farol"}
+
+    data = res.get_json()
+    assert data["messages"][-1]["attachments"][0]["mimetype"] == "image/png"
+    assert len(list(tmp_path.iterdir())) == 1
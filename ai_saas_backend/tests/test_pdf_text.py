@@ -0,0 +1,71 @@
+import ctypes
+from unittest.mock import patch
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_raw
+from models import ChatAttachment
+from utils.pdf_text import extract_pdf_text
+from providers.messages import build_messages_for_claude, build_messages_for_openai
+
+
+
+def make_pdf(path, pages):
+    """PDF com uma linha de texto (Helvetica) por página."""
+    pdf = pdfium.PdfDocument.new()
+    for text in pages:
+        page = pdf.new_page(300, 200)
+        obj = pdfium_raw.FPDFPageObj_NewTextObj(pdf, b"Helvetica", 12)
+        wide = ctypes.c_char_p((text + "\x00").encode("utf-16-le"))
+        pdfium_raw.FPDFText_SetText(obj, ctypes.cast(wide, ctypes.POINTER(pdfium_raw.FPDF_WCHAR)))
+        pdfium_raw.FPDFPageObj_Transform(obj, 1, 0, 0, 1, 20, 100)
+        pdfium_raw.FPDFPage_InsertObject(page, obj)
+        pdfium_raw.FPDFPage_GenerateContent(page)
+        page.close()
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+def test_extract_pdf_text_reads_pages(tmp_path):
+    pdf_path = make_pdf(tmp_path / "documento.pdf", ["primeira página", "inteligência artificial"])
+    assert extract_pdf_text(pdf_path) == "primeira página\n\ninteligência artificial"
+    assert extract_pdf_text(pdf_path, max_pages=1) == "primeira página"
+    assert extract_pdf_text(str(tmp_path / "inexistente.pdf")) == ""
+
+
+def test_claude_builder_uses_stored_text(tmp_path):
+    pdf_path = tmp_path / "contrato.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 fake")
+    att = ChatAttachment(name="contrato.pdf", path=str(pdf_path), mimetype="application/pdf", extracted_text="cláusula 1")
+
+    with patch("providers.messages.extract_pdf_text") as extract:
+        messages = build_messages_for_claude([{"role": "user", "content": "resuma", "attachments": [att]}])
+
+    extract.assert_not_called()
+    assert "cláusula 1" in messages[0]["content"][1]["text"]
+
+
+def test_claude_builder_backfills_old_attachments(tmp_path):
+    pdf_path = tmp_path / "antigo.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 fake")
+    att = ChatAttachment(name="antigo.pdf", path=str(pdf_path), mimetype="application/pdf")
+
+    with patch("providers.messages.extract_pdf_text", return_value="texto antigo") as extract:
+        build_messages_for_claude([{"role": "user", "content": "", "attachments": [att]}])
+        build_messages_for_claude([{"role": "user", "content": "", "attachments": [att]}])
+
+    extract.assert_called_once()
+    assert att.extracted_text == "texto antigo"
+
+
+def test_text_only_models_get_pdf_text_only_when_enabled(tmp_path):
+    pdf_path = tmp_path / "contrato.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 fake")
+    att = ChatAttachment(name="contrato.pdf", path=str(pdf_path), mimetype="application/pdf", extracted_text="cláusula 1")
+    turn = [{"role": "user", "content": "resuma", "attachments": [att]}]
+
+    content = build_messages_for_openai(turn, "gpt-3.5-turbo")[-1]["content"]
+    assert content == "resuma\n\n[Anexos]: contrato.pdf"
+
+    with patch("providers.messages.PDF_TEXT_FOR_TEXT_MODELS", True):
+        content = build_messages_for_openai(turn, "gpt-3.5-turbo")[-1]["content"]
+    assert "cláusula 1" in content
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+from extensions import db
+from models import Chat, ChatMessage, ChatAttachment, ProviderFile
+from utils import provider_files
+
+
+def make_attachment(tmp_path):
+    user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    chat = Chat(user_id=user_id, title="arquivos")
+    msg = ChatMessage(chat=chat, user_id=user_id, role="user", content="veja o pdf")
+    att = ChatAttachment(message=msg, name="doc.pdf", mimetype="application/pdf", path=str(path))
+    db.session.add_all([chat, msg, att])
+    db.session.commit()
+    return att
+
+
+def test_handle_is_reused_until_it_expires(test_client, tmp_path):
+    with test_client.application.app_context():
+        att = make_attachment(tmp_path)
+        upload = MagicMock(side_effect=[
+            ("files/a", "https://gemini/files/a", datetime.utcnow() + timedelta(hours=47)),
+            ("files/b", "https://gemini/files/b", datetime.utcnow() + timedelta(hours=47)),
+        ])
+
+        with patch.dict(provider_files.UPLOADERS, {"gemini": upload}):
+            first = provider_files.get_provider_file(att, "gemini")
+            db.session.commit()
+            again = provider_files.get_provider_file(att, "gemini")
+            assert again is first
+            assert upload.call_count == 1
+
+            first.expires_at = datetime.utcnow() + timedelta(minutes=1)
+            db.session.commit()
+            renewed = provider_files.get_provider_file(att, "gemini")
+            db.session.commit()
+
+        assert upload.call_count == 2
+        assert renewed.remote_uri == "https://gemini/files/b"
+        assert ProviderFile.query.filter_by(attachment_id=att.id).count() == 1
+
+
+def test_handles_are_per_provider(test_client, tmp_path):
+    with test_client.application.app_context():
+        att = make_attachment(tmp_path)
+        uploaders = {
+            "gemini": MagicMock(return_value=("files/x", "https://gemini/files/x", None)),
+            "openai": MagicMock(return_value=("file-123", None, None)),
+        }
+
+        with patch.dict(provider_files.UPLOADERS, uploaders):
+            provider_files.get_provider_file(att, "gemini")
+            handle = provider_files.get_provider_file(att, "openai")
+            db.session.commit()
+
+        assert handle.remote_id == "file-123"
+        assert {h.provider for h in att.provider_files} == {"gemini", "openai"}
+
+
+def test_handle_is_saved_outside_the_turn_and_race_loser_reuses_winner(test_client, tmp_path):
+    with test_client.application.app_context():
+        att = make_attachment(tmp_path)
+
+        def upload_after_concurrent_turn(attachment):
+            # Outro turno grava o handle do mesmo anexo enquanto este faz upload
+            with db.engine.begin() as connection:
+                connection.execute(ProviderFile.__table__.insert().values(
+                    id="vencedor", attachment_id=attachment.id, provider="gemini",
+                    remote_id="files/vencedor", remote_uri="https://gemini/files/vencedor",
+                ))
+            return "files/perdedor", "https://gemini/files/perdedor", None
+
+        with patch.dict(provider_files.UPLOADERS, {"gemini": upload_after_concurrent_turn}):
+            handle = provider_files.get_provider_file(att, "gemini")
+
+        assert handle.remote_id == "files/vencedor"
+        assert provider_files.get_provider_file(att, "gemini") is handle
+        # O turno pode falhar sem levar o handle junto
+        assert not db.session.new
+        db.session.rollback()
+        assert ProviderFile.query.filter_by(attachment_id=att.id).count() == 1
+
+
+def test_deleting_the_chat_deletes_remote_files_after_commit(test_client, auth_headers, tmp_path):
+    with test_client.application.app_context():
+        att = make_attachment(tmp_path)
+        chat_id = att.message.chat_id
+        uploaders = {
+            "openai": MagicMock(return_value=("file-del", None, None)),
+            "anthropic": MagicMock(return_value=("file_ant", None, None)),
+        }
+        with patch.dict(provider_files.UPLOADERS, uploaders):
+            provider_files.get_provider_file(att, "openai")
+            provider_files.get_provider_file(att, "anthropic")
+            db.session.commit()
+
+        # Rollback: nada é apagado no provedor
+        with patch.object(provider_files, "schedule_remote_deletes") as schedule:
+            db.session.delete(db.session.get(Chat, chat_id))
+            db.session.flush()
+            db.session.rollback()
+        schedule.assert_not_called()
+
+    with patch.object(provider_files, "schedule_remote_deletes") as schedule:
+        res = test_client.delete(f"/api/chats/{chat_id}", headers=auth_headers)
+    assert res.status_code == 200
+    schedule.assert_called_once()
+    assert sorted(schedule.call_args[0][0]) == [("anthropic", "file_ant"), ("openai", "file-del")]
+
+    deleters = {"openai": MagicMock(), "anthropic": MagicMock(side_effect=RuntimeError("404"))}
+    with patch.dict(provider_files.DELETERS, deleters):
+        provider_files.delete_remote_files(schedule.call_args[0][0])
+    deleters["openai"].assert_called_once_with("file-del")
+    deleters["anthropic"].assert_called_once_with("file_ant")
@@ -0,0 +1,102 @@
+import httpx
+import pytest
+from providers.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderHTTPError,
+    call_with_retry,
+    get_breaker,
+    is_retryable,
+    retry_after_seconds,
+)
+
+
+def http_error(status, headers=None):
+    return ProviderHTTPError(httpx.Response(status, headers=headers or {}, text="erro"))
+
+
+def test_classifies_transient_and_client_errors():
+    assert is_retryable(http_error(429))
+    assert is_retryable(http_error(503))
+    assert is_retryable(httpx.ConnectError("falhou"))
+    assert not is_retryable(http_error(400))
+    assert not is_retryable(ValueError("bug"))
+
+
+def test_reads_retry_after_header():
+    assert retry_after_seconds(http_error(429, {"retry-after": "3"})) == 3
+    assert retry_after_seconds(http_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(http_error(429)) is None
+
+
+def test_retries_transient_errors_until_success():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise http_error(503)
+        return "ok"
+
+    assert call_with_retry(fn, "teste:retry", timeout=10, base_delay=0.001, max_delay=0.001) == "ok"
+    assert len(calls) == 3 and all(t <= 10 for t in calls)
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        raise http_error(400)
+
+    with pytest.raises(ProviderHTTPError):
+        call_with_retry(fn, "teste:400")
+    assert len(calls) == 1
+    assert get_breaker("teste:400").failures == 0
+
+
+def test_retry_after_beyond_deadline_gives_up():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        raise http_error(429, {"retry-after": "120"})
+
+    with pytest.raises(ProviderHTTPError):
+        call_with_retry(fn, "teste:deadline", deadline=5)
+    assert len(calls) == 1
+
+
+def test_breaker_opens_and_probes_after_reset(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("providers.retry.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("teste:breaker", failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock[0] += 31
+    breaker.before_call()  # chamada de teste (half-open)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_first_attempt_keeps_full_timeout_and_leaves_room_to_retry():
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise httpx.ReadTimeout("lento")
+        return "ok"
+
+    # Prazo configurado menor que o timeout de uma chamada
+    assert call_with_retry(fn, "teste:timeout", timeout=120, deadline=90, base_delay=0.001, max_delay=0.001) == "ok"
+    assert calls[0] == 120
+    assert len(calls) == 2 and calls[1] > 0
@@ -0,0 +1,51 @@
+import pytest
+import providers
+from providers import get_adapter, get_capabilities, GenerationRequest, GenerationResult, ProviderBusyError
+from providers.base import ProviderAdapter
+
+
+def test_registry_routes_models_to_adapters():
+    assert get_adapter("gemini-2.5-flash").name == "gemini"
+    assert get_adapter("claude-sonnet-4-5-20250929").name == "anthropic"
+    assert get_adapter("sonar-reasoning-pro").name == "perplexity"
+    assert get_adapter("deepseek/deepseek-chat-v3.1:free").name == "openrouter"
+    assert get_adapter("gpt-4o").name == "openai"
+
+
+def test_capabilities_of_unknown_models_are_memoized():
+    caps = get_capabilities("gpt-4o-2099-preview")
+    assert caps.provider == "openai" and caps.vision and caps.image_generation
+    assert get_capabilities("gpt-4o-2099-preview") is caps
+    assert get_capabilities("o3-mini").fixed_temperature
+
+
+def test_unknown_models_stay_out_of_the_static_table():
+    known = dict(providers.MODEL_CAPABILITIES)
+    get_capabilities("gpt-4-nao-cacheado")
+    get_capabilities("qualquer/coisa:free")
+    assert providers.MODEL_CAPABILITIES == known
+
+
+class EchoAdapter(ProviderAdapter):
+    name = "teste"
+
+    def build_payload(self, req):
+        return {"model": req.model}
+
+    def send(self, payload):
+        return GenerationResult(text=payload["model"])
+
+
+def test_concurrency_slot_fails_when_adapter_is_busy(monkeypatch):
+    monkeypatch.setenv("PROVIDER_TESTE_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("PROVIDER_TESTE_TIMEOUT", "7")
+    monkeypatch.setattr("providers.base.SLOT_WAIT_SECONDS", 0.01)
+    adapter = EchoAdapter()
+    req = GenerationRequest("m", [], [], "oi", 0.7)
+
+    assert adapter.timeout == 7
+    with adapter.slot():
+        with pytest.raises(ProviderBusyError):
+            adapter.generate(req)
+
+    assert adapter.generate(req).text == "m"
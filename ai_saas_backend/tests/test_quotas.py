@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+import pytest
+from extensions import db, redis_client
+from models import User, Plan, Feature, PlanFeature
+from utils.entitlements import invalidate_entitlements, parse_feature_value
+from utils.quotas import take_tokens, refund_user_quota, DAY_MS, KEY_PREFIX, VIDEO_SECONDS_PER_JOB
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+@pytest.fixture
+def limited_plan(test_client):
+    app = test_client.application
+    with app.app_context():
+        plan = Plan.query.filter_by(name="Teste cota").first()
+        if plan is None:
+            plan = Plan(name="Teste cota")
+            db.session.add(plan)
+            for key, value in {"messages_per_day": "2", "generate_text": "false", "generate_video": "false"}.items():
+                feature = Feature.query.filter_by(key=key).first() or Feature(key=key)
+                db.session.add(PlanFeature(plan=plan, feature=feature, value=value))
+            db.session.flush()
+        user = User.query.filter_by(username="testuser").one()
+        previous_plan, user.plan_id = user.plan_id, plan.id
+        db.session.commit()
+        invalidate_entitlements()
+        # Cada teste começa com os buckets cheios
+        for key in redis_client.keys(f"{KEY_PREFIX}{user.id}:*"):
+            redis_client.delete(key)
+    yield
+    with app.app_context():
+        User.query.filter_by(username="testuser").one().plan_id = previous_plan
+        db.session.commit()
+        invalidate_entitlements()
+
+
+def send(test_client, auth_headers, model=MODEL):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")], usage=None)
+    with patch("providers.claude.create_claude_message", return_value=reply) as create, \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        res = test_client.post("/api/ai/generate-text", json={"input": "oi", "model": model}, headers=auth_headers)
+    return res, create.call_count
+
+
+def test_parse_feature_value():
+    assert parse_feature_value("true") is True
+    assert parse_feature_value("false") is False
+    assert parse_feature_value("1000") == 1000
+    assert parse_feature_value("unlimited") is None
+
+
+def test_daily_message_limit_rejects_before_provider_call(test_client, auth_headers, limited_plan):
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 200
+
+    res, calls = send(test_client, auth_headers)
+    assert res.status_code == 429 and calls == 0
+    assert res.get_json()["feature"] == "messages_per_day"
+    assert int(res.headers["Retry-After"]) > 0
+
+
+def test_rejected_input_does_not_use_quota(test_client, auth_headers, limited_plan):
+    # Input vazio é recusado pela rota depois do débito; a cota volta
+    for _ in range(3):
+        res = test_client.post("/api/ai/generate-text", json={"input": "", "model": MODEL}, headers=auth_headers)
+        assert res.status_code == 400
+
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 429
+
+
+def test_failed_generation_refunds_quota(test_client, auth_headers, limited_plan):
+    # Provedor falhou: a rota responde 200 com o erro no chat, mas a cota volta
+    with patch("providers.claude.create_claude_message", side_effect=RuntimeError("overloaded")), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        for _ in range(3):
+            res = test_client.post("/api/ai/generate-text", json={"input": "oi", "model": MODEL}, headers=auth_headers)
+            assert res.status_code == 200
+            assert res.get_json()["generated_text"] == "[Erro ao gerar resposta da IA]"
+
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 429
+
+
+def test_refund_outside_request_uses_the_user_plan(test_client, auth_headers, limited_plan):
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 200
+    with test_client.application.app_context():
+        user_id = User.query.filter_by(username="testuser").one().id
+        refund_user_quota(user_id, {"messages_per_day": 1})
+    assert send(test_client, auth_headers)[0].status_code == 200
+    assert send(test_client, auth_headers)[0].status_code == 429
+
+
+def test_failed_video_job_refunds_quota(test_client):
+    from routes.ai_generation_video_api import fail_video_job
+    from models import VideoJob
+    with test_client.application.app_context():
+        user_id = User.query.filter_by(username="testuser").one().id
+        job = VideoJob(user_id=user_id, prompt="x", model_used="veo-3.0-fast-generate-001")
+        db.session.add(job)
+        db.session.commit()
+        with patch("routes.ai_generation_video_api.refund_user_quota") as refund:
+            fail_video_job(job, "bloqueado")
+    refund.assert_called_once_with(user_id, {"video_seconds_per_month": VIDEO_SECONDS_PER_JOB})
+
+
+def test_premium_model_and_video_need_plan_features(test_client, auth_headers, limited_plan):
+    res, calls = send(test_client, auth_headers, model="claude-sonnet-4-5-20250929")
+    assert res.status_code == 403 and calls == 0
+    assert res.get_json()["feature"] == "generate_text"
+
+    res = test_client.post("/api/ai/generate-video", json={"prompt": "um gato"}, headers=auth_headers)
+    assert res.status_code == 403
+
+
+def test_buckets_are_checked_together_and_refill():
+    now = 1_000_000
+    costs = {"messages_per_day": (2, 1), "images_per_month": (1, 1)}
+    assert take_tokens("u-bucket", costs, now_ms=now) is None
+
+    # Sem imagem disponível, a mensagem também não é debitada
+    feature, retry_after = take_tokens("u-bucket", costs, now_ms=now)
+    assert feature == "images_per_month" and retry_after > 0
+    assert take_tokens("u-bucket", {"messages_per_day": (2, 1)}, now_ms=now) is None
+    assert take_tokens("u-bucket", {"messages_per_day": (2, 1)}, now_ms=now)[0] == "messages_per_day"
+
+    # Meio dia depois volta um token
+    assert take_tokens("u-bucket", {"messages_per_day": (2, 1)}, now_ms=now + DAY_MS // 2) is None
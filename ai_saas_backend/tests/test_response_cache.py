@@ -0,0 +1,62 @@
+from unittest.mock import patch
+from types import SimpleNamespace
+import pytest
+from models import ChatMessage
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+@pytest.fixture
+def cache_on(monkeypatch):
+    monkeypatch.setattr("utils.response_cache.RESPONSE_CACHE_ENABLED", True)
+    # Cada teste usa um prompt próprio, mas o Redis (fake) é compartilhado
+    monkeypatch.setattr("utils.response_cache.CACHE_PREFIX", f"gencache:test:{id(monkeypatch)}:")
+
+
+def send(test_client, auth_headers, **body):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="resposta fixa")])
+    with patch("providers.claude.create_claude_message", return_value=reply) as create, \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        res = test_client.post("/api/ai/generate-text", json={"model": MODEL, **body}, headers=auth_headers)
+    assert res.status_code == 200, res.get_data(as_text=True)
+    return res.get_json(), create.call_count
+
+
+def test_identical_deterministic_turn_hits_cache_and_still_persists(test_client, auth_headers, cache_on):
+    first, calls_first = send(test_client, auth_headers, input="capital da França?", temperature=0)
+    second, calls_second = send(test_client, auth_headers, input="capital da França?", temperature=0)
+
+    assert (calls_first, calls_second) == (1, 0)
+    assert not first["cache_hit"] and second["cache_hit"]
+    assert second["generated_text"] == "resposta fixa"
+
+    with test_client.application.app_context():
+        saved = ChatMessage.query.filter_by(chat_id=second["chat_id"], role="assistant").all()
+    assert [m.content for m in saved] == ["resposta fixa"]
+
+
+def test_regenerate_and_high_temperature_bypass_cache(test_client, auth_headers, cache_on):
+    send(test_client, auth_headers, input="liste três cores", temperature=0)
+
+    _, calls = send(test_client, auth_headers, input="liste três cores", temperature=0, regenerate=True)
+    assert calls == 1
+
+    send(test_client, auth_headers, input="invente uma cor", temperature=0.9)
+    data, calls = send(test_client, auth_headers, input="invente uma cor", temperature=0.9)
+    assert calls == 1 and not data["cache_hit"]
+
+
+def test_cache_is_off_by_default(test_client, auth_headers):
+    send(test_client, auth_headers, input="qual é 2+2?", temperature=0)
+    _, calls = send(test_client, auth_headers, input="qual é 2+2?", temperature=0)
+    assert calls == 1
+
+
+def test_cache_keys_are_per_user():
+    from utils.response_cache import text_cache_key, image_cache_key
+    messages = [{"role": "user", "content": "capital da França?"}]
+    assert text_cache_key("u1", MODEL, 0, messages) == text_cache_key("u1", MODEL, 0, messages)
+    assert text_cache_key("u1", MODEL, 0, messages) != text_cache_key("u2", MODEL, 0, messages)
+    payload = {"model": "gpt-image-1", "prompt": "um gato", "n": 1}
+    assert image_cache_key("u1", payload) != image_cache_key("u2", payload)
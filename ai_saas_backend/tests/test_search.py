@@ -0,0 +1,99 @@
+import pytest
+from extensions import db
+from models import Chat, ChatMessage, Project, User, SearchDocument
+from models.generated_content import GeneratedTextContent
+from utils.search import search_documents, rebuild_search_index
+
+
+@pytest.fixture
+def user_id(test_client):
+    with test_client.application.app_context():
+        return User.query.filter_by(username="testuser").one().id
+
+
+def add_chat(user_id, title, *contents):
+    chat = Chat(user_id=user_id, title=title)
+    db.session.add(chat)
+    for content in contents:
+        msg = ChatMessage(chat=chat, role="user", content=content)
+        chat.record_message(msg)
+        db.session.add(msg)
+    db.session.commit()
+    return chat
+
+
+def test_index_follows_insert_update_and_delete(test_client, user_id):
+    with test_client.application.app_context():
+        chat = add_chat(user_id, "Receitas", "como fazer pão de queijo", "e bolo de cenoura?")
+        assert [r["ref_id"] for r in search_documents(user_id, "cenoura")] == [chat.messages[1].id]
+
+        chat.messages[1].content = "e bolo de laranja?"
+        db.session.commit()
+        assert search_documents(user_id, "cenoura") == []
+        assert len(search_documents(user_id, "laranja")) == 1
+
+        # Acentos e prefixo da última palavra
+        assert search_documents(user_id, "pao de quei")[0]["kind"] == "message"
+
+        db.session.delete(chat)
+        db.session.commit()
+        assert search_documents(user_id, "laranja") == []
+        assert SearchDocument.query.filter_by(chat_id=chat.id).count() == 0
+
+
+def test_results_are_ranked_scoped_and_escaped(test_client, user_id):
+    with test_client.application.app_context():
+        add_chat(user_id, "Viagem para Lisboa", "roteiro <script>alert(1)</script> em Lisboa")
+        add_chat("outro-usuario", "Lisboa também", "Lisboa")
+
+        results = search_documents(user_id, "lisboa")
+        assert [r["kind"] for r in results] == ["chat", "message"]
+        assert all(r["rank"] >= results[-1]["rank"] for r in results)
+        assert "<script>" not in results[1]["snippet"]
+        assert "&lt;script&gt;" in results[1]["snippet"]
+        assert "<mark>Lisboa</mark>" in results[1]["snippet"]
+
+
+def test_search_endpoint_paginates(test_client, auth_headers, user_id):
+    with test_client.application.app_context():
+        for i in range(5):
+            add_chat(user_id, f"tema {i}", f"assunto girassol número {i}")
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/search/?q=girassol&types=message&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        data = test_client.get(url, headers=auth_headers).get_json()
+        seen += data["results"]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == 5 and len({r["id"] for r in seen}) == 5
+    assert seen[0]["title"].startswith("tema ")
+
+    assert test_client.get("/api/search/?q=x&types=nada", headers=auth_headers).status_code == 400
+    assert test_client.get("/api/search/", headers=auth_headers).status_code == 400
+
+
+def test_listing_filters_use_the_index(test_client, auth_headers, user_id):
+    with test_client.application.app_context():
+        db.session.add(Project(name="Campanha de verão", user_id=user_id))
+        db.session.add(Project(name="Inverno", user_id=user_id))
+        db.session.add(GeneratedTextContent(user_id=user_id, prompt="poema sobre o mar", model_used="gpt-4o"))
+        db.session.commit()
+
+    projects = test_client.get("/api/projects/?q=verao", headers=auth_headers).get_json()
+    assert [p["name"] for p in projects] == ["Campanha de verão"]
+    contents = test_client.get("/api/contents/?q=poema", headers=auth_headers).get_json()["contents"]
+    assert [c["prompt"] for c in contents] == ["poema sobre o mar"]
+
+
+def test_rebuild_repopulates_from_sources(test_client, user_id):
+    with test_client.application.app_context():
+        add_chat(user_id, "Astronomia", "anãs brancas")
+        db.session.execute(SearchDocument.__table__.delete())
+        db.session.commit()
+        assert search_documents(user_id, "astronomia") == []
+
+        assert rebuild_search_index() > 0
+        assert search_documents(user_id, "astronomia")[0]["kind"] == "chat"
+        assert search_documents(user_id, "anas")[0]["kind"] == "message"
@@ -0,0 +1,62 @@
+import json
+from unittest.mock import patch
+from extensions import db
+from models import ChatMessage
+from providers.base import strip_think_blocks_stream
+
+
+def parse_sse(body):
+    events = []
+    for block in body.split("\n\n"):
+        lines = [l for l in block.splitlines() if not l.startswith(":")]
+        if not lines:
+            continue
+        event = lines[0][len("event: "):]
+        data = json.loads(lines[1][len("data: "):])
+        events.append((event, data))
+    return events
+
+
+def test_strip_think_blocks_stream_split_tags():
+    chunks = ["Olá <thi", "nk>raciocínio", " interno</th", "ink> mundo"]
+    assert "".join(strip_think_blocks_stream(chunks)) == "Olá  mundo"
+
+
+def test_generate_text_stream_persists_ai_message(test_client, auth_headers):
+    with patch("routes.ai_generation_api.open_text_stream", return_value=iter(["Olá", ", ", "mundo"])), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        res = test_client.post(
+            "/api/ai/generate-text/stream",
+            json={"input": "oi", "model": "gpt-4o"},
+            headers=auth_headers
+        )
+
+    assert res.status_code == 200
+    assert res.mimetype == "text/event-stream"
+
+    events = parse_sse(res.get_data(as_text=True))
+    names = [e for e, _ in events]
+    assert names[0] == "start"
+    assert names[-1] == "done"
+    assert [d["text"] for e, d in events if e == "delta"] == ["Olá", ", ", "mundo"]
+
+    done = events[-1][1]
+    assert done["generated_text"] == "Olá, mundo"
+
+    with test_client.application.app_context():
+        ai_msg = db.session.get(ChatMessage, done["message"]["id"])
+        assert ai_msg.content == "Olá, mundo"
+        assert ai_msg.role == "assistant"
+
+
+def test_generate_text_accept_header_uses_stream(test_client, auth_headers):
+    with patch("routes.ai_generation_api.open_text_stream", return_value=iter(["ok"])), \
+         patch("routes.ai_generation_api.schedule_title_generation"):
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "oi", "model": "gpt-4o"},
+            headers={**auth_headers, "Accept": "text/event-stream"}
+        )
+
+    assert res.mimetype == "text/event-stream"
+    assert parse_sse(res.get_data(as_text=True))[-1][1]["generated_text"] == "ok"
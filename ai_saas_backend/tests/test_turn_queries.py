@@ -0,0 +1,126 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+from sqlalchemy import event
+from extensions import db
+from models import Chat, ChatMessage, ChatAttachment
+
+
+@contextmanager
+def count_commits(engine):
+    commits = []
+    listener = lambda conn: commits.append(conn)
+    event.listen(engine, "commit", listener)
+    try:
+        yield commits
+    finally:
+        event.remove(engine, "commit", listener)
+
+
+@contextmanager
+def count_selects(engine):
+    selects = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield selects
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_chat(n_messages):
+    user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+    chat = Chat(user_id=user_id, title="histórico")
+    db.session.add(chat)
+    base = datetime.utcnow() - timedelta(hours=1)
+    for i in range(n_messages):
+        msg = ChatMessage(
+            chat=chat,
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"mensagem {i}",
+            created_at=base + timedelta(seconds=i),
+        )
+        chat.record_message(msg)
+        if i % 2 == 0:
+            db.session.add(ChatAttachment(message=msg, name=f"a{i}.png", path=f"/nao/existe/a{i}.png", mimetype="image/png"))
+        db.session.add(msg)
+    db.session.commit()
+    return chat.id
+
+
+def selects_for_turn(test_client, auth_headers, chat_id):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="resposta")])
+    with test_client.application.app_context():
+        engine = db.engine
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         count_selects(engine) as selects:
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "próxima", "model": "claude-haiku-4-5-20251001", "chat_id": chat_id},
+            headers=auth_headers,
+        )
+    assert res.status_code == 200, res.get_data(as_text=True)
+    selects_for_turn.last = list(selects)
+    return len(selects), res.get_json()
+
+
+def test_turn_query_count_does_not_grow_with_history(test_client, auth_headers):
+    with test_client.application.app_context():
+        small = make_chat(10)
+        large = make_chat(200)
+
+    # Aquece caches do processo (snapshot dos planos) para medir só o turno
+    selects_for_turn(test_client, auth_headers, small)
+    small_count, _ = selects_for_turn(test_client, auth_headers, small)
+    large_count, data = selects_for_turn(test_client, auth_headers, large)
+
+    assert large_count == small_count
+    assert large_count <= 12
+    # Resposta traz só o turno novo, não o histórico inteiro
+    assert [m["role"] for m in data["messages"]] == ["user", "assistant"]
+    assert data["messages"][0]["content"] == "próxima"
+    assert data["chat_version"] == 202
+
+    # Histórico projetado: sem as colunas de uso/modelo que o payload não lê
+    history_select = [q for q in selects_for_turn.last if "chat_messages.content" in q and "ORDER BY chat_messages.seq" in q][0]
+    assert "chat_messages.model_used" not in history_select
+    assert "chat_messages.prompt_tokens" not in history_select
+
+
+def test_new_chat_turn_uses_two_transactions(test_client, auth_headers):
+    reply = SimpleNamespace(content=[SimpleNamespace(type="text", text="olá!")])
+    with test_client.application.app_context():
+        engine = db.engine
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"), \
+         count_commits(engine) as commits:
+        res = test_client.post(
+            "/api/ai/generate-text",
+            json={"input": "oi", "model": "claude-haiku-4-5-20251001"},
+            headers=auth_headers,
+        )
+
+    assert res.status_code == 200, res.get_data(as_text=True)
+    assert len(commits) == 2
+    data = res.get_json()
+    assert [m["role"] for m in data["messages"]] == ["user", "assistant"]
+    assert data["messages"][1]["content"] == "olá!"
+
+
+def test_expire_on_commit_is_only_disabled_for_the_turn(test_client, auth_headers):
+    with test_client.application.app_context():
+        chat_id = make_chat(3)
+        assert db.session().expire_on_commit is True
+
+    selects_for_turn(test_client, auth_headers, chat_id)
+
+    # Depois do turno, as demais rotas e workers recebem uma sessão padrão
+    with test_client.application.app_context():
+        assert db.session().expire_on_commit is True
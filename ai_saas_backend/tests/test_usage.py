@@ -0,0 +1,79 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+from models import ChatMessage, UsageRollup
+from utils import usage as usage_mod
+from utils.usage import estimate_cost_microusd, get_model_pricing, get_usage, normalize_usage, record_usage, flush_usage_rollups
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+def test_normalize_usage_fills_total_and_ignores_empty():
+    assert normalize_usage({"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": None}) == {
+        "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15,
+    }
+    assert normalize_usage(None) is None
+    assert normalize_usage({"prompt_tokens": None, "completion_tokens": None}) is None
+
+
+def test_pricing_uses_longest_prefix():
+    usage = {"prompt_tokens": 1_000_000, "completion_tokens": 1_000_000, "total_tokens": 2_000_000}
+    assert estimate_cost_microusd("gpt-4o-mini-2024-07-18", usage) == 750_000
+    assert estimate_cost_microusd("gpt-4o", usage) == 12_500_000
+    assert estimate_cost_microusd("deepseek/deepseek-chat-v3.1:free", usage) == 0
+
+
+def test_every_registry_model_has_a_price(capsys):
+    from providers.registry import MODEL_CAPABILITIES
+    for model in list(MODEL_CAPABILITIES):
+        if MODEL_CAPABILITIES[model].provider != "openrouter":
+            assert get_model_pricing(model) != usage_mod.DEFAULT_PRICING, model
+    assert get_model_pricing("gpt-5.2") == (1.75, 14.00)
+
+    get_model_pricing("modelo-sem-preco")
+    get_model_pricing("modelo-sem-preco")
+    assert capsys.readouterr().out.count("modelo-sem-preco") == 1
+
+
+def test_generation_persists_usage_and_updates_rollups(test_client, auth_headers):
+    reply = SimpleNamespace(
+        content=[SimpleNamespace(type="text", text="ok")],
+        usage=SimpleNamespace(input_tokens=120, output_tokens=30),
+    )
+    with patch("providers.claude.create_claude_message", return_value=reply), \
+         patch("routes.ai_generation_api.schedule_summary_refresh"), \
+         patch("routes.ai_generation_api.schedule_title_generation"), \
+         patch("routes.ai_generation_api.start_usage_flusher"):
+        res = test_client.post("/api/ai/generate-text", json={"input": "conte até três", "model": MODEL}, headers=auth_headers)
+
+    data = res.get_json()
+    assert data["messages"][-1]["usage"] == {"prompt_tokens": 120, "completion_tokens": 30, "total_tokens": 150}
+
+    with test_client.application.app_context():
+        user_id = ChatMessage.query.filter_by(chat_id=data["chat_id"]).first().chat.user_id
+        counters = get_usage(user_id, MODEL)
+        assert counters["requests"] >= 1 and counters["total_tokens"] >= 150
+
+        while flush_usage_rollups():
+            pass
+        row = UsageRollup.query.filter_by(user_id=user_id, model=MODEL, day=datetime.utcnow().date()).one()
+        assert row.total_tokens == counters["total_tokens"]
+        assert row.cost_microusd == counters["cost_microusd"]
+
+
+def test_flush_writes_absolute_values(test_client):
+    day = date(2024, 1, 2)
+    with test_client.application.app_context():
+        from models import User
+        user_id = User.query.filter_by(username="testuser").one().id
+        record_usage(user_id, "gpt-4o", {"prompt_tokens": 10, "completion_tokens": 10}, day=day)
+        while flush_usage_rollups():
+            pass
+        record_usage(user_id, "gpt-4o", {"prompt_tokens": 10, "completion_tokens": 10}, day=day)
+        while flush_usage_rollups():
+            pass
+
+        row = UsageRollup.query.filter_by(user_id=user_id, model="gpt-4o", day=day).one()
+        total = UsageRollup.query.filter_by(user_id=user_id, model=usage_mod.TOTAL_MODEL, day=day).one()
+        assert (row.requests, row.total_tokens) == (2, 40)
+        assert total.total_tokens == 40
@@ -0,0 +1,116 @@
+import importlib
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+from extensions import db
+from models import VideoJob, GeneratedVideoContent
+
+# routes/__init__ reexporta o blueprint com o mesmo nome do módulo
+video_api = importlib.import_module("routes.ai_generation_video_api")
+
+
+def test_generate_video_returns_job_immediately(test_client, auth_headers):
+    operation = SimpleNamespace(name="models/veo/operations/op-1", done=False)
+
+    with patch.object(video_api.client_gemini.models, "generate_videos", return_value=operation), \
+         patch.object(video_api, "start_video_poller") as start_poller:
+        res = test_client.post(
+            "/api/ai/generate-video",
+            json={"prompt": "um gato surfando", "ratio": "9:16"},
+            headers=auth_headers
+        )
+
+        assert res.status_code == 202, res.get_data(as_text=True)
+        job = res.get_json()["job"]
+        assert job["status"] == "pending"
+        assert job["content_id"] is None
+        start_poller.assert_called_once()
+
+        res = test_client.get(f"/api/ai/video-jobs/{job['id']}", headers=auth_headers)
+        assert res.status_code == 200
+        assert res.get_json()["job"]["id"] == job["id"]
+
+
+def test_poller_completes_job_and_saves_video(test_client, auth_headers, tmp_path):
+    with test_client.application.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+        job = VideoJob(
+            user_id=user_id,
+            prompt="pôr do sol",
+            model_used="veo-3.0-fast-generate-001",
+            ratio="16:9",
+            operation_name="models/veo/operations/op-2",
+            next_poll_at=datetime.utcnow() - timedelta(seconds=1),
+        )
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+
+        running = SimpleNamespace(done=False, error=None, response=None)
+        with patch.object(video_api.client_gemini.operations, "get", return_value=running):
+            assert video_api.poll_video_jobs_once() == 1
+
+        job = db.session.get(VideoJob, job_id)
+        assert job.status == "running"
+        assert job.next_poll_at > datetime.utcnow()
+
+        video = SimpleNamespace(video_bytes=b"fake-mp4", uri=None)
+        done = SimpleNamespace(done=True, error=None, response=SimpleNamespace(generated_videos=[SimpleNamespace(video=video)]))
+        job.next_poll_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        with patch.object(video_api.client_gemini.operations, "get", return_value=done), \
+             patch.object(video_api, "VIDEO_UPLOAD_DIR", str(tmp_path)):
+            assert video_api.poll_video_jobs_once() == 1
+
+        job = db.session.get(VideoJob, job_id)
+        assert job.status == "completed"
+        assert job.progress == 100
+
+        content = db.session.get(GeneratedVideoContent, job.content_id)
+        assert content.prompt == "pôr do sol"
+        with open(content.file_path, "rb") as f:
+            assert f.read() == b"fake-mp4"
+
+
+def test_get_video_job_from_other_user_is_404(test_client, auth_headers):
+    res = test_client.get("/api/ai/video-jobs/inexistente", headers=auth_headers)
+    assert res.status_code == 404
+
+
+def test_download_extends_lease_and_completes_job_once(test_client, tmp_path):
+    with test_client.application.app_context():
+        user_id = db.session.execute(db.text("SELECT id FROM users WHERE username = 'testuser'")).scalar()
+        job = VideoJob(user_id=user_id, prompt="onda gigante", model_used="veo-3.0-fast-generate-001",
+                       operation_name="models/veo/operations/op-3",
+                       next_poll_at=datetime.utcnow() - timedelta(seconds=1))
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        before = GeneratedVideoContent.query.count()
+
+        def slow_download(video, save_path):
+            # Durante o download o job está reservado pelo lease longo
+            current = db.session.query(VideoJob.status, VideoJob.next_poll_at).filter_by(id=job_id).one()
+            assert current.status == "downloading"
+            assert current.next_poll_at > datetime.utcnow() + timedelta(seconds=video_api.VIDEO_POLL_LEASE)
+            # Outro worker (lease vencido) conclui o mesmo job primeiro
+            other = GeneratedVideoContent(user_id=user_id, prompt="onda gigante", model_used="veo", file_path="/outro.mp4")
+            db.session.add(other)
+            db.session.flush()
+            VideoJob.query.filter_by(id=job_id).update({"content_id": other.id, "status": "completed"})
+            db.session.commit()
+            with open(save_path, "wb") as f:
+                f.write(b"duplicado")
+
+        video = SimpleNamespace(video_bytes=None, uri="https://veo/video.mp4")
+        done = SimpleNamespace(done=True, error=None, response=SimpleNamespace(generated_videos=[SimpleNamespace(video=video)]))
+        with patch.object(video_api.client_gemini.operations, "get", return_value=done), \
+             patch.object(video_api, "download_video", side_effect=slow_download), \
+             patch.object(video_api, "VIDEO_UPLOAD_DIR", str(tmp_path)):
+            assert video_api.poll_video_jobs_once() == 1
+
+        # O download duplicado é descartado: um conteúdo só, arquivo removido
+        assert GeneratedVideoContent.query.count() == before + 1
+        assert list(tmp_path.iterdir()) == []
+        assert db.session.get(VideoJob, job_id).status == "completed"
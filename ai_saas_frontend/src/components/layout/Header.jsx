@@ -63,7 +63,7 @@ export default function Header() {
       ])
       const formatted = [
         ...(projRes || []).map(p => ({ type: "project", id: p.id, title: p.name || p.title, created_at: p.created_at })),
-        ...(contRes || []).map(c => ({ type: "content", id: c.id, title: truncate(c.prompt), created_at: c.created_at }))
+        ...(contRes?.contents || []).map(c => ({ type: "content", id: c.id, title: truncate(c.prompt), created_at: c.created_at }))
       ]
       setSearchResults(formatted)
       setSearchOpen(true)
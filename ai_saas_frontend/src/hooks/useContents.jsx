@@ -2,38 +2,29 @@ import { useEffect, useState } from "react";
 import { generatedContentRoutes } from "../services/apiRoutes";
 import { toast } from "react-toastify";
 
+// Só os totais (uma consulta no backend); a galeria é paginada e não é baixada aqui
 export function useContents(user) {
-  const [contents, setContents] = useState([]);
+  const [contentsCount, setContentsCount] = useState(0);
   const [contentsThisMonth, setContentsThisMonth] = useState(0);
 
   useEffect(() => {
     if (!user) return;
 
-    const fetchContents = async () => {
+    const fetchStats = async () => {
       try {
-        const res = await fetch(generatedContentRoutes.list, { credentials: "include" });
+        const res = await fetch(generatedContentRoutes.stats, { credentials: "include" });
         const data = await res.json();
         if (!res.ok) throw new Error(data.error || "Erro ao carregar conteúdos");
 
-        setContents(data);
-
-        const now = new Date();
-        const count = data.filter((c) => {
-          const createdAt = new Date(c.created_at);
-          return (
-            createdAt.getMonth() === now.getMonth() &&
-            createdAt.getFullYear() === now.getFullYear()
-          );
-        }).length;
-
-        setContentsThisMonth(count);
+        setContentsCount(data.total || 0);
+        setContentsThisMonth(data.this_month || 0);
       } catch (err) {
         toast.error(err.message);
       }
     };
 
-    fetchContents();
+    fetchStats();
   }, [user]);
 
-  return { contents, contentsThisMonth };
+  return { contentsCount, contentsThisMonth };
 }
\ No newline at end of file
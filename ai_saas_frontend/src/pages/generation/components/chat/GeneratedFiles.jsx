@@ -9,17 +9,26 @@ export default function GeneratedFiles({ goBack }) {
   const [images, setImages] = useState([]);
   const [selectedImage, setSelectedImage] = useState(null);
 
-  useEffect(() => {
-    async function fetchImages() {
-      try {
-        const res = await apiFetch(generatedContentRoutes.list);
-        setImages(res);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
+  const [nextCursor, setNextCursor] = useState(null);
+
+  // Só imagens, filtradas e paginadas no servidor
+  async function fetchImages(cursor = null) {
+    setLoading(true);
+    try {
+      const params = new URLSearchParams({ type: "image" });
+      if (cursor) params.set("cursor", cursor);
+      const res = await apiFetch(`${generatedContentRoutes.list}?${params.toString()}`);
+      const page = res?.contents || [];
+      setImages((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(res?.next_cursor || null);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoading(false);
     }
+  }
+
+  useEffect(() => {
     fetchImages();
   }, []);
 
@@ -43,7 +52,7 @@ export default function GeneratedFiles({ goBack }) {
 
   return (
     <div className="p-2 h-full overflow-y-auto">
-      {loading ? (
+      {loading && images.length === 0 ? (
         <p className="text-gray-500">Carregando...</p>
       ) : images.length === 0 ? (
         <p className="text-gray-500">Nenhuma imagem gerada ainda.</p>
@@ -61,6 +70,18 @@ export default function GeneratedFiles({ goBack }) {
         </div>
       )}
 
+      {nextCursor && (
+        <div className="flex justify-center mt-3">
+          <button
+            onClick={() => fetchImages(nextCursor)}
+            disabled={loading}
+            className="px-3 py-1 text-sm text-blue-600 hover:underline disabled:opacity-50"
+          >
+            {loading ? "Carregando..." : "Carregar mais"}
+          </button>
+        </div>
+      )}
+
       {selectedImage && (
         <ContentDetailsModal
           content={selectedImage}
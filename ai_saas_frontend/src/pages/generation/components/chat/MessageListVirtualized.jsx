@@ -2,14 +2,20 @@ import React from "react";
 import { Virtuoso } from "react-virtuoso";
 import MessageBubble from "./MessageBubble";
 
-function MessageListVirtualized({ messages, height }) {
+// Índice alto o bastante para prepender páginas antigas sem chegar a zero
+const FIRST_INDEX = 1000000;
+
+function MessageListVirtualized({ messages, height, prependedCount = 0, onLoadOlder }) {
   return (
     <Virtuoso
       style={{ height, width: "100%" }}
-      totalCount={messages.length}
-      itemContent={(index) => (
+      data={messages}
+      firstItemIndex={FIRST_INDEX - prependedCount}
+      initialTopMostItemIndex={Math.max(messages.length - 1, 0)}
+      startReached={onLoadOlder}
+      itemContent={(index, msg) => (
         <div className="px-2 py-1">
-          <MessageBubble msg={messages[index]} />
+          <MessageBubble msg={msg} />
         </div>
       )}
       followOutput="auto"
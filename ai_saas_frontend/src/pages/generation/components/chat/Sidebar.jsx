@@ -3,7 +3,7 @@ import { Plus, Search, File, FolderMinus, Folder, MessageSquare } from "lucide-r
 import ChatItem from "./ChatItem";
 import useChatSearch from "../../hooks/useChatSearch";
 
-export default function Sidebar({ chats, chatId, loadChat, createNewChat, updateChatList, setImagesOpen }) {
+export default function Sidebar({ chats, hasMoreChats, loadMoreChats, chatId, loadChat, createNewChat, updateChatList, setImagesOpen }) {
   const [showArchived, setShowArchived] = useState(false);
   const [searchOpen, setSearchOpen] = useState(false);
   const searchRef = useRef(null);
@@ -158,6 +158,16 @@ export default function Sidebar({ chats, chatId, loadChat, createNewChat, update
             )}
           </div>
         )}
+
+        {/* Próxima página da listagem */}
+        {hasMoreChats && (
+          <button
+            className="mt-3 w-full text-sm text-gray-600 hover:text-gray-800"
+            onClick={loadMoreChats}
+          >
+            Carregar mais chats
+          </button>
+        )}
       </div>
     </div>
   );
@@ -1,8 +1,23 @@
 import { useState, useRef } from "react";
 import { toast } from "react-toastify";
-import { aiRoutes } from "../../../services/apiRoutes";
+import { aiRoutes, chatRoutes } from "../../../services/apiRoutes";
 import { apiFetch } from "../../../services/apiService"; // ← import do service
 
+const TITLE_POLL_MS = 1500;
+const TITLE_POLL_ATTEMPTS = 10;
+
+// Título gerado em background: consulta até sair de pending (cada chamada responde na hora)
+async function pollChatTitle(chatId, onTitle) {
+  for (let attempt = 0; attempt < TITLE_POLL_ATTEMPTS; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, TITLE_POLL_MS));
+    const titleData = await apiFetch(chatRoutes.title(chatId));
+    if (!titleData?.pending) {
+      if (titleData?.title) onTitle(titleData.title);
+      return;
+    }
+  }
+}
+
 export default function useChatActions({ chatId, setChatId, messages, setMessages, updateChatList }) {
   const [loading, setLoading] = useState(false);
   const [controller, setController] = useState(null);
@@ -71,6 +86,12 @@ export default function useChatActions({ chatId, setChatId, messages, setMessage
       };
       updateChatList(newChat, "add");
 
+      // Chat novo: o título definitivo é gerado em background no servidor
+      if (aiData.title_pending) {
+        pollChatTitle(aiData.chat_id, (title) => updateChatList({ id: aiData.chat_id }, "rename", title))
+          .catch(() => {});
+      }
+
       setMessages((prev) =>
         prev.map((msg) => {
           if (msg.role === "user" && msg.attachments?.some((a) => a.isPreview)) {
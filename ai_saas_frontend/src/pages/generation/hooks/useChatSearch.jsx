@@ -1,43 +1,6 @@
 import { useState, useEffect } from "react";
 import { chatRoutes } from "../../../services/apiRoutes";
 
-function escapeHtml(text) {
-  return text?.replace(/[&<>"']/g, (m) => {
-    const map = { "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#039;" };
-    return map[m];
-  }) || "";
-}
-
-function getSnippet(text = "", query, wordsBefore = 1, length = 80) {
-  const lowerText = text.toLowerCase();
-  const lowerQuery = query.toLowerCase();
-  const idx = lowerText.indexOf(lowerQuery);
-
-  if (idx === -1) return null;
-
-  const before = text.slice(0, idx).trim().split(/\s+/);
-  let startIdx = idx;
-  if (before.length > wordsBefore) {
-    const removed = before.slice(-wordsBefore).join(" ");
-    startIdx = idx - removed.length - 1;
-  } else {
-    startIdx = 0;
-  }
-
-  if (startIdx < 0) startIdx = 0;
-
-  const endIdx = Math.min(startIdx + length, text.length);
-  let snippet = text.substring(startIdx, endIdx);
-
-  if (startIdx > 0) snippet = "..." + snippet;
-  if (endIdx < text.length) snippet += "...";
-
-  const regex = new RegExp(`(${query})`, "gi");
-  snippet = escapeHtml(snippet).replace(regex, "<strong>$1</strong>");
-
-  return snippet;
-}
-
 export default function useChatSearch() {
   const [query, setQuery] = useState("");
   const [results, setResults] = useState([]);
@@ -59,27 +22,10 @@ export default function useChatSearch() {
           credentials: "include",
           signal: controller.signal,
         });
-        let data = await res.json();
-
-        if (!data) data = [];
-
-        data = data.map((chat) => {
-          if (!chat.messages || chat.messages.length === 0) {
-            return { ...chat, snippet: null };
-          }
-
-          const match = chat.messages.find((m) =>
-            m.content && m.content.toLowerCase().includes(query.toLowerCase())
-          );
-
-          if (match) {
-            const snippet = getSnippet(match.content, query);
-            return { ...chat, snippet };
-          }
-          return { ...chat, snippet: null };
-        });
+        const data = await res.json();
 
-        setResults(data);
+        // O trecho já vem do índice de busca do backend, escapado e com <mark> no termo
+        setResults(data?.chats || []);
       } catch (err) {
         if (err.name !== "AbortError") console.error("Erro ao buscar chats:", err);
       } finally {
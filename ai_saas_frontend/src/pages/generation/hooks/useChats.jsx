@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { toast } from "react-toastify";
 import { chatRoutes } from "../../../services/apiRoutes";
 
@@ -7,21 +7,39 @@ export default function useChats() {
   const [chatId, setChatId] = useState(null);
   const [messages, setMessages] = useState([]);
   const [chatVisible, setChatVisible] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [olderBefore, setOlderBefore] = useState(null);
+  const [prependedCount, setPrependedCount] = useState(0);
+  const loadingOlder = useRef(false);
+
+  // A listagem vem paginada (resumos, sem mensagens); cursor null = primeira página
+  const fetchChats = async (cursor = null) => {
+    try {
+      const params = new URLSearchParams();
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${chatRoutes.list}?${params.toString()}`, { credentials: "include" });
+      const data = await res.json();
+      const page = data?.chats || [];
+      setChats((prev) => {
+        if (!cursor) return page;
+        const known = new Set(prev.map((c) => c.id));
+        return [...prev, ...page.filter((c) => !known.has(c.id))];
+      });
+      setNextCursor(data?.next_cursor || null);
+    } catch (err) {
+      console.error("Erro ao carregar chats:", err);
+      toast.error("Erro ao carregar chats");
+    }
+  };
 
   useEffect(() => {
-    const fetchChats = async () => {
-      try {
-        const res = await fetch(chatRoutes.list, { credentials: "include" });
-        const data = await res.json();
-        setChats(data || []);
-      } catch (err) {
-        console.error("Erro ao carregar chats:", err);
-        toast.error("Erro ao carregar chats");
-      }
-    };
     fetchChats();
   }, []);
 
+  const loadMoreChats = () => {
+    if (nextCursor) fetchChats(nextCursor);
+  };
+
   const loadChat = async (id) => {
     try {
       setChatVisible(false);
@@ -31,6 +49,8 @@ export default function useChats() {
         const res = await fetch(chatRoutes.messages(id), { credentials: "include" });
         const data = await res.json();
         setMessages(data.messages || []);
+        setOlderBefore(data.next_before || null);
+        setPrependedCount(0);
         setChatVisible(true);
       }, 200);
     } catch (err) {
@@ -39,11 +59,31 @@ export default function useChats() {
     }
   };
 
+  // Rolagem para cima: busca a página anterior à mensagem mais antiga carregada
+  const loadOlderMessages = async () => {
+    if (!chatId || !olderBefore || loadingOlder.current) return;
+    loadingOlder.current = true;
+    try {
+      const res = await fetch(chatRoutes.messages(chatId, olderBefore), { credentials: "include" });
+      const data = await res.json();
+      const older = data.messages || [];
+      setMessages((prev) => [...older, ...prev]);
+      setPrependedCount((prev) => prev + older.length);
+      setOlderBefore(data.next_before || null);
+    } catch (err) {
+      console.error("Erro ao carregar mensagens anteriores:", err);
+    } finally {
+      loadingOlder.current = false;
+    }
+  };
+
   const createNewChat = () => {
     setChatVisible(false);
     setTimeout(() => {
       setChatId(null);
       setMessages([]);
+      setOlderBefore(null);
+      setPrependedCount(0);
       setChatVisible(true);
     }, 200);
   };
@@ -87,9 +127,13 @@ export default function useChats() {
 
   return {
     chats,
+    hasMoreChats: Boolean(nextCursor),
+    loadMoreChats,
     chatId,
     messages,
     setMessages,
+    loadOlderMessages,
+    prependedCount,
     chatVisible,
     chatIdSetter: setChatId,
     loadChat,
@@ -14,7 +14,7 @@ import GeneratedFiles from "../components/chat/GeneratedFiles";
 
 function TextGeneration() {
   const { user } = useAuth();
-  const { chats, chatId, messages, setMessages, chatVisible, chatIdSetter, loadChat, createNewChat, updateChatList } = useChats();
+  const { chats, hasMoreChats, loadMoreChats, chatId, messages, setMessages, loadOlderMessages, prependedCount, chatVisible, chatIdSetter, loadChat, createNewChat, updateChatList } = useChats();
   const [input, setInput] = useState("");
   const [model, setModel] = useState("gpt-4o");
   const [temperature, setTemperature] = useState(0.7);
@@ -57,6 +57,8 @@ function TextGeneration() {
         <div className={`absolute top-0 left-0 h-full transition-all duration-300 z-40 ${sidebarCollapsed ? "-ml-72" : "ml-0"}`}>
           <Sidebar
             chats={chats}
+            hasMoreChats={hasMoreChats}
+            loadMoreChats={loadMoreChats}
             chatId={chatId}
             loadChat={loadChat}
             createNewChat={createNewChat}
@@ -97,6 +99,8 @@ function TextGeneration() {
             !imagesOpen && (
               <MessageListVirtualized
                 messages={messages}
+                prependedCount={prependedCount}
+                onLoadOlder={loadOlderMessages}
                 height={window.innerHeight - 180}
                 width="100%"
                 className="py-4 px-2"
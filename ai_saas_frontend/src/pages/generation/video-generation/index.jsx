@@ -8,6 +8,8 @@ import { aiRoutes, generatedContentRoutes, userRoutes } from '../../../services/
 import { apiFetch } from '../../../services/apiService';
 import { VIDEO_MODELS, VIDEO_RATIOS } from '../../../utils/constants';
 
+const VIDEO_JOB_POLL_MS = 5000;
+
 function VideoGeneration() {
   const [prompt, setPrompt] = useState("");
   const [model, setModel] = useState("veo-3.0-fast-generate-001");
@@ -40,8 +42,20 @@ function VideoGeneration() {
         body: JSON.stringify({ prompt, model_used: model, ratio }),
       });
 
-      if (res?.video?.id) {
-        const videoRes = await apiFetch(generatedContentRoutes.getVideo(res.video.id), {
+      // A geração roda em background: acompanha o job até terminar
+      let job = res?.job;
+      while (job && job.status !== "completed" && job.status !== "failed") {
+        await new Promise((resolve) => setTimeout(resolve, VIDEO_JOB_POLL_MS));
+        const jobRes = await apiFetch(aiRoutes.videoJob(job.id), { method: "GET" });
+        job = jobRes?.job;
+      }
+
+      if (!job || job.status === "failed") {
+        throw new Error(job?.error || "Falha na geração do vídeo");
+      }
+
+      if (job.content_id) {
+        const videoRes = await apiFetch(generatedContentRoutes.getVideo(job.content_id), {
           method: "GET",
         });
         const blob = await videoRes.blob();
@@ -16,7 +16,7 @@ export default function Home() {
   const navigate = useNavigate();
 
   const { projects, projectsThisMonth } = useProjects(user);
-  const { contents, contentsThisMonth } = useContents(user);
+  const { contentsCount, contentsThisMonth } = useContents(user);
 
   const [showProjectModal, setShowProjectModal] = useState(false);
 
@@ -89,7 +89,7 @@ export default function Home() {
               <p className={styles.blockTitle}>Conteúdo Gerado</p>
               <Image className="w-4 h-4 text-gray-medium" />
             </div>
-            <p className="text-2xl font-bold">{contents.length}</p>
+            <p className="text-2xl font-bold">{contentsCount}</p>
             <p className={`${styles.statSubtext} text-xs`}>
               +{contentsThisMonth} criados este mês
             </p>
@@ -14,7 +14,7 @@ import { useNavigate, Link } from "react-router-dom";
 export default function Settings() {
   const [user, setUser] = useState(null);
   const { projects } = useProjects(user);
-  const { contents } = useContents(user);
+  const { contentsCount } = useContents(user);
   const [showAccountModal, setShowAccountModal] = useState(false);
   const [showPlanModal, setShowPlanModal] = useState(false);
   const [showDeleteVerifyModal, setShowDeleteVerifyModal] = useState(false);
@@ -168,7 +168,7 @@ export default function Settings() {
                 <strong className="font-semibold text-gray-900 text-sm">E-mail:</strong> {user.email || "N/A"}
               </p>
               <p className="text-gray-700 text-sm">
-                <strong className="font-semibold text-gray-900 text-sm">Conteúdos gerados:</strong> {contents.length}
+                <strong className="font-semibold text-gray-900 text-sm">Conteúdos gerados:</strong> {contentsCount}
               </p>
               <p className="text-gray-700 text-sm">
                 <strong className="font-semibold text-gray-900 text-sm">Projetos gerados:</strong> {projects.length}
@@ -28,7 +28,8 @@ export default function Subscription() {
     return (
       <ul className="mt-4 grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 gap-3">
         {features.map((pf) => {
-          const isEnabled = pf.value === "true";
+          // Limites numéricos ("50", "1000") contam como habilitados, exceto "0"
+          const isEnabled = pf.value !== "false" && pf.value !== "0";
           const displayValue =
             pf.value !== "true" && pf.value !== "false" ? pf.value : null;
 
@@ -15,7 +15,7 @@ import SelectionToggleButton from "../components/SelectionToggleButton";
 import SelectionToolbar from "../components/SelectionToolbar";
 
 export default function GeneratedContentsList() {
-  const { loading, allContents, setAllContents, handleDeleteContent } = useContentsFetch();
+  const { loading, allContents, setAllContents, hasMore, loadMore, handleDeleteContent } = useContentsFetch();
   const {
     filteredContents,
     activeTab,
@@ -100,9 +100,9 @@ export default function GeneratedContentsList() {
         </div>
       </div>
 
-      {loading ? (
+      {loading && allContents.length === 0 ? (
         <p>Carregando...</p>
-      ) : filteredContents.length === 0 ? (
+      ) : filteredContents.length === 0 && !hasMore ? (
         <p className="text-gray-500">Nenhum conteúdo encontrado.</p>
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
@@ -120,6 +120,18 @@ export default function GeneratedContentsList() {
         </div>
       )}
 
+      {hasMore && (
+        <div className="flex justify-center mt-6">
+          <button
+            onClick={loadMore}
+            disabled={loading}
+            className="px-4 py-2 text-sm font-semibold text-blue-600 border border-blue-600 rounded-lg hover:bg-blue-50 transition disabled:opacity-50"
+          >
+            {loading ? "Carregando..." : "Carregar mais"}
+          </button>
+        </div>
+      )}
+
       {selectedContent && (
         <ContentDetailsModal
           content={selectedContent}
@@ -3,28 +3,44 @@ import { toast } from "react-toastify";
 import { generatedContentRoutes } from "../../../services/apiRoutes";
 import { apiFetch } from "../../../services/apiService"
 
-export default function useContentsFetch() {
+// A galeria vem paginada (cursor) e pode ser filtrada por tipo no servidor
+export default function useContentsFetch(type = null) {
   const [loading, setLoading] = useState(true);
   const [allContents, setAllContents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  useEffect(() => {
-    async function loadData() {
-      setLoading(true);
-      try {
-        const res = await fetch(generatedContentRoutes.list, {
-          credentials: "include",
-        });
-        if (!res.ok) throw new Error("Erro ao buscar conteúdos");
-        const contents = await res.json();
-        setAllContents(contents);
-      } catch (err) {
-        toast.error(err.message);
-      } finally {
-        setLoading(false);
-      }
+  async function loadData(cursor = null) {
+    setLoading(true);
+    try {
+      const params = new URLSearchParams();
+      if (type) params.set("type", type);
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${generatedContentRoutes.list}?${params.toString()}`, {
+        credentials: "include",
+      });
+      if (!res.ok) throw new Error("Erro ao buscar conteúdos");
+      const data = await res.json();
+      const page = data?.contents || [];
+      setAllContents((prev) => {
+        if (!cursor) return page;
+        const known = new Set(prev.map((c) => c.id));
+        return [...prev, ...page.filter((c) => !known.has(c.id))];
+      });
+      setNextCursor(data?.next_cursor || null);
+    } catch (err) {
+      toast.error(err.message);
+    } finally {
+      setLoading(false);
     }
+  }
+
+  useEffect(() => {
     loadData();
-  }, []);
+  }, [type]);
+
+  function loadMore() {
+    if (nextCursor) loadData(nextCursor);
+  }
 
   async function handleDeleteContent(id) {
     if (!window.confirm("Tem certeza que quer deletar este conteúdo?")) return;
@@ -43,6 +59,8 @@ export default function useContentsFetch() {
     loading,
     allContents,
     setAllContents,
+    hasMore: Boolean(nextCursor),
+    loadMore,
     handleDeleteContent,
   };
 }
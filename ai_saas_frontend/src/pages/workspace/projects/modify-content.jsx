@@ -23,7 +23,7 @@ export default function ModifyContent() {
   const navigate = useNavigate();
   const baseUrl = import.meta.env.VITE_API_BASE_URL;
 
-  const { loading: loadingContents, allContents } = useContentsFetch();
+  const { loading: loadingContents, allContents, hasMore, loadMore } = useContentsFetch();
   const {
     filteredContents,
     activeTab,
@@ -73,12 +73,8 @@ export default function ModifyContent() {
         if (!resProject.ok) throw new Error("Erro ao buscar projeto");
 
         const projectData = await resProject.json();
-        const projectContentIds = projectData.contents.map((c) =>
-          typeof c === "string" ? c : c.id
-        );
-        const projectContents = allContents.filter((c) =>
-          projectContentIds.includes(c.id)
-        );
+        // O projeto já traz os conteúdos completos; a galeria é paginada e pode não ter todos
+        const projectContents = projectData.contents.filter((c) => typeof c !== "string");
 
         setProject(projectData);
         setSelectedContents(projectContents);
@@ -90,8 +86,8 @@ export default function ModifyContent() {
       }
     }
 
-    if (projectId && allContents.length > 0) loadProject();
-  }, [projectId, allContents]);
+    if (projectId) loadProject();
+  }, [projectId]);
 
   useEffect(() => {
     function handleClickOutside(e) {
@@ -134,7 +130,7 @@ export default function ModifyContent() {
     }
   }
 
-  if (loadingContents || loadingProject) {
+  if ((loadingContents && allContents.length === 0) || loadingProject) {
     return (
       <Layout>
         <p className="p-4 text-sm">Carregando conteúdos...</p>
@@ -247,6 +243,18 @@ export default function ModifyContent() {
                 ))
             )}
           </div>
+
+          {hasMore && (
+            <div className="flex justify-center mt-6">
+              <button
+                onClick={loadMore}
+                disabled={loadingContents}
+                className="px-4 py-2 text-sm font-semibold text-blue-600 border border-blue-600 rounded-lg hover:bg-blue-50 transition disabled:opacity-50"
+              >
+                {loadingContents ? "Carregando..." : "Carregar mais"}
+              </button>
+            </div>
+          )}
         </div>
 
         <SelectedContentsSidebar
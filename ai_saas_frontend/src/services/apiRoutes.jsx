@@ -50,7 +50,8 @@ export const projectRoutes = {
 };
 
 export const generatedContentRoutes = {
-  list: `${API_BASE}/contents/`,                // GET → lista todos conteúdos do usuário
+  list: `${API_BASE}/contents/`,                // GET → galeria paginada (?type=, ?cursor=)
+  stats: `${API_BASE}/contents/stats`,          // GET → total e criados no mês
   create: `${API_BASE}/contents/`,              // POST → criar conteúdo gerado
   get: (contentId) => `${API_BASE}/contents/${contentId}`,   // GET → detalhes conteúdo
   delete: (contentId) => `${API_BASE}/contents/${contentId}`, // DELETE → deletar conteúdo
@@ -75,16 +76,21 @@ export const aiRoutes = {
   generateText: `${API_BASE}/ai/generate-text`,  // POST → gerar texto via IA
   generateImage: `${API_BASE}/ai/generate-image`,
   generateVideo: `${API_BASE}/ai/generate-video`,
+  videoJob: (jobId) => `${API_BASE}/ai/video-jobs/${jobId}`, // GET → status do job de vídeo
 };
 
 export const chatRoutes = {
-  list: `${API_BASE}/chats/`,                         // GET → lista todos os chats do usuário
+  list: `${API_BASE}/chats/`,                         // GET → resumos dos chats (paginado; ?q= usa o índice de busca)
   create: `${API_BASE}/chats/`,                       // POST → cria novo chat
   get: (chatId) => `${API_BASE}/chats/${chatId}`,     // GET → detalhes de um chat específico
   update: (chatId) => `${API_BASE}/chats/${chatId}`,  // PUT → atualizar título, prompt ou modelo
   delete: (chatId) => `${API_BASE}/chats/${chatId}`,  // DELETE → remover chat
   archive: (chatId) => `${API_BASE}/chats/${chatId}/archive`,    // PATCH → arquivar chat
   unarchive: (chatId) => `${API_BASE}/chats/${chatId}/unarchive`,// PATCH → desarquivar chat
-  messages: (chatId) => `${API_BASE}/chats/${chatId}?with_messages=true`, // GET → lista mensagens
+  messages: (chatId, before) => `${API_BASE}/chats/${chatId}/messages${before ? `?before=${before}` : ""}`, // GET → mensagens paginadas (mais recentes primeiro; before = seq)
+  title: (chatId) => `${API_BASE}/chats/${chatId}/title`, // GET → título atual e se ainda está sendo gerado
   attachments: (attachmentId) => `${API_BASE}/chats/attachments/${attachmentId}`,
-};
\ No newline at end of file
+};
+export const searchRoutes = {
+  search: `${API_BASE}/search/`, // GET ?q=&types=chat,message,content,project → busca full-text paginada
+};